@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmschangelog.py
+
+Copyright (C) 2018 Stefan Braun
+
+incremental reading of DMS changelog groups (protocol entries):
+-position of last seen entry is kept per group in a cursor, optionally persisted in a JSON file
+ =>next run continues there, history is not read again
+-timerange from cursor until now is split into windows, some "changelogRead" requests are waiting in DMS at the same time
+-entries are yielded as compact ChangelogRecord tuples (stamp, path, text) in chronological order
+
+example: tail changelog group "Hand" of an alarm-analytics job:
+	cursor = ChangelogCursor(filename='changelog_cursor.json')
+	reader = ChangelogReader(dms_ws, group=u'Hand', cursor=cursor)
+	for record in reader.tail():
+		print(record.stamp, record.path, record.text)
+
+Remarks:
+-"start" and "end" of "changelogRead" are inclusive, so entries on a window border are sent twice by DMS
+ =>cursor remembers the entries with it's timestamp and skips them on next request
+-entries written into DMS with an older timestamp than cursor (e.g. clock of DMS host was set back) are not read
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmswebsocket as dms
+import dateutil.parser, dateutil.tz
+import datetime
+import collections
+import itertools
+import threading
+import json
+import os
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmschangelog')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# size of one window in "changelogRead" requests
+CHANGELOG_CHUNK_TIMEDELTA = datetime.timedelta(hours=6)
+
+# delay in seconds between two reads when tailing a changelog group
+CHANGELOG_POLL_INTERVAL = 5.0
+
+# reading only until some seconds ago: DMS could still be writing entries with current timestamp
+CHANGELOG_SETTLE_DELAY = 1.0
+
+
+# one protocol entry
+ChangelogRecord = collections.namedtuple('ChangelogRecord', ['stamp', 'path', 'text'])
+
+
+def get_now():
+	# timestamps from DMS contain timezone, so we need it for comparisons, too
+	return datetime.datetime.now(dateutil.tz.tzlocal())
+
+
+def as_datetime(tstamp):
+	# accepting datetime.datetime objects and ISO 8601 strings, without timezone we assume local time
+	if not isinstance(tstamp, datetime.datetime):
+		tstamp = dateutil.parser.parse(tstamp)
+	if tstamp.tzinfo is None:
+		tstamp = tstamp.replace(tzinfo=dateutil.tz.tzlocal())
+	return tstamp
+
+
+class ChangelogCursor(object):
+	""" position of last seen entry per changelog group (in memory, or persisted in a JSON file) """
+
+	def __init__(self, filename=None):
+		self.filename = filename
+		# key: group, value: tuple (timestamp as datetime.datetime, list of tuples (path, text) of seen entries with this timestamp)
+		self._positions_dict = {}
+		if filename and os.path.exists(filename):
+			self.load()
+
+
+	def get(self, group):
+		""" tuple (timestamp or None, list of tuples (path, text)) """
+		return self._positions_dict.get(group, (None, []))
+
+
+	def set(self, group, stamp, seen_list):
+		self._positions_dict[group] = (stamp, list(seen_list))
+
+
+	def load(self):
+		with open(self.filename, 'r') as f:
+			data_dict = json.load(f)
+		self._positions_dict = {}
+		for group, position in data_dict.items():
+			seen_list = [(path, text) for path, text in position[u'seen']]
+			self._positions_dict[group] = (as_datetime(position[u'stamp']), seen_list)
+		logger.debug('ChangelogCursor.load(): positions of ' + str(len(self._positions_dict)) + ' changelog groups loaded from "' + self.filename + '"')
+
+
+	def save(self):
+		""" write positions into JSON file (first into temporary file, so a crash doesn't destroy last position) """
+		if not self.filename:
+			return
+		data_dict = {}
+		for group, (stamp, seen_list) in self._positions_dict.items():
+			if stamp:
+				data_dict[group] = {u'stamp': stamp.isoformat(),
+				                    u'seen': [list(item) for item in seen_list]}
+		tmp_filename = self.filename + '.tmp'
+		with open(tmp_filename, 'w') as f:
+			json.dump(data_dict, f, indent=1)
+		# os.rename() on Windows doesn't overwrite existing file
+		if os.name == 'nt' and os.path.exists(self.filename):
+			os.remove(self.filename)
+		os.rename(tmp_filename, self.filename)
+
+
+class ChangelogReader(object):
+	""" incremental reader of one changelog group """
+
+	def __init__(self, dms_ws, group, cursor=None, start=None, chunk_timedelta=CHANGELOG_CHUNK_TIMEDELTA, max_inflight=dms.CHANGELOG_MAX_INFLIGHT, timeout=dms.REQ_TIMEOUT):
+		# =>"start": first timestamp when cursor has no position of this group (default: now, only new entries get read)
+		assert chunk_timedelta > datetime.timedelta(0), u'parameter "chunk_timedelta" has to be a positive timespan!'
+		self._dms_ws = dms_ws
+		self.group = u'' + group
+		self.cursor = cursor or ChangelogCursor()
+		self.chunk_timedelta = chunk_timedelta
+		self.max_inflight = max_inflight
+		self.timeout = timeout
+		self._stop_event = threading.Event()
+
+		if not self.cursor.get(self.group)[0]:
+			if start is None:
+				start_dt = get_now()
+			else:
+				start_dt = as_datetime(start)
+			self.cursor.set(self.group, start_dt, [])
+
+
+	def read(self, end=None):
+		""" generator: all new entries until "end" (default: now) as ChangelogRecord tuples in chronological order """
+		if end is None:
+			end_dt = get_now() - datetime.timedelta(seconds=CHANGELOG_SETTLE_DELAY)
+		else:
+			end_dt = as_datetime(end)
+
+		cursor_stamp, seen_list = self.cursor.get(self.group)
+		if cursor_stamp >= end_dt:
+			return
+
+		# list of timeranges of all windows
+		windows_list = []
+		curr_start = cursor_stamp
+		while curr_start < end_dt:
+			curr_end = min(curr_start + self.chunk_timedelta, end_dt)
+			windows_list.append((curr_start, curr_end))
+			curr_start = curr_end
+		cmd_kwargs_gen = ({u'group': self.group, u'start': win_start, u'end': win_end} for win_start, win_end in windows_list)
+
+		nof_records = 0
+		try:
+			for (win_start, win_end), resp_list in itertools.izip(windows_list, self._dms_ws.changelog_Read_pipelined(cmd_kwargs_gen, max_inflight=self.max_inflight, timeout=self.timeout)):
+				resp = resp_list[0]
+				if resp.code != u'ok':
+					raise Exception('ChangelogReader.read(): DMS returned error "' + resp.code + '" for changelog group "' + self.group + '"')
+
+				# entries with cursor timestamp were already seen when they are in list of cursor
+				skip_counter = collections.Counter(seen_list)
+				entries_list = [entry for entry in (resp.changelog or []) if entry[u'stamp']]
+				entries_list.sort(key=lambda entry: entry[u'stamp'])
+				for entry in entries_list:
+					stamp = entry[u'stamp']
+					item = (entry[u'path'], entry[u'text'])
+					if stamp < cursor_stamp:
+						continue
+					if stamp == cursor_stamp:
+						if skip_counter[item] > 0:
+							skip_counter[item] -= 1
+							continue
+					else:
+						cursor_stamp = stamp
+						seen_list = []
+					seen_list.append(item)
+					# cursor is updated before caller gets this record
+					self.cursor.set(self.group, cursor_stamp, seen_list)
+					nof_records += 1
+					yield ChangelogRecord(stamp, entry[u'path'], entry[u'text'])
+
+				# whole window is read
+				if win_end > cursor_stamp:
+					cursor_stamp = win_end
+					seen_list = []
+					self.cursor.set(self.group, cursor_stamp, seen_list)
+				self.cursor.save()
+		finally:
+			# caller could stop iteration early
+			self.cursor.save()
+			logger.debug('ChangelogReader.read(): ' + str(nof_records) + ' new entries in changelog group "' + self.group + '"')
+
+
+	def tail(self, poll_interval=CHANGELOG_POLL_INTERVAL):
+		""" endless generator: new entries as ChangelogRecord tuples, polling DMS until stop() is called """
+		while not self._stop_event.is_set():
+			try:
+				for record in self.read():
+					yield record
+			except IOError as ex:
+				# WebSocket connection to DMS is lost, DMSClient could reconnect in background
+				# =>cursor is still at last seen entry, we retry it next cycle.
+				logger.error('ChangelogReader.tail(): reading changelog group "' + self.group + '" failed: ' + repr(ex))
+			self._stop_event.wait(poll_interval)
+
+
+	def stop(self):
+		self._stop_event.set()
@@ -0,0 +1,544 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmsemulator.py
+
+Copyright (C) 2018 Stefan Braun
+
+stand-in for DMS JSON Data Exchange on localhost (no Visi.Plus installation needed, runs also on Linux):
+implements the subset of the protocol used by dms.dmswebsocket.DMSClient
+-"get" (with "query", "histData" and "changelog"), "set", "rename", "delete"
+-"subscribe" / "unsubscribe" with DMS-events "onChange", "onSet", "onCreate", "onRename" and "onDelete"
+-"changelogGetGroups" and "changelogRead"
+=>DMS-keys are stored in a dms.dmsproxy.DMSMirror object
+=>trenddata is recorded for DMS-keys registered by enable_history(), protocol entries for DMS-keys in changelog groups
+=>disconnect_all() drops all WebSocket connections (e.g. for testing automatic reconnection of DMSClient)
+
+differences to real DMS (it's not meant as replacement...):
+-no access rights, no persistence, no "extInfos"
+-"interval" in "histData" is ignored, query field "hasAlarmData" never matches
+
+example:
+	emulator = DMSEmulator(port=0)
+	emulator.set_node(u'MSR01:Test', 42)
+	emulator.start()
+	with dms.dmswebsocket.DMSClient(u'test', u'user', dms_port_int=emulator.get_port()) as dms_ws:
+		print(dms_ws.dp_get(path=u'MSR01:Test'))
+	emulator.stop()
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmsproxy as dmsproxy
+import dms.dmsquery as dmsquery
+from dms.websocketserver import WebSocketServer
+import dateutil.parser, dateutil.tz
+import datetime
+import argparse
+import threading
+import json
+import time
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmsemulator')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+EMULATOR_HOST = u'127.0.0.1'
+EMULATOR_PORT = 9020
+
+# event codes (same strings as in dms.dmswebsocket.DMSEvent)
+CODE_CHANGE = u'onChange'
+CODE_SET = u'onSet'
+CODE_CREATE = u'onCreate'
+CODE_RENAME = u'onRename'
+CODE_DELETE = u'onDelete'
+
+
+def get_timestamp():
+	""" current time as ISO 8601 string with UTC offset (same format as DMS) """
+	return datetime.datetime.now(dateutil.tz.tzlocal()).isoformat()
+
+
+def get_datatype(value):
+	""" DMS datatype of a JSON value """
+	if value is None:
+		return u'none'
+	elif isinstance(value, bool):
+		return u'bool'
+	elif isinstance(value, (int, long)):
+		return u'int'
+	elif isinstance(value, float):
+		return u'double'
+	return u'string'
+
+
+def as_datatype(value, datatype):
+	""" conversion of value into given DMS datatype (like DMS does when "type" is given in "set" command) """
+	if datatype == u'bool':
+		return bool(value)
+	elif datatype == u'int':
+		return int(value)
+	elif datatype == u'double':
+		return float(value)
+	elif datatype == u'string':
+		return u'' + unicode(value)
+	return value
+
+
+class _Subscription(object):
+	""" one subscription of a connected client """
+
+	def __init__(self, conn, cmd_dict):
+		self.conn = conn
+		self.path = cmd_dict[u'path']
+		self.tag = cmd_dict[u'tag']
+		self.query_dict = cmd_dict.get(u'query', None)
+		event_str = cmd_dict.get(u'event', u'*') or u'*'
+		if event_str == u'*':
+			self.codes_set = None
+		else:
+			self.codes_set = set(code.strip() for code in event_str.split(u','))
+
+
+	def matches(self, code, path, value, datatype, stamp):
+		if self.codes_set is not None and not code in self.codes_set:
+			return False
+		if not dmsproxy.is_in_subtree(self.path, path):
+			return False
+		if not self.query_dict:
+			# without "query" only this DMS-key gets monitored
+			return path == self.path
+		offline_dict = dict((key, val) for key, val in self.query_dict.items() if key in dmsquery.OFFLINE_FIELDS)
+		return dmsquery.match_node(path, value, datatype, offline_dict, stamp=stamp, base_path=self.path)
+
+
+
+class DMSEmulator(object):
+	""" WebSocket server application: answering DMS JSON Data Exchange requests like a DMS """
+
+	def __init__(self, host=EMULATOR_HOST, port=EMULATOR_PORT):
+		self._mirror = dmsproxy.DMSMirror()
+		self._lock = threading.RLock()
+
+		# trenddata (key: DMS-key, value: list of tuples (timestamp as datetime, value))
+		self._history_dict = {}
+		# changelog groups (key: group name, value: tuple (list of root DMS-keys, list of protocol entries))
+		self._changelog_dict = {}
+		# subscriptions (key: tuple (WebSocketConnection, tag), value: _Subscription object)
+		self._subs_dict = {}
+		self._connections_set = set()
+
+		# artificial delay in seconds before every response (e.g. simulating a busy DMS or a slow network)
+		self.response_delay = 0.0
+
+		# diagnostic values
+		self.nof_requests = 0
+		self.nof_commands = 0
+		self.nof_events = 0
+
+		self._server = WebSocketServer(app=self, host=host, port=port)
+
+
+	def start(self):
+		self._server.start()
+
+	def stop(self):
+		self._server.stop()
+		self.disconnect_all()
+
+	def get_port(self):
+		return self._server.get_port()
+
+	def disconnect_all(self):
+		""" drop all client connections (server keeps listening) """
+		with self._lock:
+			connections_list = list(self._connections_set)
+		for conn in connections_list:
+			conn.close()
+		return len(connections_list)
+
+
+	# content of emulated DMS
+	def set_node(self, path, value, datatype=None, stamp=None):
+		""" create or change DMS-key without firing DMS-events """
+		with self._lock:
+			self._set_node(path, value, datatype or get_datatype(value), stamp or get_timestamp())
+
+	def dp_set(self, path, value, create=True):
+		""" change DMS-key like a client would do (firing DMS-events), returns response as JSON object """
+		events_list = []
+		with self._lock:
+			resp = self._handle_set(None, {u'path': path, u'value': value, u'create': create}, events_list)[0]
+		self._send_events(events_list)
+		return resp
+
+	def load_tree(self, nodes_dict):
+		""" create many DMS-keys (key: DMS-key, value: value) """
+		stamp = get_timestamp()
+		with self._lock:
+			for path, value in nodes_dict.iteritems():
+				self._set_node(path, value, get_datatype(value), stamp)
+
+	def enable_history(self, path):
+		""" record trenddata of this DMS-key on every "set" command """
+		with self._lock:
+			if not path in self._history_dict:
+				self._history_dict[path] = []
+
+	def add_history(self, path, samples):
+		""" append trenddata (iterable of tuples (timestamp as datetime or ISO 8601 string, value)) """
+		with self._lock:
+			history_list = self._history_dict.setdefault(path, [])
+			for stamp, value in samples:
+				if not isinstance(stamp, datetime.datetime):
+					stamp = dateutil.parser.parse(stamp)
+				history_list.append((stamp, value))
+			history_list.sort(key=lambda item: item[0])
+
+	def add_changelog_group(self, group, paths):
+		""" protocol changes of these DMS-keys and their descendants in given changelog group """
+		with self._lock:
+			self._changelog_dict[group] = (list(paths), [])
+
+	def get_nof_subscriptions(self):
+		with self._lock:
+			return len(self._subs_dict)
+
+
+	# callbacks of WebSocketServer
+	def on_open(self, conn):
+		logger.debug('DMSEmulator.on_open(): new client ' + repr(conn.address))
+		with self._lock:
+			self._connections_set.add(conn)
+
+	def on_close(self, conn):
+		logger.debug('DMSEmulator.on_close(): client ' + repr(conn.address) + ' disconnected')
+		with self._lock:
+			self._connections_set.discard(conn)
+			for key in [key for key in self._subs_dict if key[0] is conn]:
+				del(self._subs_dict[key])
+
+	def on_message(self, conn, msg):
+		req_dict = json.loads(msg.decode('utf8'))
+		resp_frame = {}
+		# DMS-events caused by this request (list of tuples (_Subscription object, event as JSON object))
+		events_list = []
+		if u'tag' in req_dict:
+			# (used by tagless commands, e.g. "changelogGetGroups")
+			resp_frame[u'tag'] = req_dict[u'tag']
+		self.nof_requests += 1
+		with self._lock:
+			for cmd_type, handler_func in [(u'get', self._handle_get),
+			                               (u'set', self._handle_set),
+			                               (u'rename', self._handle_rename),
+			                               (u'delete', self._handle_delete),
+			                               (u'subscribe', self._handle_subscribe),
+			                               (u'unsubscribe', self._handle_unsubscribe),
+			                               (u'changelogGetGroups', self._handle_changelogGetGroups),
+			                               (u'changelogRead', self._handle_changelogRead)]:
+				if cmd_type in req_dict:
+					resp_list = []
+					for cmd_dict in req_dict[cmd_type]:
+						self.nof_commands += 1
+						try:
+							resp_list.extend(handler_func(conn, cmd_dict, events_list))
+						except Exception as ex:
+							logger.exception('DMSEmulator.on_message(): handling of "' + cmd_type + '" command failed')
+							resp_list.append({u'path': cmd_dict.get(u'path', u''),
+							                  u'code': u'error',
+							                  u'message': u'' + repr(ex),
+							                  u'tag': cmd_dict.get(u'tag', None)})
+					resp_frame[cmd_type] = resp_list
+		if self.response_delay:
+			time.sleep(self.response_delay)
+		conn.send(json.dumps(resp_frame))
+		self._send_events(events_list)
+
+
+	def _send_events(self, events_list):
+		# one frame per connection with all DMS-events of this request
+		# (outside of lock: a slow client must not block other clients)
+		frames_dict = {}
+		for sub, event_dict in events_list:
+			frames_dict.setdefault(sub.conn, []).append(event_dict)
+		for conn, events in frames_dict.items():
+			try:
+				conn.send(json.dumps({u'event': events}))
+				self.nof_events += len(events)
+			except (IOError, EnvironmentError):
+				logger.debug('DMSEmulator._send_events(): client ' + repr(conn.address) + ' is gone, DMS-events are lost')
+
+
+	def _fire(self, events_list, code, path, value=None, datatype=None, stamp=None, new_path=None):
+		# collecting DMS-events of all matching subscriptions
+		# (caller has to hold lock)
+		for sub in self._subs_dict.itervalues():
+			if sub.matches(code, path, value, datatype, stamp):
+				event_dict = {u'code': code,
+				              u'path': path,
+				              u'value': value,
+				              u'type': datatype,
+				              u'stamp': stamp,
+				              u'tag': sub.tag}
+				if new_path:
+					event_dict[u'newPath'] = new_path
+				events_list.append((sub, event_dict))
+
+
+	def _set_node(self, path, value, datatype, stamp):
+		# in DMS every parent exists as DMS-key (without value)
+		# (caller has to hold lock)
+		parent = dmsproxy.get_parent(path)
+		while parent and not self._get_node(parent):
+			self._mirror.set_node(parent, value=None, datatype=u'none', stamp=stamp)
+			parent = dmsproxy.get_parent(parent)
+		self._mirror.set_node(path, value=value, datatype=datatype, stamp=stamp)
+
+
+	def _get_node(self, path):
+		# (caller has to hold lock)
+		resp_list = self._mirror.get(path)
+		if resp_list[0][u'code'] == u'ok':
+			return resp_list[0]
+		return None
+
+
+	# handlers of commands
+	# (caller holds lock)
+	def _handle_get(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		path = cmd_dict[u'path']
+		query_dict = cmd_dict.get(u'query', None)
+		if query_dict:
+			# fields which can't be evaluated by DMSMirror
+			offline_dict = dict((key, val) for key, val in query_dict.items() if key in dmsquery.OFFLINE_FIELDS)
+			resp_list = self._mirror.get(path, offline_dict or {u'maxDepth': 0})
+			resp_list = [resp for resp in resp_list if resp[u'code'] != u'ok' or self._matches_dms_fields(resp[u'path'], query_dict)]
+			if not resp_list:
+				resp_list = [{u'path': path, u'code': u'not found'}]
+		else:
+			resp_list = self._mirror.get(path)
+
+		for resp in resp_list:
+			resp[u'tag'] = tag
+			if resp[u'code'] != u'ok':
+				continue
+			if u'histData' in cmd_dict:
+				resp[u'histData'] = self._get_histData(resp[u'path'], cmd_dict[u'histData'])
+			if u'changelog' in cmd_dict:
+				resp[u'changelog'] = self._get_changelog(resp[u'path'], cmd_dict[u'changelog'])
+		return resp_list
+
+
+	def _matches_dms_fields(self, path, query_dict):
+		# query fields which only DMS knows
+		if u'hasHistData' in query_dict and bool(query_dict[u'hasHistData']) != (path in self._history_dict):
+			return False
+		if u'hasChangelog' in query_dict and bool(query_dict[u'hasChangelog']) != bool(self._get_changelog_groups(path)):
+			return False
+		if u'hasAlarmData' in query_dict and query_dict[u'hasAlarmData']:
+			# FIXME: alarms are not emulated
+			return False
+		return True
+
+
+	def _get_histData(self, path, histData_dict):
+		start = dateutil.parser.parse(histData_dict[u'start'])
+		end = dateutil.parser.parse(histData_dict[u'end']) if u'end' in histData_dict else None
+		samples_list = []
+		# DMS includes samples at "start" and at "end"
+		for stamp, value in self._history_dict.get(path, ()):
+			if stamp >= start and (end is None or stamp <= end):
+				if histData_dict.get(u'format', u'compact') == u'detail':
+					samples_list.append({u'stamp': stamp.isoformat(), u'value': value, u'state': 0, u'rec': 0})
+				else:
+					samples_list.append({stamp.isoformat(): value})
+		return samples_list
+
+
+	def _get_changelog_groups(self, path):
+		groups_list = []
+		for group, (paths, entries_list) in self._changelog_dict.iteritems():
+			for base_path in paths:
+				if dmsproxy.is_in_subtree(base_path, path):
+					groups_list.append(group)
+					break
+		return groups_list
+
+
+	def _get_changelog(self, path, changelog_dict, group=None):
+		# protocol entries of one DMS-key (or of whole group)
+		start = dateutil.parser.parse(changelog_dict[u'start'])
+		end = dateutil.parser.parse(changelog_dict[u'end']) if changelog_dict.get(u'end', None) else None
+		if group:
+			groups_list = [group]
+		else:
+			groups_list = self._get_changelog_groups(path)
+		entries_list = []
+		for curr_group in groups_list:
+			for entry in self._changelog_dict[curr_group][1]:
+				if group or entry[u'path'] == path:
+					stamp = dateutil.parser.parse(entry[u'stamp'])
+					if stamp >= start and (end is None or stamp <= end):
+						entries_list.append(dict(entry))
+		entries_list.sort(key=lambda entry: entry[u'stamp'])
+		return entries_list
+
+
+	def _handle_set(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		path = cmd_dict[u'path']
+		value = cmd_dict[u'value']
+		old_node = self._get_node(path)
+		if not old_node and not cmd_dict.get(u'create', False):
+			return [{u'path': path, u'code': u'not found', u'tag': tag}]
+
+		datatype = cmd_dict.get(u'type', None)
+		if datatype:
+			value = as_datatype(value, datatype)
+		elif old_node and old_node[u'type'] != u'none':
+			# DMS keeps datatype of existing DMS-key
+			datatype = old_node[u'type']
+			value = as_datatype(value, datatype)
+		else:
+			datatype = get_datatype(value)
+		stamp = cmd_dict.get(u'stamp', None) or get_timestamp()
+		self._set_node(path, value, datatype, stamp)
+
+		if path in self._history_dict:
+			self._history_dict[path].append((dateutil.parser.parse(stamp), value))
+		for group in self._get_changelog_groups(path):
+			self._changelog_dict[group][1].append({u'path': path, u'stamp': stamp, u'text': u'' + unicode(value)})
+
+		if old_node:
+			self._fire(events_list, CODE_SET, path, value, datatype, stamp)
+			if old_node[u'value'] != value or old_node[u'type'] != datatype:
+				self._fire(events_list, CODE_CHANGE, path, value, datatype, stamp)
+		else:
+			self._fire(events_list, CODE_CREATE, path, value, datatype, stamp)
+		return [{u'path': path, u'code': u'ok', u'value': value, u'type': datatype, u'stamp': stamp, u'tag': tag}]
+
+
+	def _handle_rename(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		path = cmd_dict[u'path']
+		new_path = cmd_dict[u'newPath']
+		if not self._get_node(path):
+			return [{u'path': path, u'newPath': new_path, u'code': u'not found', u'tag': tag}]
+		if self._get_node(new_path):
+			return [{u'path': path, u'newPath': new_path, u'code': u'error', u'message': u'DMS-key "' + new_path + u'" already exists', u'tag': tag}]
+		self._mirror.rename_node(path, new_path)
+		self._fire(events_list, CODE_RENAME, path, stamp=get_timestamp(), new_path=new_path)
+		return [{u'path': path, u'newPath': new_path, u'code': u'ok', u'tag': tag}]
+
+
+	def _handle_delete(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		path = cmd_dict[u'path']
+		node = self._get_node(path)
+		if not node:
+			return [{u'path': path, u'code': u'not found', u'tag': tag}]
+		if node[u'hasChild'] and not cmd_dict.get(u'recursive', False):
+			return [{u'path': path, u'code': u'error', u'message': u'DMS-key has children, "recursive" is needed', u'tag': tag}]
+		self._mirror.del_node(path)
+		self._fire(events_list, CODE_DELETE, path, stamp=get_timestamp())
+		return [{u'path': path, u'code': u'ok', u'tag': tag}]
+
+
+	def _handle_subscribe(self, conn, cmd_dict, events_list):
+		# same path and tag replaces existing subscription
+		sub = _Subscription(conn, cmd_dict)
+		self._subs_dict[(conn, sub.tag)] = sub
+		resp = {u'path': sub.path, u'code': u'ok', u'tag': sub.tag}
+		if sub.query_dict:
+			resp[u'query'] = sub.query_dict
+		node = self._get_node(sub.path)
+		if node:
+			for key in (u'value', u'type', u'stamp'):
+				resp[key] = node[key]
+		return [resp]
+
+
+	def _handle_unsubscribe(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		if self._subs_dict.pop((conn, tag), None):
+			code = u'ok'
+		else:
+			code = u'not found'
+		return [{u'path': cmd_dict[u'path'], u'code': code, u'tag': tag}]
+
+
+	def _handle_changelogGetGroups(self, conn, cmd_dict, events_list):
+		# tagless command: response gets identified by tag of whole frame
+		return [{u'code': u'ok', u'groups': sorted(self._changelog_dict)}]
+
+
+	def _handle_changelogRead(self, conn, cmd_dict, events_list):
+		tag = cmd_dict.get(u'tag', None)
+		group = cmd_dict[u'group']
+		if not group in self._changelog_dict:
+			return [{u'group': group, u'code': u'not found', u'tag': tag}]
+		return [{u'group': group,
+		         u'code': u'ok',
+		         u'changelog': self._get_changelog(None, cmd_dict, group=group),
+		         u'tag': tag}]
+
+
+
+def main(listen_host, listen_port, nof_plcs):
+	""" running emulator with a small demo plant until <CTRL> + "C" """
+	emulator = DMSEmulator(host=listen_host, port=listen_port)
+	emulator.load_tree({u'System:Version:dms.exe': u'emulator'})
+	for plc in range(1, nof_plcs + 1):
+		plc_str = u'MSR{:02d}'.format(plc)
+		emulator.load_tree({plc_str + u':Allg:Status': 0,
+		                    plc_str + u':Allg:Temperatur': 20.0,
+		                    plc_str + u':Allg:OBJECT': u'BMO:Allgemein'})
+		emulator.enable_history(plc_str + u':Allg:Temperatur')
+	emulator.add_changelog_group(u'Hand', [u'MSR01'])
+	emulator.start()
+	print('DMS emulator is listening on TCP port ' + str(emulator.get_port()) + ' (path "System:Time" is updated every second)...')
+	print('=>usage hint: press <CTRL> + "C" for cancelling')
+	try:
+		while True:
+			time.sleep(1.0)
+			# a changing DMS-key for testing subscriptions
+			emulator.dp_set(u'System:Time', get_timestamp())
+	except KeyboardInterrupt:
+		pass
+	emulator.stop()
+	return 0
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Stand-in for DMS JSON Data Exchange (for tests and benchmarks without Visi.Plus).')
+	parser.add_argument('--listen_host', '-l', dest='listen_host', default=EMULATOR_HOST, type=str, help='listening address (default: ' + EMULATOR_HOST + ')')
+	parser.add_argument('--listen_port', '-p', dest='listen_port', default=EMULATOR_PORT, type=int, help='listening TCP port (default: ' + str(EMULATOR_PORT) + ')')
+	parser.add_argument('--nof_plcs', '-n', dest='nof_plcs', default=3, type=int, help='number of PLCs in demo plant (default: 3)')
+	args = parser.parse_args()
+
+	status = main(listen_host=args.listen_host, listen_port=args.listen_port, nof_plcs=args.nof_plcs)
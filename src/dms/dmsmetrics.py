@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmsmetrics.py
+
+Copyright (C) 2018 Stefan Braun
+
+built-in metrics of dms.dmswebsocket.DMSClient (for sizing DMS installations and finding slow tools):
+-latency histogram per command type ("get", "set", "subscribe", ...) and number of requests waiting for DMS response
+-WebSocket frames and bytes per second in each direction
+-depth of event queue, number of received DMS-events
+-execution time of Python callbacks per subscription
+
+pull API: DMSMetrics.get_stats() returns a dictionary,
+exporters: DMSMetrics.as_prometheus_text() and DMSMetrics.as_statsd_lines()
+(optionally served by PrometheusExporter via HTTP or pushed by StatsDExporter via UDP)
+
+example:
+	with dms.dmswebsocket.DMSClient(u'pyVisiToolkit', u'user') as dms_ws:
+		dms_ws.dp_get(path=u'System:Time')
+		print(dms_ws.get_metrics().as_prometheus_text())
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import BaseHTTPServer
+import bisect
+import socket
+import threading
+import time
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmsmetrics')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# upper bounds of histogram buckets in seconds
+# (DMS on localhost answers within milliseconds, huge "get" queries or trenddata could need seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# sliding window in seconds for frames and bytes per second
+RATE_WINDOW_SECS = 10
+
+# default prefix of exported metric names
+METRICS_PREFIX = u'dms_client'
+
+# exporters
+# =>metrics endpoint is only reachable from local machine, use host=u'' for serving it on all interfaces
+PROMETHEUS_HOST = u'127.0.0.1'
+PROMETHEUS_PORT = 9120
+STATSD_HOST = u'127.0.0.1'
+STATSD_PORT = 8125
+STATSD_INTERVAL = 10.0
+
+
+class Histogram(object):
+	""" cumulative histogram with fixed buckets (same semantics as Prometheus) """
+
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self._buckets = tuple(sorted(buckets))
+		# last counter is bucket "+Inf"
+		self._counts_list = [0] * (len(self._buckets) + 1)
+		self._lock = threading.Lock()
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+
+	def observe(self, value):
+		idx = bisect.bisect_left(self._buckets, value)
+		with self._lock:
+			self._counts_list[idx] += 1
+			self.count += 1
+			self.sum += value
+			if value > self.max:
+				self.max = value
+
+
+	def get_stats(self):
+		""" dictionary with count, sum, mean, max, estimated percentiles and cumulative buckets """
+		with self._lock:
+			counts_list = list(self._counts_list)
+			count = self.count
+			stats_dict = {u'count': count,
+			              u'sum': self.sum,
+			              u'mean': self.sum / count if count else 0.0,
+			              u'max': self.max}
+		cumulative_list = []
+		total = 0
+		for idx, bound in enumerate(self._buckets):
+			total += counts_list[idx]
+			cumulative_list.append((bound, total))
+		cumulative_list.append((float('inf'), count))
+		stats_dict[u'buckets'] = cumulative_list
+		for name, fraction in ((u'p50', 0.5), (u'p90', 0.9), (u'p99', 0.99)):
+			stats_dict[name] = self._get_percentile(cumulative_list, count, fraction, stats_dict[u'max'])
+		return stats_dict
+
+
+	@staticmethod
+	def _get_percentile(cumulative_list, count, fraction, max_value):
+		# estimation: upper bound of first bucket containing this fraction of all values
+		# (values in bucket "+Inf" are estimated by maximum)
+		if not count:
+			return 0.0
+		for bound, total in cumulative_list:
+			if total >= fraction * count:
+				return min(bound, max_value)
+		return max_value
+
+
+
+class RateMeter(object):
+	""" total amount and rate per second over the last "window_secs" seconds """
+	# =>one counter per second in a ring buffer, no list of timestamps growing under load
+
+	def __init__(self, window_secs=RATE_WINDOW_SECS):
+		self._window_secs = window_secs
+		self._slots_list = [0] * window_secs
+		self._slot_secs_list = [0] * window_secs
+		self._lock = threading.Lock()
+		self._started = time.time()
+		self.total = 0
+
+
+	def add(self, amount=1):
+		curr_sec = int(time.time())
+		idx = curr_sec % self._window_secs
+		with self._lock:
+			if self._slot_secs_list[idx] != curr_sec:
+				self._slot_secs_list[idx] = curr_sec
+				self._slots_list[idx] = 0
+			self._slots_list[idx] += amount
+			self.total += amount
+
+
+	def get_rate(self):
+		""" average per second over last completed seconds of window """
+		now = time.time()
+		curr_sec = int(now)
+		with self._lock:
+			amount = 0
+			for idx in range(self._window_secs):
+				# current second is not over yet, its slot is reused after "window_secs" seconds
+				if curr_sec - self._window_secs < self._slot_secs_list[idx] < curr_sec:
+					amount += self._slots_list[idx]
+		# shorter timespan shortly after start
+		timespan = min(self._window_secs - 1, max(1, curr_sec - int(self._started)))
+		return float(amount) / timespan
+
+
+
+class DMSMetrics(object):
+	""" registry of all metrics of one DMSClient """
+	# =>updated by _MessageHandler (WebSocket thread and caller threads) and _SubscriptionES_Dispatcher (worker threads),
+	#   every recording is only a few dictionary operations under a short lock
+
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self._buckets = buckets
+		self._lock = threading.Lock()
+
+		# latency per command type (key: command type, value: Histogram object)
+		self._latency_dict = {}
+		# requests waiting for DMS response (key: tag, value: tuple (command type, timestamp of sending))
+		self._inflight_dict = {}
+		self.nof_timeouts = 0
+		self.nof_failed = 0
+		self.max_inflight = 0
+
+		self.frames_sent = RateMeter()
+		self.bytes_sent = RateMeter()
+		self.frames_received = RateMeter()
+		self.bytes_received = RateMeter()
+		self.events_received = RateMeter()
+
+		# callback execution time per subscription (key: tag, value: tuple (DMS-key, Histogram object))
+		self._callback_dict = {}
+
+		# gauges evaluated when metrics are pulled (key: name, value: function returning a number)
+		self._gauges_dict = {}
+
+
+	def add_gauge(self, name, func):
+		""" register function for a value which is only read on demand (e.g. size of event queue) """
+		with self._lock:
+			self._gauges_dict[name] = func
+
+
+	# recording
+	def frame_sent(self, nof_bytes):
+		self.frames_sent.add()
+		self.bytes_sent.add(nof_bytes)
+
+	def frame_received(self, nof_bytes):
+		self.frames_received.add()
+		self.bytes_received.add(nof_bytes)
+
+	def event_received(self):
+		self.events_received.add()
+
+	def request_sent(self, tag, cmd_type):
+		with self._lock:
+			self._inflight_dict[tag] = (cmd_type, time.time())
+			if len(self._inflight_dict) > self.max_inflight:
+				self.max_inflight = len(self._inflight_dict)
+
+	def request_done(self, tag):
+		now = time.time()
+		with self._lock:
+			try:
+				cmd_type, started = self._inflight_dict.pop(tag)
+			except KeyError:
+				# response of a discarded request or without our tag
+				return
+			histogram = self._latency_dict.get(cmd_type, None)
+			if not histogram:
+				histogram = self._latency_dict[cmd_type] = Histogram(self._buckets)
+		histogram.observe(now - started)
+
+	def request_discarded(self, tag, is_timeout=False):
+		""" nobody waits any longer for this response """
+		with self._lock:
+			if self._inflight_dict.pop(tag, None) and is_timeout:
+				self.nof_timeouts += 1
+
+	def requests_failed(self):
+		""" connection is lost: no pending request will get a response """
+		with self._lock:
+			self.nof_failed += len(self._inflight_dict)
+			self._inflight_dict.clear()
+
+	def callback_done(self, tag, path, duration_secs):
+		with self._lock:
+			try:
+				histogram = self._callback_dict[tag][1]
+			except KeyError:
+				histogram = Histogram(self._buckets)
+				self._callback_dict[tag] = (path, histogram)
+		histogram.observe(duration_secs)
+
+	def forget_subscription(self, tag):
+		with self._lock:
+			self._callback_dict.pop(tag, None)
+
+
+	# pull API
+	def get_inflight(self):
+		""" number of requests waiting for DMS response """
+		with self._lock:
+			return len(self._inflight_dict)
+
+
+	def get_stats(self):
+		""" all metrics as nested dictionary """
+		with self._lock:
+			latency_items = self._latency_dict.items()
+			callback_items = self._callback_dict.items()
+			gauge_items = self._gauges_dict.items()
+			stats_dict = {u'inflight': len(self._inflight_dict),
+			              u'max_inflight': self.max_inflight,
+			              u'timeouts': self.nof_timeouts,
+			              u'failed': self.nof_failed}
+
+		stats_dict[u'latency'] = dict((cmd_type, histogram.get_stats()) for cmd_type, histogram in latency_items)
+		stats_dict[u'callbacks'] = dict((tag, dict(histogram.get_stats(), path=path)) for tag, (path, histogram) in callback_items)
+		for name in (u'frames_sent', u'bytes_sent', u'frames_received', u'bytes_received', u'events_received'):
+			meter = getattr(self, name)
+			stats_dict[name] = {u'total': meter.total, u'per_sec': meter.get_rate()}
+		for name, func in gauge_items:
+			try:
+				stats_dict[name] = func()
+			except Exception:
+				logger.exception('DMSMetrics.get_stats(): evaluation of gauge "' + name + '" failed')
+		return stats_dict
+
+
+	def get_slowest_callbacks(self, nof=10):
+		""" list of tuples (DMS-key, tag, histogram statistics) ordered by total execution time """
+		callbacks_dict = self.get_stats()[u'callbacks']
+		items_list = [(stats[u'path'], tag, stats) for tag, stats in callbacks_dict.items()]
+		items_list.sort(key=lambda item: item[2][u'sum'], reverse=True)
+		return items_list[:nof]
+
+
+	# exporters
+	def as_prometheus_text(self, prefix=METRICS_PREFIX):
+		""" Prometheus text exposition format (version 0.0.4) """
+		stats_dict = self.get_stats()
+		lines = []
+
+		def add_histogram(name, help_str, label_dicts_list):
+			lines.append(u'# HELP ' + prefix + u'_' + name + u' ' + help_str)
+			lines.append(u'# TYPE ' + prefix + u'_' + name + u' histogram')
+			for labels_dict, hist_stats in label_dicts_list:
+				for bound, total in hist_stats[u'buckets']:
+					le_str = u'+Inf' if bound == float('inf') else repr(bound)
+					lines.append(prefix + u'_' + name + u'_bucket' + _as_labels(dict(labels_dict, le=le_str)) + u' ' + str(total))
+				lines.append(prefix + u'_' + name + u'_sum' + _as_labels(labels_dict) + u' ' + _as_number(hist_stats[u'sum']))
+				lines.append(prefix + u'_' + name + u'_count' + _as_labels(labels_dict) + u' ' + str(hist_stats[u'count']))
+
+		def add_value(name, metric_type, help_str, value):
+			lines.append(u'# HELP ' + prefix + u'_' + name + u' ' + help_str)
+			lines.append(u'# TYPE ' + prefix + u'_' + name + u' ' + metric_type)
+			lines.append(prefix + u'_' + name + u' ' + _as_number(value))
+
+		add_histogram(u'request_latency_seconds', u'Time between sending a command and receiving its response.',
+		              [({u'command': cmd_type}, hist_stats) for cmd_type, hist_stats in sorted(stats_dict[u'latency'].items())])
+		add_histogram(u'callback_duration_seconds', u'Execution time of Python callbacks per subscription.',
+		              [({u'path': hist_stats[u'path'], u'tag': tag}, hist_stats) for tag, hist_stats in sorted(stats_dict[u'callbacks'].items())])
+		add_value(u'requests_inflight', u'gauge', u'Requests waiting for DMS response.', stats_dict[u'inflight'])
+		add_value(u'requests_timeout_total', u'counter', u'Requests without response within timeout.', stats_dict[u'timeouts'])
+		add_value(u'requests_failed_total', u'counter', u'Requests lost by WebSocket disconnection.', stats_dict[u'failed'])
+		for name in (u'frames_sent', u'bytes_sent', u'frames_received', u'bytes_received', u'events_received'):
+			add_value(name + u'_total', u'counter', u'Total number of ' + name.replace(u'_', u' ') + u'.', stats_dict[name][u'total'])
+			add_value(name + u'_per_second', u'gauge', u'Rate of ' + name.replace(u'_', u' ') + u' over last ' + str(RATE_WINDOW_SECS) + u' seconds.', stats_dict[name][u'per_sec'])
+		for name in sorted(self._gauges_dict):
+			if name in stats_dict:
+				add_value(name, u'gauge', u'Current value of ' + name.replace(u'_', u' ') + u'.', stats_dict[name])
+		return u'\n'.join(lines) + u'\n'
+
+
+	def as_statsd_lines(self, prefix=METRICS_PREFIX):
+		""" list of StatsD gauge lines (e.g. "dms_client.latency.get.p99:0.0042|g") """
+		stats_dict = self.get_stats()
+		lines = []
+
+		def add_gauge(name, value):
+			lines.append(prefix + u'.' + name + u':' + _as_number(value) + u'|g')
+
+		for cmd_type, hist_stats in sorted(stats_dict[u'latency'].items()):
+			for field in (u'count', u'mean', u'p50', u'p90', u'p99', u'max'):
+				add_gauge(u'latency.' + cmd_type + u'.' + field, hist_stats[field])
+		for tag, hist_stats in sorted(stats_dict[u'callbacks'].items()):
+			# DMS-keys contain ":", which is a separator in StatsD
+			name = hist_stats[u'path'].replace(u':', u'.') or u'root'
+			for field in (u'count', u'sum', u'max'):
+				add_gauge(u'callbacks.' + name + u'.' + field, hist_stats[field])
+		for name in (u'inflight', u'timeouts', u'failed'):
+			add_gauge(u'requests.' + name, stats_dict[name])
+		for name in (u'frames_sent', u'bytes_sent', u'frames_received', u'bytes_received', u'events_received'):
+			add_gauge(name + u'.total', stats_dict[name][u'total'])
+			add_gauge(name + u'.per_sec', stats_dict[name][u'per_sec'])
+		for name in sorted(self._gauges_dict):
+			if name in stats_dict:
+				add_gauge(name, stats_dict[name])
+		return lines
+
+
+
+def _as_number(value):
+	# repr() keeps all digits of floats, but would append "L" to long integers
+	if isinstance(value, float):
+		return repr(value)
+	return str(value)
+
+
+def _as_labels(labels_dict):
+	# Prometheus labels: backslash, doublequote and linefeed have to be escaped
+	if not labels_dict:
+		return u''
+	items_list = []
+	for key in sorted(labels_dict):
+		value = u'' + labels_dict[key]
+		value = value.replace(u'\\', u'\\\\').replace(u'"', u'\\"').replace(u'\n', u'\\n')
+		items_list.append(key + u'="' + value + u'"')
+	return u'{' + u','.join(items_list) + u'}'
+
+
+
+class PrometheusExporter(object):
+	""" serving DMSMetrics in background thread via HTTP (any URL path returns metrics) """
+
+	def __init__(self, metrics, host=PROMETHEUS_HOST, port=PROMETHEUS_PORT, prefix=METRICS_PREFIX):
+		class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = metrics.as_prometheus_text(prefix=prefix).encode('utf8')
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				logger.debug('PrometheusExporter: ' + (format % args))
+
+		self._httpd = BaseHTTPServer.HTTPServer((host, port), _Handler)
+		self._thread = threading.Thread(target=self._httpd.serve_forever)
+		self._thread.daemon = True
+
+	def get_port(self):
+		return self._httpd.server_address[1]
+
+	def start(self):
+		self._thread.start()
+		logger.info('PrometheusExporter: serving metrics on TCP port ' + str(self.get_port()) + '...')
+
+	def stop(self):
+		self._httpd.shutdown()
+		self._httpd.server_close()
+
+
+
+class StatsDExporter(threading.Thread):
+	""" pushing DMSMetrics periodically as StatsD gauges via UDP """
+
+	def __init__(self, metrics, host=STATSD_HOST, port=STATSD_PORT, interval=STATSD_INTERVAL, prefix=METRICS_PREFIX):
+		super(StatsDExporter, self).__init__()
+		self.daemon = True
+		self._metrics = metrics
+		self._address = (host, port)
+		self._interval = interval
+		self._prefix = prefix
+		self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self._stopped = threading.Event()
+
+	def push(self):
+		# several lines per datagram, but staying below usual MTU
+		datagram_lines = []
+		datagram_len = 0
+		for line in self._metrics.as_statsd_lines(prefix=self._prefix):
+			line = line.encode('utf8')
+			if datagram_lines and datagram_len + len(line) > 1400:
+				self._sock.sendto('\n'.join(datagram_lines), self._address)
+				datagram_lines = []
+				datagram_len = 0
+			datagram_lines.append(line)
+			datagram_len += len(line) + 1
+		if datagram_lines:
+			self._sock.sendto('\n'.join(datagram_lines), self._address)
+
+	def run(self):
+		while not self._stopped.wait(self._interval):
+			try:
+				self.push()
+			except Exception:
+				logger.exception('StatsDExporter.run(): sending metrics failed')
+
+	def stop(self):
+		self._stopped.set()
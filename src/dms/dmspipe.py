@@ -143,6 +143,52 @@ class MESSAGE(ctypes.Union):
 
 
 
+# ctypes prototypes of all used functions in pmospipe.dll
+# =>bound once when loading DLL (assigning "argtypes" and "restype" on every call costs time)
+_PMOSPIPE_PROTOTYPES = {
+	'DMS_ConnectEx':        ([ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)], ctypes.c_int),
+	'DMS_CloseEx':          ([ctypes.c_int], ctypes.c_bool),
+	'DMS_ReadSTREx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+	'DMS_ReadTypeEx':       ([ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
+	'DMS_FindMessageEx':    ([ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
+	'DMS_FindNextMessage':  ([ctypes.POINTER(MESSAGE)], ctypes.c_char_p),
+	'DMS_GetNamesEx':       ([ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
+	'DMS_GetNextNameEx':    ([ctypes.POINTER(ctypes.c_int)], ctypes.c_char_p),
+	'DMS_GetRightsEx':      ([ctypes.c_int, ctypes.c_char_p], ctypes.c_char),
+	'DMS_SetRightsEx':      ([ctypes.c_int, ctypes.c_char_p, ctypes.c_char], ctypes.c_char),
+	'DMS_CreateEx':         ([ctypes.c_int, ctypes.c_char_p, ctypes.c_char], ctypes.c_int),
+	'DMS_CreatePointEx':    ([ctypes.c_int, ctypes.c_char_p, ctypes.c_char, ctypes.c_char], ctypes.c_int),
+	'DMS_DeleteEx':         ([ctypes.c_int, ctypes.c_char_p], ctypes.c_int),
+	'DMS_WriteBITEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_bool], ctypes.c_int),
+	'DMS_WriteBYSEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_byte], ctypes.c_int),
+	'DMS_WriteWOSEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_int16], ctypes.c_int),
+	'DMS_WriteDWSEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_int32], ctypes.c_int),
+	'DMS_WriteBYUEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_ubyte], ctypes.c_int),
+	'DMS_WriteWOUEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_uint16], ctypes.c_int),
+	'DMS_WriteDWUEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32], ctypes.c_int),
+	'DMS_WriteFLTEx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_double], ctypes.c_int),
+	'DMS_WriteSTREx':       ([ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+	'DMS_ReadBITEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_bool)], ctypes.c_int),
+	'DMS_ReadBYSEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_byte)], ctypes.c_int),
+	'DMS_ReadWOSEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int16)], ctypes.c_int),
+	'DMS_ReadDWSEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int32)], ctypes.c_int),
+	'DMS_ReadBYUEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_ubyte)], ctypes.c_int),
+	'DMS_ReadWOUEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint16)], ctypes.c_int),
+	'DMS_ReadDWUEx':        ([ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint32)], ctypes.c_int),
+}
+
+
+def _bind_prototypes(dll):
+	""" set argtypes and restype of all used DLL functions """
+	# =>replacement objects for pmospipe.dll (e.g. benchmarks on systems without Visi.Plus(c))
+	#   are plain Python objects, they don't need prototypes
+	if isinstance(dll, ctypes.CDLL):
+		for func_name, (argtypes, restype) in _PMOSPIPE_PROTOTYPES.items():
+			func = getattr(dll, func_name)
+			func.argtypes = argtypes
+			func.restype = restype
+
+
 class Dmspipe(object):
 	"""
 	Access to a running DMS by pmospipe.dll via "Access functions" ("DMS_*")
@@ -150,19 +196,36 @@ class Dmspipe(object):
 	# FIXME: implement callback function (e.g. message handler for change events of datapoints)
 	# (perhaps implementing in another Class because callback-function prototype uses "ctypes.cdll.*" instead of "ctypes.windll.*"?)
 	"""
-	def __init__(self, pipe_name_str=r'\\.\pipe\PROMOS-DMS'):
+	def __init__(self, pipe_name_str=r'\\.\pipe\PROMOS-DMS', dll=None):
+		# optional argument "dll": object with same interface as pmospipe.dll
+		# (e.g. simulated DMS in dms.dmspipe_benchmark)
 		self.func_result = 0
-		# FIXME: how to handle execution on systems without Visi.Plus(c)? ...
-		dll_path = misc.visi_binaries.get_fullpath()
-		if DEBUGGING:
-			print('dll_path=' + dll_path)
-		os.chdir(dll_path)
-		self.pmospipe = ctypes.windll.LoadLibrary('pmospipe.dll')
+		if dll:
+			self.pmospipe = dll
+		else:
+			# FIXME: how to handle execution on systems without Visi.Plus(c)? ...
+			dll_path = misc.visi_binaries.get_fullpath()
+			if DEBUGGING:
+				print('dll_path=' + dll_path)
+			os.chdir(dll_path)
+			self.pmospipe = ctypes.windll.LoadLibrary('pmospipe.dll')
+		_bind_prototypes(self.pmospipe)
+
+		# mapping to right read function for given DMS type
+		self._readfunc_dict = {
+				1:	self.pyDMS_ReadBITEx,
+				2:	self.pyDMS_ReadBYSEx,
+				3:	self.pyDMS_ReadWOSEx,
+				4:	self.pyDMS_ReadDWSEx,
+				5:	self.pyDMS_ReadBYUEx,
+				6:	self.pyDMS_ReadWOUEx,
+				7:	self.pyDMS_ReadDWUEx,
+				8:	self.pyDMS_ReadFLTEx,
+				9:  self.pyDMS_ReadSTREx
+		}
 
 		if DEBUGGING:
 			print('pipe_name_str=' + pipe_name_str)
-		self.pmospipe.DMS_ConnectEx.argtypes = [ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
-		self.pmospipe.DMS_ConnectEx.restype = ctypes.c_int
 		self.handle = ctypes.c_int(0)
 		self.func_result = self.pmospipe.DMS_ConnectEx(pipe_name_str, ctypes.byref(self.handle))
 		assert self.handle.value != 0, u'unable to connect to DMS with argument "' + pipe_name_str + u'", is Visi.Plus(c) running?'
@@ -170,8 +233,6 @@ class Dmspipe(object):
 			print('self.handle = ' + str(self.handle) + ', self.func_result = ' + str(self.func_result))
 
 	def __del__(self):
-		self.pmospipe.DMS_CloseEx.argtypes = [ctypes.c_int]
-		self.pmospipe.DMS_CloseEx.restype = ctypes.c_bool
 		self.pmospipe.DMS_CloseEx(self.handle)
 
 	def get_last_errorcode(self):
@@ -188,16 +249,12 @@ class Dmspipe(object):
 	def pyDMS_ReadSTREx(self, datapoint_str):
 		# self.func_result == 0 when successfully read STR datapoint
 		# (it's possible to read EVERY datapoint type with this function, but then self.func_result == -6)
-		self.pmospipe.DMS_ReadSTREx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p]
-		self.pmospipe.DMS_ReadSTREx.restype = ctypes.c_int
 		curr_string = ctypes.create_string_buffer(255)
 		self.func_result = self.pmospipe.DMS_ReadSTREx(self.handle, datapoint_str, curr_string)
 		return curr_string.value
 
 	def pyDMS_ReadTypeEx(self, datapoint_str):
 		# pyDMS_ReadTypeEx() returns -0x5 when datapoint is not in DMS
-		self.pmospipe.DMS_ReadTypeEx.argtypes = [ctypes.c_int, ctypes.c_char_p]
-		self.pmospipe.DMS_ReadTypeEx.restype = ctypes.c_int
 		numeric_type = self.pmospipe.DMS_ReadTypeEx(self.handle, datapoint_str)
 		return numeric_type
 
@@ -210,8 +267,6 @@ class Dmspipe(object):
 			'MSR01:Allg:Alarm01:ESchema' doesn't match the existing key
 		(according to documentation the only wildcard search '*' hits EVERY datapoint)
 		"""
-		self.pmospipe.DMS_FindMessageEx.argtypes = [ctypes.c_int, ctypes.c_char_p]
-		self.pmospipe.DMS_FindMessageEx.restype = ctypes.c_int
 		num_of_dps_int = self.pmospipe.DMS_FindMessageEx(self.handle, search_str)
 		return num_of_dps_int
 
@@ -221,8 +276,6 @@ class Dmspipe(object):
 		=>there isn't a function "DMS_FindNextMessageEx()" in "pmospipe.dll"...
 		 =>call this function so many times as there were search results (according to return value of "DMS_FindMessage()")
 		"""
-		self.pmospipe.DMS_FindNextMessage.argtypes = [ctypes.POINTER(MESSAGE)]
-		self.pmospipe.DMS_FindNextMessage.restype = ctypes.c_char_p
 		curr_msg = MESSAGE()
 		dp_name_str = self.pmospipe.DMS_FindNextMessage(ctypes.byref(curr_msg))
 		return (dp_name_str, curr_msg)
@@ -266,8 +319,6 @@ class Dmspipe(object):
 		searches all sons of a DMS key
 		(search results were retrieved by pyDMS_GetNextNameEx())
 		"""
-		self.pmospipe.DMS_GetNamesEx.argtypes = [ctypes.c_int, ctypes.c_char_p]
-		self.pmospipe.DMS_GetNamesEx.restype = ctypes.c_int
 		self.func_result = self.pmospipe.DMS_GetNamesEx(self.handle, datapoint_str)
 
 	def pyDMS_GetNextNameEx(self):
@@ -283,8 +334,6 @@ class Dmspipe(object):
 		-when all available children were already returned, then further calling of this function returns empty strings,
 		 further calls then get 'ERROR! > 300 Names'
 		"""
-		self.pmospipe.DMS_GetNextNameEx.argtypes = [ctypes.POINTER(ctypes.c_int)]
-		self.pmospipe.DMS_GetNextNameEx.restype = ctypes.c_char_p
 
 		has_grandchildren_cint = ctypes.c_int(0)
 		curr_son_name = self.pmospipe.DMS_GetNextNameEx(ctypes.byref(has_grandchildren_cint))
@@ -297,73 +346,109 @@ class Dmspipe(object):
 		returns all sons of a DMS node
 		(a handy wrapper for pyDMS_GetNamesEx() and all necessary calls to pyDMS_GetNextNameEx())
 		"""
-		my_key_list = []
 		if datapoint_str == '' or self.is_dp_available(datapoint_str):
-			self.pyDMS_GetNamesEx(datapoint_str)
-			curr_nof_loops = 0
-			get_next_child = True
-			while get_next_child and curr_nof_loops < 1000: # FIXME: replace this magic number with correct amount of maximal allowed sons per node...
-				curr_nof_loops = curr_nof_loops + 1
-				son_name, has_grandchildren = self.pyDMS_GetNextNameEx()
-				if son_name != '' and son_name != 'ERROR! > 300 Names':
-					my_key_list.append((son_name, has_grandchildren))
-				else:
-					get_next_child = False
+			return self._get_sons_list(datapoint_str)
+		return []
+
+
+	def _get_sons_list(self, datapoint_str):
+		# without check of existence
+		# =>DLL keeps state of search, therefore all sons have to be retrieved before next call of pyDMS_GetNamesEx()
+		my_key_list = []
+		self.pyDMS_GetNamesEx(datapoint_str)
+		curr_nof_loops = 0
+		get_next_child = True
+		while get_next_child and curr_nof_loops < 1000: # FIXME: replace this magic number with correct amount of maximal allowed sons per node...
+			curr_nof_loops = curr_nof_loops + 1
+			son_name, has_grandchildren = self.pyDMS_GetNextNameEx()
+			if son_name != '' and son_name != 'ERROR! > 300 Names':
+				my_key_list.append((son_name, has_grandchildren))
+			else:
+				get_next_child = False
 		return my_key_list
 
 
+	def walk_DMS_subtree(self, datapoint_str, with_values=True, with_rights=False):
+		"""
+		generator: iterates through DMS subtree (depth-first, parent node first, same order as DMS delivers sons)
+		yields tuples (DMS key, numeric DMS type, value, access rights)
+		=>with_values=False: type and value are None (only DLL calls for names, fastest way for getting all DMS keys)
+		=>with_rights=False: access rights are None
+		=>nodes without value have type 0 and value None
+
+		(iterative with own stack instead of recursion: no nested lists, memory usage depends on depth of tree)
+		"""
+		if datapoint_str != '' and not self.is_dp_available(datapoint_str):
+			return
+
+		readfunc_dict = self._readfunc_dict
+		# stack of tuples (DMS key, flag "has sons")
+		stack = [(datapoint_str, True)]
+		while stack:
+			curr_key, has_sons = stack.pop()
+			if with_values:
+				curr_type = self.pyDMS_ReadTypeEx(curr_key)
+				if curr_type in readfunc_dict:
+					curr_val = readfunc_dict[curr_type](curr_key)
+					curr_rights = self.pyDMS_GetRightsEx(curr_key) if with_rights else None
+				else:
+					curr_type = 0
+					curr_val = None
+					curr_rights = None
+			else:
+				curr_type = None
+				curr_val = None
+				curr_rights = self.pyDMS_GetRightsEx(curr_key) if with_rights else None
+			yield (curr_key, curr_type, curr_val, curr_rights)
+
+			if has_sons:
+				# pushing in reversed order: first son gets processed next
+				if curr_key == '':
+					prefix = ''
+				else:
+					prefix = curr_key + ':'
+				sons_list = self._get_sons_list(curr_key)
+				for son_name, has_grandchildren in reversed(sons_list):
+					stack.append((prefix + son_name, has_grandchildren))
+
+
 	def get_DMS_subtree_list_by_key(self, datapoint_str):
 		"""
-		searches recursively trough DMS subtree and returns all DMS datapoints in a list of strings
+		searches trough DMS subtree and returns all DMS datapoints in a list of strings
 
 		(remark: this function returns ALL nodes...
 		 parent nodes without value (DMS-type == None) weren't included into *.dms exportfiles of DMS.exe,
 		 for this behaving you should check "self.pyDMS_ReadTypeEx(datapoint_str) != 0" before appending parent node!)
 		"""
-		myList = []
+		# (for compatibility: given node is always included, even when it doesn't exist)
+		key_list = [item[0] for item in self.walk_DMS_subtree(datapoint_str, with_values=False)]
+		return key_list or [datapoint_str]
 
-		# include parent node itself
-		myList.append(datapoint_str)
 
-		for child in self.get_DMS_sons_list_by_key(datapoint_str):
-			curr_child, has_grandchildren = child
-			dms_key_of_child = datapoint_str + ':' + curr_child
-			if has_grandchildren:
-				subnodes_list = self.get_DMS_subtree_list_by_key(dms_key_of_child)
-				myList.extend(subnodes_list)
-			else:
-				myList.append(dms_key_of_child)
-		return myList
+	def get_DMS_subtree_snapshot(self, datapoint_str):
+		"""
+		reads whole DMS subtree at once, returns compact snapshot as dictionary
+		key: DMS key, value: tuple (numeric DMS type, value)
+		(nodes without value have type 0 and value None)
+		"""
+		snapshot_dict = {}
+		for curr_key, curr_type, curr_val, curr_rights in self.walk_DMS_subtree(datapoint_str):
+			snapshot_dict[curr_key] = (curr_type, curr_val)
+		return snapshot_dict
 
 
-	def get_serialized_dms_format(self, parent_node_str):
-		'''
-		returns a string containing all child nodes of given DMS key in their serialised format (as used in DMS import/export files)
+	def iter_serialized_dms_lines(self, parent_node_str):
+		"""
+		generator: yields all DMS keys of given subtree in their serialised format (as used in DMS import/export files)
+		(unicode strings without line separator, empty nodes are omitted)
 		FIXME: rewrite and use our dms.datapoint.Dp class for more portability and replace "magic numbers"
-		'''
-
-		# call right read function for given DMS type
-		readfunc_dict = {
-				1:	self.pyDMS_ReadBITEx,
-				2:	self.pyDMS_ReadBYSEx,
-				3:	self.pyDMS_ReadWOSEx,
-				4:	self.pyDMS_ReadDWSEx,
-				5:	self.pyDMS_ReadBYUEx,
-				6:	self.pyDMS_ReadWOUEx,
-				7:	self.pyDMS_ReadDWUEx,
-				8:	self.pyDMS_ReadFLTEx,
-				9:  self.pyDMS_ReadSTREx
-		}
-		serialised_list = []
-
-		for key in self.get_DMS_subtree_list_by_key(parent_node_str):
-			curr_type = self.pyDMS_ReadTypeEx(key)
-			if curr_type in readfunc_dict:
-				curr_type_str = dms.datapoint.Dms_dp_Factory.dp_numeric_types_dict[curr_type]
-				curr_val = readfunc_dict[curr_type](key)
+		"""
+		types_dict = dms.datapoint.Dms_dp_Factory.dp_numeric_types_dict
+		for key, curr_type, curr_val, curr_rights in self.walk_DMS_subtree(parent_node_str, with_rights=True):
+			if curr_type:
+				curr_type_str = types_dict[curr_type]
 
 				# FIXME: access rights do work this way, but we should implement a more elegant solution in "dms.datapoint.Dp"...
-				curr_rights = self.pyDMS_GetRightsEx(key)
 				if curr_rights & dms.datapoint.Dp.READ_WRITE:
 					curr_rights_str = 'RW'
 				else:
@@ -387,12 +472,17 @@ class Dmspipe(object):
 					curr_val_str = str(curr_val)
 
 				# handling all strings as unicode strings =>decode strings which could contain Umlaut
-				curr_line_str = ';'.join([key,
-				                          curr_type_str,
-				                          curr_val_str.decode(ENCODING),
-				                          curr_rights_str])
-				serialised_list.append(curr_line_str)
-		return '\n'.join(serialised_list)
+				yield ';'.join([key,
+				                curr_type_str,
+				                curr_val_str.decode(ENCODING),
+				                curr_rights_str])
+
+
+	def get_serialized_dms_format(self, parent_node_str):
+		"""
+		returns a string containing all child nodes of given DMS key in their serialised format (as used in DMS import/export files)
+		"""
+		return '\n'.join(self.iter_serialized_dms_lines(parent_node_str))
 
 
 	def write_DMS_subtree_serialization(self, datapoint_str, file_fullpath_str):
@@ -400,10 +490,9 @@ class Dmspipe(object):
 		exports a DMS subtree in DMS exportformat (*.dms) into a file
 		Only difference to files exported by DMS.exe: sorting of the DMS-keys...
 
-		FIXME: This function works as expected, but is very slow because of many DMS read access via DLL...
-		=>what about multithreading? (complicated and non-trivial....)
-		=>what about caching read accesses, with flag "read uncached" and a timestamp for obsolete values?
-		=>what about background read-ahead cache? (complicated and non-trivial....)
+		every DMS key is written immediately while walking through DMS
+		=>execution time grows linear with number of DMS keys, no huge string in memory
+		(it's still slow because of three DLL calls per DMS key: type, value and access rights)
 
 		(remark: difference to get_DMS_subtree_list_by_key(): DMS serialization export format doesn't contain empty nodes)
 		"""
@@ -414,7 +503,10 @@ class Dmspipe(object):
 			# remark: when file opened with 'w', then '\n' get's converted into platform specific line separator
 			#   This tool writes '\r\n' as difference to DMS.exe...
 			#   DMS.exe exports always with 'line feed' =>we should open textfile in binary mode and write encoded string to file...
-			f.write(self.get_serialized_dms_format(datapoint_str))
+			line_sep = u''
+			for line in self.iter_serialized_dms_lines(datapoint_str):
+				f.write(line_sep + line)
+				line_sep = u'\n'
 			if DEBUGGING:
 				print('\twrote file "' + file_fullpath_str + '"...')
 
@@ -425,8 +517,6 @@ class Dmspipe(object):
 		(returned value: ASCII ordinal number from c_char, in python a one character string)
 		=>for proper interpretation consult dms.datapoint.Dp
 		"""
-		self.pmospipe.DMS_GetRightsEx.argtypes = [ctypes.c_int, ctypes.c_char_p]
-		self.pmospipe.DMS_GetRightsEx.restype = ctypes.c_char
 		rights_str = self.pmospipe.DMS_GetRightsEx(self.handle, datapoint_str)
 		rights_int = ord(rights_str[0])
 		return rights_int
@@ -440,8 +530,6 @@ class Dmspipe(object):
 
 		return value: new access rights of this datapoint =>same as pyDMS_GetRightsEx()
 		"""
-		self.pmospipe.DMS_SetRightsEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char]
-		self.pmospipe.DMS_SetRightsEx.restype = ctypes.c_char
 
 		rights_onechar = chr(rights_int)[0]
 		new_rights_str = self.pmospipe.DMS_SetRightsEx(self.handle, datapoint_str, ctypes.c_char(rights_onechar))
@@ -450,16 +538,12 @@ class Dmspipe(object):
 
 
 	def pyDMS_CreateEx(self, datapoint_str, type_int):
-		self.pmospipe.DMS_CreateEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char]
-		self.pmospipe.DMS_CreateEx.restype = ctypes.c_int
 		type_onechar = chr(type_int)
 		# if DEBUGGING:
 		# 	print('type_onechar: ' + str(ord(type_onechar)))
 		self.func_result = self.pmospipe.DMS_CreateEx(self.handle, datapoint_str, type_onechar)
 
 	def pyDMS_CreatePointEx(self, datapoint_str, type_int, rights_int):
-		self.pmospipe.DMS_CreatePointEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char, ctypes.c_char]
-		self.pmospipe.DMS_CreatePointEx.restype = ctypes.c_int
 		type_onechar = chr(type_int)
 		rights_onechar = chr(rights_int)
 		# if DEBUGGING:
@@ -471,14 +555,10 @@ class Dmspipe(object):
 		"""
 		deletes a DMS datapoint it no other process is registered onto it
 		"""
-		self.pmospipe.DMS_DeleteEx.argtypes = [ctypes.c_int, ctypes.c_char_p]
-		self.pmospipe.DMS_DeleteEx.restype = ctypes.c_int
 		self.func_result = self.pmospipe.DMS_DeleteEx(self.handle, datapoint_str)
 
 
 	def pyDMS_WriteBITEx(self, datapoint_str, value_bool):
-		self.pmospipe.DMS_WriteBITEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_bool]
-		self.pmospipe.DMS_WriteBITEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_bool = ' + str(value_bool))
@@ -488,8 +568,6 @@ class Dmspipe(object):
 		"""
 		set value of signed byte (8bit) datapoint
 		"""
-		self.pmospipe.DMS_WriteBYSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_byte]
-		self.pmospipe.DMS_WriteBYSEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_bys = ' + str(value_bys))
@@ -499,8 +577,6 @@ class Dmspipe(object):
 		"""
 		set value of signed WORD (in Windows API: 16bit) datapoint
 		"""
-		self.pmospipe.DMS_WriteWOSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int16]
-		self.pmospipe.DMS_WriteWOSEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_wos = ' + str(value_wos))
@@ -510,8 +586,6 @@ class Dmspipe(object):
 		"""
 		set value of signed DWORD (in Windows API: 32bit) datapoint
 		"""
-		self.pmospipe.DMS_WriteDWSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int32]
-		self.pmospipe.DMS_WriteDWSEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_dws = ' + str(value_dws))
@@ -522,8 +596,6 @@ class Dmspipe(object):
 		"""
 		set value of unsigned WORD(in Windows API: 16bit) datapoint
 		"""
-		self.pmospipe.DMS_WriteWOUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint16]
-		self.pmospipe.DMS_WriteWOUEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_wou = ' + str(value_wou))
@@ -534,8 +606,6 @@ class Dmspipe(object):
 		"""
 		set value of unsigned BYTE datapoint
 		"""
-		self.pmospipe.DMS_WriteBYUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_ubyte]
-		self.pmospipe.DMS_WriteBYUEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_byu = ' + str(value_byu))
@@ -546,8 +616,6 @@ class Dmspipe(object):
 		"""
 		set value of unsigned DWORD (in Windows API: 32bit) datapoint
 		"""
-		self.pmospipe.DMS_WriteDWUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
-		self.pmospipe.DMS_WriteDWUEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_dwu = ' + str(value_dwu))
@@ -558,8 +626,6 @@ class Dmspipe(object):
 		"""
 		set value of float datapoint
 		"""
-		self.pmospipe.DMS_WriteFLTEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_double]
-		self.pmospipe.DMS_WriteFLTEx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_flt = ' + str(value_flt))
@@ -571,8 +637,6 @@ class Dmspipe(object):
 		"""
 		set value of string (max. length in DMS: 80 characters) datapoint
 		"""
-		self.pmospipe.DMS_WriteSTREx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p]
-		self.pmospipe.DMS_WriteSTREx.restype = ctypes.c_int
 		# if DEBUGGING:
 		# 	print('datapoint_str = ' + datapoint_str)
 		# 	print('value_str = ' + value_str)
@@ -583,32 +647,24 @@ class Dmspipe(object):
 		reads a boolean datapoint.
 		=>when read as string, then pmospipe returns "ON" or "OFF", but read as boolean, then it works as expected... :-)
 		"""
-		self.pmospipe.DMS_ReadBITEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_bool)]
-		self.pmospipe.DMS_ReadBITEx.restype = ctypes.c_int
 
 		curr_bit = ctypes.c_bool()
 		self.func_result = self.pmospipe.DMS_ReadBITEx(self.handle, datapoint_str, ctypes.byref(curr_bit))
 		return curr_bit.value
 
 	def pyDMS_ReadBYSEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadBYSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_byte)]
-		self.pmospipe.DMS_ReadBYSEx.restype = ctypes.c_int
 
 		curr_bys = ctypes.c_byte()
 		self.func_result = self.pmospipe.DMS_ReadBYSEx(self.handle, datapoint_str, ctypes.byref(curr_bys))
 		return curr_bys.value
 
 	def pyDMS_ReadWOSEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadWOSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int16)]
-		self.pmospipe.DMS_ReadWOSEx.restype = ctypes.c_int
 
 		curr_wos = ctypes.c_int16()
 		self.func_result = self.pmospipe.DMS_ReadWOSEx(self.handle, datapoint_str, ctypes.byref(curr_wos))
 		return curr_wos.value
 
 	def pyDMS_ReadDWSEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadDWSEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int32)]
-		self.pmospipe.DMS_ReadDWSEx.restype = ctypes.c_int
 
 		curr_dws = ctypes.c_int32()
 		self.func_result = self.pmospipe.DMS_ReadDWSEx(self.handle, datapoint_str, ctypes.byref(curr_dws))
@@ -616,16 +672,12 @@ class Dmspipe(object):
 
 
 	def pyDMS_ReadBYUEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadBYUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_ubyte)]
-		self.pmospipe.DMS_ReadBYUEx.restype = ctypes.c_int
 
 		curr_byu = ctypes.c_ubyte()
 		self.func_result = self.pmospipe.DMS_ReadBYUEx(self.handle, datapoint_str, ctypes.byref(curr_byu))
 		return curr_byu.value
 
 	def pyDMS_ReadWOUEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadWOUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint16)]
-		self.pmospipe.DMS_ReadWOUEx.restype = ctypes.c_int
 
 		curr_wou = ctypes.c_uint16()
 		self.func_result = self.pmospipe.DMS_ReadWOUEx(self.handle, datapoint_str, ctypes.byref(curr_wou))
@@ -633,8 +685,6 @@ class Dmspipe(object):
 
 
 	def pyDMS_ReadDWUEx(self, datapoint_str):
-		self.pmospipe.DMS_ReadDWUEx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint32)]
-		self.pmospipe.DMS_ReadDWUEx.restype = ctypes.c_int
 
 		curr_dwu = ctypes.c_uint32()
 		self.func_result = self.pmospipe.DMS_ReadDWUEx(self.handle, datapoint_str, ctypes.byref(curr_dwu))
@@ -645,12 +695,10 @@ class Dmspipe(object):
 		# FIXME: self.func_result is always "-6" .... :-(
 		# =>returned value is right! :-)
 		# pmospipe returns a NUL terminated string, it seems to be a DECIMAL with resolution 0.001, NOT FLOAT!!!
-		self.pmospipe.DMS_ReadSTREx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.POINTER(DMS_STRING)]
-		self.pmospipe.DMS_ReadSTREx.restype = ctypes.c_int
-
-		curr_decimal = DMS_STRING('0.0')
-		self.func_result = self.pmospipe.DMS_ReadSTREx(self.handle, datapoint_str, ctypes.byref(curr_decimal))
-		return decimal.Decimal(curr_decimal.to_string())
+		# (buffer of DMS_STRING size, passed as "char *" according to prototype of DMS_ReadSTREx())
+		curr_decimal = ctypes.create_string_buffer('0.0', DMS_STRING.MAXLENGTH)
+		self.func_result = self.pmospipe.DMS_ReadSTREx(self.handle, datapoint_str, curr_decimal)
+		return decimal.Decimal(curr_decimal.value)
 
 
 def main(argv=None):
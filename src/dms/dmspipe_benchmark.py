@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmspipe_benchmark.py
+
+Copyright (C) 2018 Stefan Braun
+
+benchmark of subtree enumeration in dms.dmspipe (runs without Visi.Plus(c), e.g. on Linux):
+pmospipe.dll gets replaced by a simulated DMS with same function interface
+-number of DLL calls and execution time of Dmspipe.walk_DMS_subtree() and Dmspipe.write_DMS_subtree_serialization()
+=>execution time per DMS key should stay constant when DMS grows
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmspipe
+import argparse
+import collections
+import os
+import tempfile
+import time
+
+
+class _Fake_pmospipe(object):
+	""" simulated DMS with interface of pmospipe.dll (only functions needed for reading) """
+
+	def __init__(self, nof_plcs, nof_groups, nof_keys):
+		# key: DMS key, value: tuple (numeric DMS type, value, access rights)
+		self._nodes_dict = {}
+		# key: DMS key, value: list of sons
+		self._sons_dict = collections.defaultdict(list)
+		# search state of DMS_GetNamesEx() / DMS_GetNextNameEx()
+		self._sons_iter = iter([])
+		self.nof_calls = 0
+
+		for plc in range(nof_plcs):
+			plc_key = 'MSR' + '{:02d}'.format(plc + 1)
+			self._add_node(plc_key, 0, None)
+			for group in range(nof_groups):
+				group_key = plc_key + ':G' + str(group)
+				self._add_node(group_key, 0, None)
+				for idx in range(nof_keys):
+					curr_type = idx % 9 + 1
+					if curr_type == 8:
+						value = str(idx * 0.5)
+					elif curr_type == 9:
+						value = 'Text ' + str(idx)
+					else:
+						value = idx % 2
+					self._add_node(group_key + ':K' + str(idx), curr_type, value)
+
+	def _add_node(self, dms_key, curr_type, value):
+		self._nodes_dict[dms_key] = (curr_type, value, 10)
+		parent, sep, son = dms_key.rpartition(':')
+		self._sons_dict[parent].append(son)
+
+	def __len__(self):
+		return len(self._nodes_dict)
+
+	def DMS_ConnectEx(self, pipe_name_str, handle_ref):
+		self.nof_calls += 1
+		handle_ref._obj.value = 1
+		return 0
+
+	def DMS_CloseEx(self, handle):
+		self.nof_calls += 1
+		return True
+
+	def DMS_ReadTypeEx(self, handle, dms_key):
+		self.nof_calls += 1
+		try:
+			return self._nodes_dict[dms_key][0]
+		except KeyError:
+			return -5
+
+	def DMS_ReadSTREx(self, handle, dms_key, buf):
+		self.nof_calls += 1
+		try:
+			buf.value = str(self._nodes_dict[dms_key][1])
+			return 0
+		except KeyError:
+			return 2
+
+	def _read_number(self, handle, dms_key, value_ref):
+		self.nof_calls += 1
+		value_ref._obj.value = self._nodes_dict[dms_key][1]
+		return 0
+	DMS_ReadBITEx = DMS_ReadBYSEx = DMS_ReadWOSEx = DMS_ReadDWSEx = _read_number
+	DMS_ReadBYUEx = DMS_ReadWOUEx = DMS_ReadDWUEx = _read_number
+
+	def DMS_GetRightsEx(self, handle, dms_key):
+		self.nof_calls += 1
+		return chr(self._nodes_dict[dms_key][2])
+
+	def DMS_GetNamesEx(self, handle, dms_key):
+		self.nof_calls += 1
+		prefix = dms_key + ':' if dms_key else ''
+		self._sons_iter = iter([prefix + son for son in self._sons_dict.get(dms_key, [])])
+		return 0
+
+	def DMS_GetNextNameEx(self, has_sons_ref):
+		self.nof_calls += 1
+		for son_key in self._sons_iter:
+			has_sons_ref._obj.value = int(son_key in self._sons_dict)
+			return son_key.rpartition(':')[2]
+		has_sons_ref._obj.value = 0
+		return ''
+
+
+def benchmark(nof_plcs, nof_groups, nof_keys):
+	fake_dll = _Fake_pmospipe(nof_plcs=nof_plcs, nof_groups=nof_groups, nof_keys=nof_keys)
+	curr_dms = dms.dmspipe.Dmspipe(dll=fake_dll)
+	nof_nodes = len(fake_dll)
+
+	fake_dll.nof_calls = 0
+	t_start = time.time()
+	key_list = curr_dms.get_DMS_subtree_list_by_key('')
+	t_list = time.time() - t_start
+	assert len(key_list) == nof_nodes + 1, 'walk missed DMS keys'
+	calls_list = fake_dll.nof_calls
+
+	fake_dll.nof_calls = 0
+	t_start = time.time()
+	for item in curr_dms.walk_DMS_subtree('', with_rights=True):
+		pass
+	t_walk = time.time() - t_start
+	calls_walk = fake_dll.nof_calls
+
+	fd, filename = tempfile.mkstemp(suffix='.dms')
+	os.close(fd)
+	t_start = time.time()
+	curr_dms.write_DMS_subtree_serialization('', filename)
+	t_export = time.time() - t_start
+	os.remove(filename)
+
+	print(str(nof_nodes) + ' DMS keys:'
+	      + ' list of keys ' + '{:.3f}'.format(t_list) + 's (' + str(calls_list) + ' DLL calls),'
+	      + ' walk with type+value+rights ' + '{:.3f}'.format(t_walk) + 's (' + str(calls_walk) + ' DLL calls),'
+	      + ' export ' + '{:.3f}'.format(t_export) + 's'
+	      + ' =>' + '{:.2f}'.format(t_export * 1e6 / nof_nodes) + ' microseconds per DMS key')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark of subtree enumeration in dms.dmspipe (no DMS needed).')
+	parser.add_argument('--nof_plcs', '-p', dest='nof_plcs', default=4, type=int, help='number of PLC nodes (default: 4)')
+	parser.add_argument('--nof_groups', '-g', dest='nof_groups', default=50, type=int, help='number of groups per PLC (default: 50)')
+	parser.add_argument('--nof_keys', '-k', dest='nof_keys', default=50, type=int, help='number of DMS keys per group, doubled in every round (default: 50)')
+	parser.add_argument('--rounds', '-r', dest='rounds', default=3, type=int, help='number of rounds (default: 3)')
+	args = parser.parse_args()
+
+	dms.dmspipe.DEBUGGING = False
+	nof_keys = args.nof_keys
+	for x in range(args.rounds):
+		benchmark(nof_plcs=args.nof_plcs, nof_groups=args.nof_groups, nof_keys=nof_keys)
+		nof_keys = nof_keys * 2
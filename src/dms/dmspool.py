@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmspool.py
+
+Copyright (C) 2018 Stefan Braun
+
+pool of WebSocket connections to one or more DMS (same API as dms.dmswebsocket.DMSClient):
+-keeps "nof_connections" DMSClient objects per DMS host
+-independent reads are sent over the connection with fewest requests waiting for DMS response,
+ dp_get_pipelined() spreads its commands over all connections of a host
+ =>bulk readers (e.g. tools.PSC_to_ALM_Mapper) are no longer latency-bound on one socket
+-writes and subscriptions are routed consistently by DMS-key: same DMS-key always uses same connection
+ (order of "set" commands and of DMS-events of one DMS-key is kept)
+-several DMS hosts behind one facade: "routes" maps subtrees to hosts (longest matching DMS-key wins),
+ all other DMS-keys use first host
+
+example:
+	with DMSConnectionPool(u'pyVisiToolkit', u'user', hosts=[u'plc-server1:9020', u'plc-server2:9020'],
+	                       routes={u'MSR10': u'plc-server2:9020'}) as pool:
+		print(pool.dp_get(path=u'MSR10:Allg:Status'))
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmswebsocket as dms
+import collections
+import itertools
+import threading
+import zlib
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmspool')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# number of WebSocket connections per DMS host
+POOL_CONNECTIONS = 4
+
+
+def parse_host(host):
+	""" tuple (hostname, port) from string "hostname:port" (or "hostname"), tuples are returned unchanged """
+	if isinstance(host, (tuple, list)):
+		return (u'' + host[0], int(host[1]))
+	if u':' in host:
+		hostname, port_str = host.rsplit(u':', 1)
+		return (u'' + hostname, int(port_str))
+	return (u'' + host, dms.DMS_PORT)
+
+
+def get_host_key(host):
+	""" string "hostname:port" for identification of DMS host """
+	hostname, port = parse_host(host)
+	return hostname + u':' + str(port)
+
+
+class _HostPool(object):
+	""" all connections to one DMS host """
+
+	def __init__(self, whois_str, user_str, hostname, port, nof_connections, client_kwargs):
+		self.host_key = hostname + u':' + str(port)
+		self.clients_list = []
+		for idx in range(nof_connections):
+			self.clients_list.append(dms.DMSClient(whois_str=whois_str,
+			                                       user_str=user_str,
+			                                       dms_host_str=hostname,
+			                                       dms_port_int=port,
+			                                       **client_kwargs))
+		# round robin between connections with same load
+		self._rr_counter = itertools.count()
+
+
+	def get_least_loaded(self):
+		""" connection with fewest requests waiting for DMS response """
+		nof = len(self.clients_list)
+		start = next(self._rr_counter) % nof
+		best_client = None
+		best_inflight = None
+		for idx in range(nof):
+			client = self.clients_list[(start + idx) % nof]
+			inflight = client.get_metrics().get_inflight()
+			if best_inflight is None or inflight < best_inflight:
+				best_client = client
+				best_inflight = inflight
+				if inflight == 0:
+					break
+		return best_client
+
+
+	def get_sticky(self, path):
+		""" always the same connection for the same DMS-key """
+		# (crc32 is stable between Python processes, hash() of strings is not guaranteed to be)
+		return self.clients_list[(zlib.crc32(path.encode('utf8')) & 0xffffffff) % len(self.clients_list)]
+
+
+	def close(self):
+		for client in self.clients_list:
+			try:
+				client.__exit__(None, None, None)
+			except Exception:
+				logger.exception('_HostPool.close(): closing connection to DMS "' + self.host_key + '" failed')
+
+
+
+class DMSConnectionPool(object):
+	""" facade over connections to one or more DMS hosts """
+
+	def __init__(self, whois_str, user_str, hosts=((dms.DMS_HOST, dms.DMS_PORT),), nof_connections=POOL_CONNECTIONS, routes=None, **client_kwargs):
+		# =>"hosts": list of strings "hostname:port" or tuples (hostname, port)
+		# =>"routes": dictionary (key: DMS-key of subtree, value: host as in "hosts")
+		# =>other keyword arguments are used for every DMSClient (e.g. "auto_reconnect" or "event_workers")
+		assert hosts, u'DMSConnectionPool needs at least one DMS host!'
+		assert nof_connections > 0, u'parameter "nof_connections" has to be a positive number!'
+		self._hostpools_odict = collections.OrderedDict()
+		for host in hosts:
+			hostname, port = parse_host(host)
+			hostpool = _HostPool(whois_str, user_str, hostname, port, nof_connections, client_kwargs)
+			self._hostpools_odict[hostpool.host_key] = hostpool
+		self._default_hostpool = self._hostpools_odict.values()[0]
+
+		# routing: longest DMS-key first
+		self._routes_list = []
+		for path, host in (routes or {}).items():
+			host_key = get_host_key(host)
+			assert host_key in self._hostpools_odict, u'route of "' + path + u'" uses unknown DMS host "' + host_key + u'"!'
+			self._routes_list.append((u'' + path, self._hostpools_odict[host_key]))
+		self._routes_list.sort(key=lambda item: len(item[0]), reverse=True)
+		logger.info('DMSConnectionPool: ' + str(nof_connections) + ' connections to each of ' + str(len(self._hostpools_odict)) + ' DMS hosts will be established in background...')
+
+
+	def _get_hostpool(self, path=u'', host=None):
+		if host:
+			return self._hostpools_odict[get_host_key(host)]
+		for base_path, hostpool in self._routes_list:
+			if path == base_path or path.startswith(base_path + u':'):
+				return hostpool
+		return self._default_hostpool
+
+
+	def get_client(self, path=u'', sticky=False, host=None):
+		""" DMSClient object for this DMS-key (sticky: always same connection for same DMS-key) """
+		hostpool = self._get_hostpool(path, host)
+		if sticky:
+			return hostpool.get_sticky(path)
+		return hostpool.get_least_loaded()
+
+
+	def get_clients(self):
+		""" all DMSClient objects of all hosts """
+		clients_list = []
+		for hostpool in self._hostpools_odict.values():
+			clients_list.extend(hostpool.clients_list)
+		return clients_list
+
+
+	def get_stats(self):
+		""" requests waiting for DMS response per connection (key: "hostname:port", value: list of numbers) """
+		stats_dict = {}
+		for host_key, hostpool in self._hostpools_odict.items():
+			stats_dict[host_key] = [client.get_metrics().get_inflight() for client in hostpool.clients_list]
+		return stats_dict
+
+
+	# API of DMSClient
+	def dp_get(self, path, timeout=dms.REQ_TIMEOUT, **kwargs):
+		""" read datapoint value(s) """
+		return self.get_client(path).dp_get(path, timeout=timeout, **kwargs)
+
+	def dp_set(self, path, timeout=dms.REQ_TIMEOUT, **kwargs):
+		""" write datapoint value(s) """
+		return self.get_client(path, sticky=True).dp_set(path, timeout=timeout, **kwargs)
+
+	def dp_del(self, path, recursive, timeout=dms.REQ_TIMEOUT, **kwargs):
+		""" delete datapoint(s) """
+		return self.get_client(path, sticky=True).dp_del(path, recursive, timeout=timeout, **kwargs)
+
+	def dp_ren(self, path, newPath, timeout=dms.REQ_TIMEOUT, **kwargs):
+		""" rename datapoint(s) """
+		# FIXME: renaming between subtrees on different DMS hosts is not possible
+		return self.get_client(path, sticky=True).dp_ren(path, newPath, timeout=timeout, **kwargs)
+
+	def dp_get_histData_chunks(self, path, start, end, **kwargs):
+		""" read trenddata of one datapoint in smaller timeranges (generator yielding responses in chronological order) """
+		return self.get_client(path).dp_get_histData_chunks(path, start, end, **kwargs)
+
+	def get_dp_subscription(self, path, **kwargs):
+		""" subscribe monitoring of datapoints(s) """
+		return self.get_client(path, sticky=True).get_dp_subscription(path, **kwargs)
+
+	def changelog_GetGroups(self, timeout=dms.REQ_TIMEOUT, host=None, **kwargs):
+		""" get list of available changelog groups (of first DMS host or of given host) """
+		return self.get_client(host=host).changelog_GetGroups(timeout=timeout, **kwargs)
+
+	def changelog_Read(self, group, start, timeout=dms.REQ_TIMEOUT, host=None, **kwargs):
+		""" get protocol entries in given changelog group (of first DMS host or of given host) """
+		return self.get_client(host=host).changelog_Read(group, start, timeout=timeout, **kwargs)
+
+	def changelog_Read_pipelined(self, cmd_kwargs_list, max_inflight=dms.CHANGELOG_MAX_INFLIGHT, timeout=dms.REQ_TIMEOUT, host=None):
+		""" many "changelogRead" requests on one connection (of first DMS host or of given host) """
+		return self.get_client(host=host).changelog_Read_pipelined(cmd_kwargs_list, max_inflight=max_inflight, timeout=timeout)
+
+
+	def dp_get_pipelined(self, cmd_kwargs_list, max_inflight=dms.GET_MAX_INFLIGHT, timeout=dms.REQ_TIMEOUT):
+		""" many "get" requests spread over all connections (generator yielding one response list per command in same order) """
+		# =>every connection keeps up to "max_inflight" requests in DMS,
+		#   commands of different hosts (by "routes") are sent to their host
+		# =>every command needs key "path" (used for routing)
+		return _PipelinedReader(self, cmd_kwargs_list, max_inflight, timeout).iter_results()
+
+
+	def close(self):
+		for hostpool in self._hostpools_odict.values():
+			hostpool.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		if traceback:
+			logger.error("DMSConnectionPool.__exit__(): type: {}".format(exc_type))
+			logger.error("DMSConnectionPool.__exit__(): value: {}".format(exc_value))
+
+
+
+class _PipelinedReader(object):
+	""" one worker thread per connection pulls commands from a shared iterator, results get yielded in order """
+
+	def __init__(self, pool, cmd_kwargs_list, max_inflight, timeout):
+		self._pool = pool
+		self._cmd_kwargs_iter = enumerate(cmd_kwargs_list)
+		self._max_inflight = max_inflight
+		self._timeout = timeout
+		self._cond = threading.Condition(threading.Lock())
+
+		# finished commands (key: index of command, value: response list or exception)
+		self._results_dict = {}
+		# limit of results ahead of caller: all pipelines full plus one pipeline as buffer
+		self._max_ahead = max_inflight * (len(pool.get_clients()) + 1)
+		self._next_idx = 0
+		self._nof_pulled = 0
+		self._is_exhausted = False
+		self._is_stopped = False
+
+		# commands waiting for a connection of their host
+		# (key: host key, value: deque of tuples (index, keyword arguments))
+		self._waiting_dict = collections.defaultdict(collections.deque)
+
+
+	def _pull(self, host_key):
+		# next command for a connection to given host, None when nothing is left
+		# (reads ahead in shared iterator, commands of other hosts wait in their deque)
+		with self._cond:
+			while True:
+				if self._is_stopped:
+					return None
+				if self._waiting_dict[host_key]:
+					return self._waiting_dict[host_key].popleft()
+				if self._is_exhausted:
+					return None
+				try:
+					idx, cmd_kwargs = next(self._cmd_kwargs_iter)
+				except StopIteration:
+					self._is_exhausted = True
+					self._cond.notify_all()
+					return None
+				self._nof_pulled += 1
+				curr_key = self._pool._get_hostpool(cmd_kwargs[u'path']).host_key
+				if curr_key == host_key:
+					return idx, cmd_kwargs
+				self._waiting_dict[curr_key].append((idx, cmd_kwargs))
+				self._cond.notify_all()
+
+
+	def _worker(self, client, host_key):
+		order_deque = collections.deque()
+		def cmd_gen():
+			while True:
+				item = self._pull(host_key)
+				if item is None:
+					return
+				order_deque.append(item[0])
+				yield item[1]
+		try:
+			for resp_list in client.dp_get_pipelined(cmd_gen(), max_inflight=self._max_inflight, timeout=self._timeout):
+				self._store(order_deque.popleft(), resp_list)
+		except Exception as ex:
+			logger.exception('_PipelinedReader._worker(): pipelined requests to DMS "' + host_key + '" failed')
+			# caller gets exception of every unanswered command of this worker
+			for idx in order_deque:
+				self._store(idx, ex)
+
+
+	def _store(self, idx, result):
+		# caller is slow: wait until he consumes results
+		# (the worker owning next result never waits, its results are stored in order)
+		with self._cond:
+			while idx - self._next_idx >= self._max_ahead and not self._is_stopped:
+				self._cond.wait()
+			self._results_dict[idx] = result
+			self._cond.notify_all()
+
+
+	def iter_results(self):
+		threads_list = []
+		for hostpool in self._pool._hostpools_odict.values():
+			for client in hostpool.clients_list:
+				thread = threading.Thread(target=self._worker, args=(client, hostpool.host_key))
+				thread.daemon = True
+				thread.start()
+				threads_list.append(thread)
+		try:
+			while True:
+				with self._cond:
+					while not self._next_idx in self._results_dict:
+						if self._is_exhausted and self._next_idx >= self._nof_pulled:
+							return
+						if not any(thread.is_alive() for thread in threads_list):
+							# (should never happen: every pulled command gets a result)
+							raise IOError('_PipelinedReader.iter_results(): all workers exited before command no.' + str(self._next_idx) + ' got a response')
+						self._cond.wait(1.0)
+					result = self._results_dict.pop(self._next_idx)
+					self._next_idx += 1
+					self._cond.notify_all()
+				if isinstance(result, Exception):
+					raise result
+				yield result
+		finally:
+			# caller stopped iteration early: workers finish their sent requests and exit
+			with self._cond:
+				self._is_stopped = True
+				self._cond.notify_all()
@@ -0,0 +1,628 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmsproxy.py      v0.0.1
+Caching proxy between WebSocket clients and DMS
+
+Copyright (C) 2018 Stefan Braun
+
+idea: every pyVisiToolkit tool on an operator PC opens it's own DMS connection and reads the same datapoints again and again,
+this proxy uses only one upstream WebSocket connection to DMS for all of them:
+ -in-memory mirror of chosen subtrees, kept up to date by DMS subscriptions
+  =>"get" requests without trenddata, changelog or extended infos are answered from this mirror
+ -all other requests are forwarded to DMS
+ -subscriptions of all downstream clients with same path, query and eventfilter share one upstream subscription
+=>clients connect to proxy the same way as to DMS JSON Data Exchange, e.g. DMSClient(u'tool', u'user', dms_port_int=PROXY_PORT)
+=>all forwarded requests use "whois" and "user" of the proxy
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmswebsocket as dms
+import dms.dmsquery as dmsquery
+from dms.websocketserver import WebSocketServer
+import argparse
+import datetime
+import json
+import logging
+import threading
+import time
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmsproxy')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# default listening address of proxy
+PROXY_HOST = u'127.0.0.1'
+PROXY_PORT = 9021
+
+# seconds a renamed or deleted subtree is answered by DMS when it's DMS-event doesn't arrive
+# (e.g. renaming from outside into a mirrored subtree)
+OUTDATED_TIMEOUT = 10.0
+
+
+def as_json_obj(obj):
+	""" converts parsed objects of dms.dmswebsocket back into JSON-serializable objects """
+	if isinstance(obj, datetime.datetime):
+		return obj.isoformat()
+	elif isinstance(obj, dms.HistData_compact):
+		return [{as_json_obj(stamp): value} for stamp, value in obj]
+	elif isinstance(obj, dms._Mydict):
+		return as_json_obj(obj.as_dict())
+	elif isinstance(obj, dict):
+		curr_dict = {}
+		for key, val in obj.items():
+			# fields without value were not in DMS response
+			if val is not None or key == u'value':
+				curr_dict[key] = as_json_obj(val)
+		return curr_dict
+	elif isinstance(obj, (dms._Mylist, list, tuple)):
+		return [as_json_obj(item) for item in obj]
+	return obj
+
+
+def get_parent(path):
+	""" parent of DMS-key (root node has empty path) """
+	if u':' in path:
+		return path.rsplit(u':', 1)[0]
+	return u''
+
+
+def is_in_subtree(base_path, path):
+	""" checks if DMS-key is base DMS-key or one of it's descendants """
+	return not base_path or path == base_path or path.startswith(base_path + u':')
+
+
+class DMSMirror(object):
+	""" in-memory copy of DMS subtrees, updated by DMS-events """
+
+	# query fields which can be evaluated on mirror
+	QUERY_FIELDS = dmsquery.OFFLINE_FIELDS
+
+	def __init__(self):
+		self._lock = threading.RLock()
+		# key: DMS-key, value: dictionary with "value", "type" and "stamp" (as JSON objects)
+		self._nodes_dict = {}
+		# key: DMS-key, value: set of DMS-keys of children
+		self._children_dict = {}
+		# key: DMS-key, value: timestamp as datetime.datetime (for comparison with timestamps of DMS-events)
+		self._stamps_dict = {}
+		# roots of completely loaded subtrees
+		self._subtrees_list = []
+		# False while mirror gets reloaded (e.g. DMS-events were lost while WebSocket connection was down)
+		self._is_valid = True
+		# DMS-keys renamed or deleted by proxy clients: their subtrees are answered by DMS until their DMS-event arrives
+		# (key: DMS-key, value: time of marking)
+		self._outdated_dict = {}
+
+
+	def load_subtree(self, dms_ws, path):
+		""" copy whole subtree from DMS and keep it up to date """
+		# subscription before reading: no change gets lost
+		sub = dms_ws.get_dp_subscription(path=path,
+		                                 event=dms.ON_ALL,
+		                                 query=dms.Query(maxDepth=0))
+		sub += self.apply_event
+		self._read_subtree(dms_ws, path)
+		with self._lock:
+			self._subtrees_list.append(path)
+		logger.info('DMSMirror.load_subtree(): mirror of subtree "' + path + '" contains ' + str(len(self._nodes_dict)) + ' DMS-keys.')
+		return sub
+
+
+	def _read_subtree(self, dms_ws, path):
+		# DMS-events could arrive while reading: set_node() doesn't overwrite them with older values
+		# (also with empty path: whole DMS gets mirrored)
+		responses = list(dms_ws.dp_get(path=path))
+		responses.extend(dms_ws.dp_get(path=path, query=dms.Query(maxDepth=0)))
+		with self._lock:
+			for resp in responses:
+				if resp.code == u'ok':
+					self.set_node(resp.path, value=resp.value, datatype=resp.type, stamp=resp.stamp)
+
+
+	def reload(self, dms_ws):
+		""" read all mirrored subtrees again (their subscriptions have to be active) """
+		with self._lock:
+			self._is_valid = False
+			subtrees_list = list(self._subtrees_list)
+			self._nodes_dict = {}
+			self._children_dict = {}
+			self._stamps_dict = {}
+			self._outdated_dict = {}
+		for path in subtrees_list:
+			self._read_subtree(dms_ws, path)
+		with self._lock:
+			self._is_valid = True
+		logger.info('DMSMirror.reload(): mirror contains ' + str(len(self._nodes_dict)) + ' DMS-keys.')
+
+
+	def covers(self, path):
+		""" is this DMS-key inside a mirrored subtree? """
+		with self._lock:
+			if not self._is_valid:
+				return False
+			now = time.time()
+			for outdated_path, marked in self._outdated_dict.items():
+				if now - marked > OUTDATED_TIMEOUT:
+					del(self._outdated_dict[outdated_path])
+				elif is_in_subtree(outdated_path, path) or is_in_subtree(path, outdated_path):
+					# (a "get" with query on a parent would contain this subtree, too)
+					return False
+			for base_path in self._subtrees_list:
+				if is_in_subtree(base_path, path):
+					return True
+		return False
+
+
+	def set_node(self, path, value, datatype, stamp):
+		""" store DMS-key, returns False when mirror already contains a newer value """
+		with self._lock:
+			if isinstance(stamp, datetime.datetime):
+				old_stamp = self._stamps_dict.get(path, None)
+				if old_stamp and stamp < old_stamp:
+					return False
+				self._stamps_dict[path] = stamp
+				stamp = stamp.isoformat()
+			else:
+				self._stamps_dict.pop(path, None)
+			self._nodes_dict[path] = {u'value': value, u'type': datatype, u'stamp': stamp}
+			# create missing parents (in DMS every parent exists)
+			child = path
+			while child:
+				parent = get_parent(child)
+				if not parent in self._children_dict:
+					self._children_dict[parent] = set()
+				if child in self._children_dict[parent]:
+					break
+				self._children_dict[parent].add(child)
+				child = parent
+		return True
+
+
+	def del_node(self, path):
+		""" delete DMS-key with all it's descendants """
+		with self._lock:
+			for child in list(self._children_dict.pop(path, ())):
+				self.del_node(child)
+			self._nodes_dict.pop(path, None)
+			self._stamps_dict.pop(path, None)
+			parent = get_parent(path)
+			if parent in self._children_dict:
+				self._children_dict[parent].discard(path)
+
+
+	def rename_node(self, path, new_path):
+		""" rename DMS-key with all it's descendants """
+		with self._lock:
+			moved_list = []
+			for curr_path in self._iter_subtree(path, max_depth=0):
+				moved_list.append((new_path + curr_path[len(path):], self._nodes_dict.get(curr_path, None), self._stamps_dict.get(curr_path, None)))
+			self.del_node(path)
+			for curr_path, node, stamp in moved_list:
+				if node:
+					self.set_node(curr_path, value=node[u'value'], datatype=node[u'type'], stamp=stamp or node[u'stamp'])
+
+
+	def mark_outdated(self, path):
+		""" subtree of this DMS-key gets renamed or deleted in DMS, mirror gets updated by DMS-event """
+		with self._lock:
+			self._outdated_dict[path] = time.time()
+
+
+	def unmark_outdated(self, path):
+		""" renaming or deletion has failed, mirror is still up to date """
+		with self._lock:
+			self._outdated_dict.pop(path, None)
+
+
+	def apply_event(self, event):
+		""" callback for DMS subscription """
+		if event.code == dms.DMSEvent.CODE_DELETE:
+			with self._lock:
+				self.del_node(event.path)
+				self._outdated_dict.pop(event.path, None)
+		elif event.code == dms.DMSEvent.CODE_RENAME:
+			with self._lock:
+				self.rename_node(event.path, event.newPath)
+				self._outdated_dict.pop(event.path, None)
+				self._outdated_dict.pop(event.newPath, None)
+		else:
+			self.set_node(event.path, value=event.value, datatype=event.type, stamp=event.stamp)
+
+
+	def can_answer(self, cmd_dict):
+		""" checks if a "get" command could be answered by this mirror """
+		for key in cmd_dict:
+			if key == u'query':
+				for query_key in cmd_dict[key]:
+					if not query_key in DMSMirror.QUERY_FIELDS:
+						return False
+			elif not key in (u'path', u'tag'):
+				# histData, changelog, showExtInfos
+				return False
+		return self.covers(cmd_dict[u'path'])
+
+
+	def get(self, path, query_dict=None):
+		""" list of response objects (as JSON objects without tag) like DMS would answer a "get" command """
+		with self._lock:
+			if query_dict:
+				max_depth = query_dict.get(u'maxDepth', 0)
+				paths = self._iter_subtree(path, max_depth)
+			else:
+				paths = [path]
+			resp_list = []
+			for curr_path in paths:
+				node = self._nodes_dict.get(curr_path, None)
+				if node and dmsquery.match_node(curr_path, node[u'value'], node[u'type'], query_dict, stamp=node[u'stamp']):
+					resp = {u'path': curr_path,
+					        u'code': u'ok',
+					        u'hasChild': bool(self._children_dict.get(curr_path, None))}
+					resp.update(node)
+					resp_list.append(resp)
+		if not resp_list:
+			resp_list.append({u'path': path, u'code': u'not found'})
+		return resp_list
+
+
+	def _iter_subtree(self, path, max_depth):
+		# DMS-key and all descendants in depth-first order (max_depth <= 0 means unlimited)
+		# (caller has to hold lock)
+		paths = []
+		stack = [path]
+		while stack:
+			curr_path = stack.pop()
+			paths.append(curr_path)
+			if max_depth <= 0 or dmsquery.get_depth(path, curr_path) < max_depth:
+				stack.extend(sorted(self._children_dict.get(curr_path, ()), reverse=True))
+		return paths
+
+
+	def __len__(self):
+		with self._lock:
+			return len(self._nodes_dict)
+
+
+
+class _SharedSubscription(object):
+	""" one upstream subscription, fanning out DMS-events to all downstream subscribers """
+
+	def __init__(self, sub):
+		self.sub = sub
+		self._lock = threading.Lock()
+		# set of tuples (WebSocketConnection, tag)
+		self._subscribers_set = set()
+		sub += self.fire
+
+	def add(self, conn, tag):
+		with self._lock:
+			self._subscribers_set.add((conn, tag))
+
+	def remove(self, conn, tag):
+		""" returns number of remaining subscribers """
+		with self._lock:
+			self._subscribers_set.discard((conn, tag))
+			return len(self._subscribers_set)
+
+	def fire(self, event):
+		""" callback for upstream subscription """
+		with self._lock:
+			subscribers_list = list(self._subscribers_set)
+		event_dict = as_json_obj(event)
+		for conn, tag in subscribers_list:
+			event_dict[u'tag'] = tag
+			try:
+				conn.send(json.dumps({u'event': [event_dict]}))
+			except IOError:
+				logger.debug('_SharedSubscription.fire(): downstream client ' + repr(conn.address) + ' is gone...')
+
+
+
+class DMSProxy(object):
+	""" WebSocket server application: answering DMS JSON Data Exchange requests of downstream clients """
+
+	def __init__(self, dms_ws, mirror_paths=(), host=PROXY_HOST, port=PROXY_PORT):
+		self._dms_ws = dms_ws
+		self._mirror = DMSMirror()
+		self._mirror_subs_list = []
+		for path in mirror_paths:
+			self._mirror_subs_list.append(self._mirror.load_subtree(dms_ws, path))
+		# DMS-events get lost while WebSocket connection to DMS is down
+		dms_ws.add_reconnect_callback(self._cb_reconnect)
+
+		self._lock = threading.Lock()
+		# key: tuple (path, query as JSON, eventfilter), value: _SharedSubscription object
+		self._shared_subs_dict = {}
+		# key: tuple (WebSocketConnection, tag), value: key of shared subscription
+		self._downstream_subs_dict = {}
+		self._connections_set = set()
+
+		# diagnostic values
+		self.nof_mirror_hits = 0
+		self.nof_forwarded = 0
+
+		self._server = WebSocketServer(app=self, host=host, port=port)
+
+
+	def start(self):
+		self._server.start()
+
+	def stop(self):
+		self._server.stop()
+		with self._lock:
+			connections_list = list(self._connections_set)
+		for conn in connections_list:
+			conn.close()
+
+	def get_port(self):
+		return self._server.get_port()
+
+
+	def _cb_reconnect(self):
+		# subscriptions of mirror are active again, now we read it's subtrees
+		# (meanwhile "get" requests are forwarded to DMS)
+		if self._mirror_subs_list:
+			self._mirror.reload(self._dms_ws)
+
+
+	# callbacks of WebSocketServer
+	def on_open(self, conn):
+		logger.info('DMSProxy.on_open(): new client ' + repr(conn.address))
+		with self._lock:
+			self._connections_set.add(conn)
+
+	def on_close(self, conn):
+		logger.info('DMSProxy.on_close(): client ' + repr(conn.address) + ' disconnected')
+		with self._lock:
+			self._connections_set.discard(conn)
+			keys_list = [key for key in self._downstream_subs_dict if key[0] is conn]
+		for conn_tag in keys_list:
+			self._remove_downstream_sub(*conn_tag)
+
+	def on_message(self, conn, msg):
+		req_dict = json.loads(msg.decode('utf8'))
+		resp_frame = {}
+		if u'tag' in req_dict:
+			# (used by tagless commands, e.g. "changelogGetGroups")
+			resp_frame[u'tag'] = req_dict[u'tag']
+		for cmd_type, handler_func in [(u'get', self._handle_get),
+		                               (u'set', self._handle_set),
+		                               (u'rename', self._handle_rename),
+		                               (u'delete', self._handle_delete),
+		                               (u'subscribe', self._handle_subscribe),
+		                               (u'unsubscribe', self._handle_unsubscribe),
+		                               (u'changelogGetGroups', self._handle_changelogGetGroups),
+		                               (u'changelogRead', self._handle_changelogRead)]:
+			if cmd_type in req_dict:
+				resp_list = []
+				for cmd_dict in req_dict[cmd_type]:
+					try:
+						resp_list.extend(handler_func(conn, cmd_dict))
+					except Exception as ex:
+						logger.exception('DMSProxy.on_message(): handling of "' + cmd_type + '" command failed')
+						resp_list.append({u'path': cmd_dict.get(u'path', u''),
+						                  u'code': u'error',
+						                  u'message': u'' + repr(ex),
+						                  u'tag': cmd_dict.get(u'tag', None)})
+				resp_frame[cmd_type] = resp_list
+		conn.send(json.dumps(resp_frame))
+
+
+	def _retag(self, responses, tag):
+		resp_list = []
+		for resp in responses:
+			resp_dict = as_json_obj(resp)
+			resp_dict[u'tag'] = tag
+			resp_list.append(resp_dict)
+		return resp_list
+
+
+	def _handle_get(self, conn, cmd_dict):
+		tag = cmd_dict.get(u'tag', None)
+		path = cmd_dict[u'path']
+		if self._mirror.can_answer(cmd_dict):
+			self.nof_mirror_hits += 1
+			resp_list = self._mirror.get(path, cmd_dict.get(u'query', None))
+			for resp in resp_list:
+				resp[u'tag'] = tag
+			return resp_list
+
+		self.nof_forwarded += 1
+		kwargs = {}
+		if u'query' in cmd_dict:
+			kwargs[u'query'] = dms.Query(**cmd_dict[u'query'])
+		if u'histData' in cmd_dict:
+			kwargs[u'histData'] = dms.HistData(**cmd_dict[u'histData'])
+		if u'changelog' in cmd_dict:
+			kwargs[u'changelog'] = dms.Changelog(**cmd_dict[u'changelog'])
+		if u'showExtInfos' in cmd_dict:
+			kwargs[u'showExtInfos'] = cmd_dict[u'showExtInfos']
+		return self._retag(self._dms_ws.dp_get(path=path, **kwargs), tag)
+
+	def _handle_set(self, conn, cmd_dict):
+		self.nof_forwarded += 1
+		kwargs = {}
+		for key in (u'create', u'type', u'stamp'):
+			if key in cmd_dict:
+				kwargs[key] = cmd_dict[key]
+		responses = self._dms_ws.dp_set(path=cmd_dict[u'path'], value=cmd_dict[u'value'], **kwargs)
+		# read-your-writes: next "get" of this client mustn't wait for DMS-event
+		# (set_node() doesn't overwrite newer values)
+		for resp in responses:
+			if resp.code == u'ok' and self._mirror.covers(resp.path):
+				self._mirror.set_node(resp.path, value=resp.value, datatype=resp.type, stamp=resp.stamp)
+		return self._retag(responses, cmd_dict.get(u'tag', None))
+
+	def _handle_rename(self, conn, cmd_dict):
+		self.nof_forwarded += 1
+		# marking before forwarding: DMS-event could arrive before response
+		paths_list = [cmd_dict[u'path'], cmd_dict[u'newPath']]
+		responses = self._forward_outdating(paths_list, self._dms_ws.dp_ren, path=cmd_dict[u'path'], newPath=cmd_dict[u'newPath'])
+		return self._retag(responses, cmd_dict.get(u'tag', None))
+
+	def _handle_delete(self, conn, cmd_dict):
+		self.nof_forwarded += 1
+		responses = self._forward_outdating([cmd_dict[u'path']], self._dms_ws.dp_del, path=cmd_dict[u'path'], recursive=cmd_dict.get(u'recursive', None))
+		return self._retag(responses, cmd_dict.get(u'tag', None))
+
+	def _forward_outdating(self, paths_list, func, **kwargs):
+		# renaming or deletion: these subtrees are answered by DMS until mirror got the DMS-event
+		for path in paths_list:
+			self._mirror.mark_outdated(path)
+		responses = []
+		try:
+			responses = func(**kwargs)
+		finally:
+			if not any(resp.code == u'ok' for resp in responses):
+				for path in paths_list:
+					self._mirror.unmark_outdated(path)
+		return responses
+
+	def _handle_changelogGetGroups(self, conn, cmd_dict):
+		# tagless command: response gets identified by tag of whole frame
+		self.nof_forwarded += 1
+		resp_list = []
+		for resp in self._dms_ws.changelog_GetGroups():
+			resp_dict = as_json_obj(resp)
+			resp_dict.pop(u'tag', None)
+			resp_list.append(resp_dict)
+		return resp_list
+
+	def _handle_changelogRead(self, conn, cmd_dict):
+		self.nof_forwarded += 1
+		kwargs = {}
+		if u'end' in cmd_dict:
+			kwargs[u'end'] = cmd_dict[u'end']
+		return self._retag(self._dms_ws.changelog_Read(group=cmd_dict[u'group'], start=cmd_dict[u'start'], **kwargs), cmd_dict.get(u'tag', None))
+
+
+	def _handle_subscribe(self, conn, cmd_dict):
+		tag = cmd_dict[u'tag']
+		path = cmd_dict[u'path']
+		query_dict = cmd_dict.get(u'query', None)
+		event_str = cmd_dict.get(u'event', None)
+		key = (path, json.dumps(query_dict, sort_keys=True), event_str)
+
+		# DMS replaces subscription with same path and tag
+		with self._lock:
+			old_key = self._downstream_subs_dict.get((conn, tag), None)
+		if old_key and old_key != key:
+			self._remove_downstream_sub(conn, tag)
+
+		with self._lock:
+			shared = self._shared_subs_dict.get(key, None)
+			if shared:
+				shared.add(conn, tag)
+				self._downstream_subs_dict[(conn, tag)] = key
+				return self._retag([shared.sub.sub_response], tag)
+
+		# upstream subscription needs a DMS roundtrip: other clients shouldn't wait for it
+		kwargs = {}
+		if query_dict:
+			kwargs[u'query'] = dms.Query(**query_dict)
+		if event_str:
+			kwargs[u'event'] = event_str
+		new_shared = _SharedSubscription(self._dms_ws.get_dp_subscription(path=path, **kwargs))
+		with self._lock:
+			shared = self._shared_subs_dict.get(key, None)
+			if not shared:
+				shared = new_shared
+				self._shared_subs_dict[key] = shared
+				logger.debug('DMSProxy._handle_subscribe(): new upstream subscription ' + repr(key))
+			shared.add(conn, tag)
+			self._downstream_subs_dict[(conn, tag)] = key
+		if not shared is new_shared:
+			# another client was faster, we don't need a second upstream subscription
+			try:
+				new_shared.sub.unsubscribe()
+			except Exception:
+				logger.exception('DMSProxy._handle_subscribe(): unsubscription of duplicate in DMS failed')
+		return self._retag([shared.sub.sub_response], tag)
+
+	def _handle_unsubscribe(self, conn, cmd_dict):
+		tag = cmd_dict[u'tag']
+		self._remove_downstream_sub(conn, tag)
+		return [{u'path': cmd_dict[u'path'], u'code': u'ok', u'tag': tag}]
+
+	def _remove_downstream_sub(self, conn, tag):
+		with self._lock:
+			key = self._downstream_subs_dict.pop((conn, tag), None)
+			shared = self._shared_subs_dict.get(key, None)
+			if not shared or shared.remove(conn, tag) > 0:
+				return
+			# last downstream subscriber is gone
+			del(self._shared_subs_dict[key])
+		logger.debug('DMSProxy._remove_downstream_sub(): removing upstream subscription ' + repr(key))
+		try:
+			shared.sub.unsubscribe()
+		except Exception:
+			logger.exception('DMSProxy._remove_downstream_sub(): unsubscription in DMS failed')
+
+
+
+def main(dms_server, dms_port, listen_host, listen_port, mirror_paths):
+	with dms.DMSClient(whois_str=u'pyVisiToolkit',
+	                   user_str=u'dms.dmsproxy',
+	                   dms_host_str=dms_server,
+	                   dms_port_int=dms_port,
+	                   auto_reconnect=True) as dms_ws:
+		logger.info('established WebSocket connection to DMS version ' + dms_ws.dp_get(path='System:Version:dms.exe')[0]['value'])
+		proxy = DMSProxy(dms_ws=dms_ws,
+		                 mirror_paths=mirror_paths,
+		                 host=listen_host,
+		                 port=listen_port)
+		proxy.start()
+		try:
+			logger.info('"dmsproxy" is working now... Press <CTRL> + C for aborting.')
+			while True:
+				time.sleep(10)
+				logger.debug('main(): mirror hits=' + str(proxy.nof_mirror_hits) + ', forwarded requests=' + str(proxy.nof_forwarded))
+		except KeyboardInterrupt:
+			pass
+		proxy.stop()
+	logger.info('Quitting "dmsproxy"...')
+
+	return 0        # success
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Caching proxy between WebSocket clients and DMS.')
+
+	parser.add_argument('--dms_servername', '-s', dest='dms_server', default='localhost', type=str, help='hostname or IP address for DMS JSON Data Exchange (default: localhost)')
+	parser.add_argument('--dms_port', '-p', dest='dms_port', default=9020, type=int, help='TCP port for DMS JSON Data Exchange (default: 9020)')
+	parser.add_argument('--listen_host', '-l', dest='listen_host', default=PROXY_HOST, type=str, help='listening address of proxy (default: ' + PROXY_HOST + ')')
+	parser.add_argument('--listen_port', '-L', dest='listen_port', default=PROXY_PORT, type=int, help='listening TCP port of proxy (default: ' + str(PROXY_PORT) + ')')
+	parser.add_argument('--mirror', '-m', action='append', dest='mirror_paths', default=[], type=str, help='DMS subtree kept in mirror, one or more times (example: -m MSR01)')
+
+	args = parser.parse_args()
+
+	status = main(dms_server = args.dms_server,
+	              dms_port = args.dms_port,
+	              listen_host = args.listen_host,
+	              listen_port = args.listen_port,
+	              mirror_paths = args.mirror_paths)
+	#sys.exit(status)
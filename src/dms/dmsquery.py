@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmsquery.py
+
+Copyright (C) 2018 Stefan Braun
+
+query-builder for "get" requests with "query" object (DMS JSON Data Exchange):
+filtering is always done by DMS, only matching DMS-keys get transferred.
+-large scans are paged: one request per son of start node, some requests are waiting in DMS at the same time
+-same filter can run on client side over cached data (e.g. dms.dmsproxy.DMSMirror or snapshot of dms.dmspipe) when DMS is not reachable
+
+example: all BMO instances of class "BMO:Pumpe":
+	q = DMSQuery().regex_path(r'^(?!BMO:).+:OBJECT$').regex_value(r'^BMO:Pumpe$').max_depth(0)
+	for resp in q.iter_responses(dms_ws):
+		print(resp.path)
+
+semantics of "maxDepth" (same as in dms.dmsproxy): 0 means unlimited, 1 means only sons of start node, ...
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmswebsocket as dms
+import datetime
+import re
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.dmsquery')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# query fields which can be evaluated without DMS
+OFFLINE_FIELDS = (u'regExPath', u'regExValue', u'regExStamp', u'isType', u'maxDepth')
+
+# DMS-keys of all BMO instances (BMO classes in subtree "BMO" are excluded)
+BMO_OBJECT_REGEX = r'^(?!BMO:).+:OBJECT$'
+
+
+def get_depth(base_path, path):
+	""" number of levels between base DMS-key and one of it's descendants """
+	if not base_path:
+		# (root node itself has depth 0)
+		return path.count(u':') + 1 if path else 0
+	return path.count(u':') - base_path.count(u':')
+
+
+def match_node(path, value, datatype, query_dict, stamp=None, base_path=None):
+	"""
+	client-side evaluation of "query" object on one DMS-key
+	=>"maxDepth" gets only checked when "base_path" is given
+	"""
+	if not query_dict:
+		return True
+	for key in query_dict:
+		if not key in OFFLINE_FIELDS:
+			raise ValueError(u'field "' + key + u'" in "query" object is only available in DMS')
+	if u'regExPath' in query_dict and not re.search(query_dict[u'regExPath'], path):
+		return False
+	if u'regExValue' in query_dict:
+		if value is None or not re.search(query_dict[u'regExValue'], unicode(value)):
+			return False
+	if u'regExStamp' in query_dict:
+		if isinstance(stamp, datetime.datetime):
+			stamp = stamp.isoformat()
+		if stamp is None or not re.search(query_dict[u'regExStamp'], stamp):
+			return False
+	if u'isType' in query_dict and datatype != query_dict[u'isType']:
+		return False
+	if base_path is not None and query_dict.get(u'maxDepth', 0) > 0:
+		if get_depth(base_path, path) > query_dict[u'maxDepth']:
+			return False
+	return True
+
+
+class DMSQuery(object):
+	""" query-builder: pushing filters into DMS, optionally paged """
+
+	def __init__(self, path=u'', **kwargs):
+		# start node (u'' is root of DMS)
+		self.path = u'' + path
+		# keyword arguments for dms.dmswebsocket.Query()
+		self._query_dict = {}
+		for key, val in kwargs.items():
+			self._set(key, val)
+
+	def _set(self, key, val):
+		# validation by Query() constructor
+		self._query_dict.update(dms.Query(**{key: val}).as_dict())
+		return self
+
+	# chainable setters
+	def regex_path(self, pattern):
+		return self._set(u'regExPath', pattern)
+
+	def regex_value(self, pattern):
+		return self._set(u'regExValue', pattern)
+
+	def regex_stamp(self, pattern):
+		return self._set(u'regExStamp', pattern)
+
+	def is_type(self, datatype_str):
+		return self._set(u'isType', datatype_str)
+
+	def max_depth(self, depth):
+		return self._set(u'maxDepth', depth)
+
+	def has_hist_data(self, flag=True):
+		return self._set(u'hasHistData', flag)
+
+	def has_changelog(self, flag=True):
+		return self._set(u'hasChangelog', flag)
+
+	def has_alarm_data(self, flag=True):
+		return self._set(u'hasAlarmData', flag)
+
+
+	def as_dict(self):
+		return dict(self._query_dict)
+
+	def as_query(self, **changes):
+		""" dms.dmswebsocket.Query() object, optionally with changed fields """
+		query_dict = dict(self._query_dict)
+		query_dict.update(changes)
+		return dms.Query(**query_dict)
+
+	def __repr__(self):
+		return u'DMSQuery(path=' + repr(self.path) + u', query=' + repr(self._query_dict) + u')'
+
+
+	def get(self, dms_ws, timeout=dms.REQ_TIMEOUT):
+		""" whole result in one request (list of RespGet objects with code "ok") """
+		return [resp for resp in dms_ws.dp_get(path=self.path, query=self.as_query(), timeout=timeout) if resp.code == u'ok']
+
+
+	def iter_pages(self, dms_ws, max_inflight=dms.GET_MAX_INFLIGHT, timeout=dms.REQ_TIMEOUT):
+		"""
+		generator: result in pages (lists of RespGet objects with code "ok")
+		=>first page contains matching DMS-keys in first level under start node,
+		  then one page per son of start node with matching DMS-keys in it's subtree
+		=>requests of following pages are waiting in DMS while caller handles current page
+		"""
+		max_depth = self._query_dict.get(u'maxDepth', 0)
+
+		# first level: filtered by DMS (fields like "hasAlarmData" can't be evaluated here)
+		first_page = []
+		first_level_set = set()
+		for resp in dms_ws.dp_get(path=self.path, query=self.as_query(maxDepth=1), timeout=timeout):
+			if resp.code == u'ok':
+				first_page.append(resp)
+				first_level_set.add(resp.path)
+		yield first_page
+		if max_depth == 1:
+			return
+
+		# sons of start node: only names are needed, but DMS has no way for suppressing values...
+		# (start node itself is not a son)
+		sons_list = []
+		for resp in dms_ws.dp_get(path=self.path, query=dms.Query(maxDepth=1), timeout=timeout):
+			if resp.code == u'ok' and resp.hasChild and resp.path != self.path:
+				sons_list.append(resp.path)
+		logger.debug('DMSQuery.iter_pages(): ' + str(len(sons_list)) + ' subtrees under "' + self.path + '"...')
+
+		if max_depth > 0:
+			son_query = self.as_query(maxDepth=max_depth - 1)
+		else:
+			son_query = self.as_query(maxDepth=0)
+		cmd_kwargs_gen = ({u'path': son, u'query': son_query} for son in sons_list)
+		for resp_list in dms_ws.dp_get_pipelined(cmd_kwargs_gen, max_inflight=max_inflight, timeout=timeout):
+			# son itself was already checked in first page
+			yield [resp for resp in resp_list if resp.code == u'ok' and not resp.path in first_level_set]
+
+
+	def iter_responses(self, dms_ws, max_inflight=dms.GET_MAX_INFLIGHT, timeout=dms.REQ_TIMEOUT):
+		""" generator: all RespGet objects of all pages """
+		for page in self.iter_pages(dms_ws, max_inflight=max_inflight, timeout=timeout):
+			for resp in page:
+				yield resp
+
+
+	def matches(self, path, value, datatype, stamp=None):
+		""" client-side evaluation on one DMS-key (raises ValueError for fields only DMS knows) """
+		if not (not self.path or path == self.path or path.startswith(self.path + u':')):
+			return False
+		return match_node(path, value, datatype, self._query_dict, stamp=stamp, base_path=self.path)
+
+
+	def filter_mirror(self, mirror):
+		""" same query over a dms.dmsproxy.DMSMirror object (list of dictionaries as returned by DMS) """
+		return [resp for resp in mirror.get(self.path, self._query_dict) if resp[u'code'] == u'ok']
+
+
+	def filter_snapshot(self, snapshot_dict):
+		"""
+		same query over a snapshot dictionary, e.g. from dms.dmspipe.Dmspipe.get_DMS_subtree_snapshot()
+		(key: DMS-key, value: tuple (datatype, value)), returns sorted list of matching DMS-keys
+		=>attention: "isType" has to use same datatype representation as snapshot
+		"""
+		return sorted(path for path, (datatype, value) in snapshot_dict.iteritems() if self.matches(path, value, datatype))
+
+
+def find_bmo_instances(dms_ws, bmo_class=None, path=u'', timeout=dms.REQ_TIMEOUT):
+	"""
+	all BMO instances under given node as list of tuples (instance, BMO class)
+	=>only ":OBJECT" DMS-keys (optionally only of one BMO class) get transferred
+	"""
+	query = DMSQuery(path=path).regex_path(BMO_OBJECT_REGEX).max_depth(0)
+	if bmo_class:
+		query.regex_value(u'^' + re.escape(bmo_class) + u'$')
+	instances_list = []
+	for resp in query.iter_responses(dms_ws, timeout=timeout):
+		instances_list.append((resp.path[:-len(u':OBJECT')], resp.value))
+	return instances_list
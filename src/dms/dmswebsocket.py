@@ -12,7 +12,7 @@ current state january 4th 2018:
   -learn Python3, make code compatible for Python 3
   -documentation and examples
   -create clean package for pip, Anaconda Cloud, ...
-  -(caching?) proxy between client(s) and DMS
+  -(caching?) proxy between client(s) and DMS =>implemented in dms.dmsproxy
   -provide services via ZeroMQ or other IPC to other pyVisiToolkit programms
   -SSL-WebSocket connection to DMS
   -...
@@ -42,17 +42,19 @@ DEBUGGING = False
 import json
 import time
 import uuid
-import websocket
-import thread
 import threading
 import collections
-import dateutil.parser, datetime
+import copy
+import heapq
+import datetime
 import logging
-import queue
 
 # lightweight event handling with homegrew EventSystem()
 from misc.EventSystem import EventSystem
 
+# latency histograms, throughput and queue depth (look in dms.dmsmetrics for details)
+import dms.dmsmetrics as dmsmetrics
+
 
 
 # setup of logging
@@ -76,6 +78,29 @@ ch.setFormatter(formatter)
 logger.addHandler(ch)
 
 
+# modules "websocket" and "dateutil" are imported on first usage:
+# =>GUI tools importing this module start faster (their window appears before the DMS connection is established)
+_dateutil_parser = None
+_dateutil_tz = None
+
+def parse_datetime(tstamp_str):
+	# ISO 8601 timestamp from DMS -> datetime.datetime object
+	global _dateutil_parser
+	if not _dateutil_parser:
+		import dateutil.parser
+		_dateutil_parser = dateutil.parser
+	return _dateutil_parser.parse(tstamp_str)
+
+
+def get_tzlocal():
+	# timezone of local machine (naive timestamps of caller are in local time, as in dmschangelog.as_datetime())
+	global _dateutil_tz
+	if not _dateutil_tz:
+		import dateutil.tz
+		_dateutil_tz = dateutil.tz
+	return _dateutil_tz.tzlocal()
+
+
 
 
 
@@ -93,6 +118,14 @@ DMS_BASEPATH = "/json_data" # default for HTTP and WebSocket
 # default timeout in seconds for DMS JSON Data Exchange requests
 REQ_TIMEOUT = 300
 
+# timeout in seconds for establishing first WebSocket connection
+CONNECT_TIMEOUT = 60
+
+# automatic reconnection after loss of WebSocket connection:
+# delay in seconds before next try, doubled after every failed try
+RECONNECT_DELAY_MIN = 1.0
+RECONNECT_DELAY_MAX = 60.0
+
 # Python callbacks fired by monitored DMS datapoints (DMS-Events),
 # via thread _SubscriptionES_Dispatcher:
 # log a warning if callback execution duration is too long
@@ -101,6 +134,51 @@ CALLBACK_DURATION_WARNLEVEL = 10
 # log a warning if too many unprocessed events are waiting
 # (number of queue elements)
 EVENTQUEUE_WARNSIZE = 100
+# number of worker threads firing SubscriptionES objects in parallel
+# (events of one subscription are always fired in order, one after the other)
+EVENT_WORKERS = 4
+# maximum number of unprocessed events (0 means unlimited)
+EVENTQUEUE_MAXSIZE = 0
+
+# behaviour of full event queue
+QUEUE_BLOCK         = u'block'          # WebSocket thread waits until an event got processed
+QUEUE_DROP_OLDEST   = u'drop_oldest'    # oldest waiting event of lowest priority gets discarded
+QUEUE_COALESCE      = u'coalesce'       # waiting event with same subscription and DMS-key gets replaced by newest event
+                                        # (when there's no such event, then oldest event gets discarded)
+
+# priority classes of subscriptions
+# (events of subscriptions with higher priority are fired first)
+PRIO_HIGH   = 0
+PRIO_NORMAL = 1
+PRIO_LOW    = 2
+
+# retrieving long timeranges of trenddata in smaller windows
+# (generator _MessageHandler.dp_get_histData_chunks())
+# =>size of one window and number of requests waiting for DMS response at the same time
+HISTDATA_CHUNK_TIMEDELTA = datetime.timedelta(days=7)
+HISTDATA_MAX_INFLIGHT = 4
+
+# number of "get" requests waiting for DMS response at the same time
+# (generator _MessageHandler.dp_get_pipelined(), e.g. used by paged queries in dms.dmsquery)
+GET_MAX_INFLIGHT = 8
+
+# number of "changelogRead" requests waiting for DMS response at the same time
+# (generator _MessageHandler.changelog_Read_pipelined(), e.g. used by dms.dmschangelog)
+CHANGELOG_MAX_INFLIGHT = 4
+
+# optional read-through cache of DMS values (class DMSValueCache())
+# =>maximum number of cached DMS-keys (least recently used get evicted)
+#   and maximum age in seconds of a cached value
+VALUECACHE_MAXSIZE = 10000
+VALUECACHE_MAX_AGE = 60.0
+
+# optional write-behind buffer for "set" commands (class DMSWriteBuffer())
+# =>buffered DMS-keys before flushing by caller, maximum delay in seconds of a buffered value
+#   and maximum number of "set" commands in one request
+#   (DMS accepts JSON requests up to 64kByte, one "set" command with message tag needs about 150 bytes)
+WRITEBUFFER_MAX_KEYS = 2000
+WRITEBUFFER_MAX_DELAY = 0.05
+WRITEBUFFER_FRAME_SIZE = 250
 
 
 
@@ -256,6 +334,14 @@ class _Request(object):
 		""" returns all messagetags from included commands """
 		return self._cmd_tags_list
 
+	def get_tags_with_types(self):
+		""" returns list of tuples (messagetag, command type) of included commands """
+		tags_list = []
+		for cmdtype in self._cmd_dict:
+			for cmd in self._cmd_dict[cmdtype]:
+				tags_list.append((cmd.tag, cmdtype))
+		return tags_list
+
 	def __repr__(self):
 		""" developer representation of this object """
 		return u'_Request(' + repr(self.as_dict()) + u')'
@@ -385,9 +471,9 @@ class _CmdGet(object):
 					showExtInfos_int = int(showExtInfos)
 					assert showExtInfos_int > 0 and showExtInfos_int <= INFO_ALL, u'field "showExtInfos" excepts integer constant, got illegal value "' + str(showExtInfos_int) + u'"'
 					self.showExtInfos = self.showExtInfos_as_strlist(showExtInfos_int)
-				except ValueError:
+				except (ValueError, TypeError):
 					# assumption: it's already a list of strings
-					self.showExtInfos = [].extend(showExtInfos)
+					self.showExtInfos = list(showExtInfos)
 			elif key == u'query':
 				self.query = kwargs.pop(key)
 				assert type(self.query) is Query, u'field "query" expects "Query" object, got "' + str(type(self.query)) + u'" instead'
@@ -553,6 +639,7 @@ class _CmdSub(object):
 		# =>since all fields in "sub" object and all it's subobjects are unique, we could handle them in the same loop
 		self.path = u'' + path
 		self.query = None
+		self.event = None
 		curr_tag = None
 		if u'tag' in kwargs.keys():
 			# caller wants to reuse existing tag =>DMS will update subscription when path and tag match a current subscription
@@ -765,7 +852,7 @@ class HistData_detail(_Mylist):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						curr_dict[field] = dateutil.parser.parse(histobj[field])
+						curr_dict[field] = parse_datetime(histobj[field])
 					except ValueError:
 						# something went wrong, conversion into a datetime.datetime() object isn't possible
 						logger.exception('constructor of HistData_detail(): ERROR: timestamp in current response could not get parsed as valid datetime.datetime() object!')
@@ -803,7 +890,7 @@ class HistData_compact(_Mylist):
 			# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 			# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 			try:
-				stamp = dateutil.parser.parse(stamp_str)
+				stamp = parse_datetime(stamp_str)
 			except ValueError:
 				# something went wrong, conversion into a datetime.datetime() object isn't possible
 				logger.exception('constructor of HistData_compact(): ERROR: timestamp in current response could not get parsed as valid datetime.datetime() object!')
@@ -834,7 +921,7 @@ class Changelog_Protocol(_Mylist):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						curr_dict[field] = dateutil.parser.parse(obj[field])
+						curr_dict[field] = parse_datetime(obj[field])
 					except ValueError:
 						# something went wrong, conversion into a datetime.datetime() object isn't possible
 						logger.exception('constructor of Changelog_Protocol(): ERROR: timestamp in current response could not get parsed as valid datetime.datetime() object!')
@@ -973,7 +1060,7 @@ class RespGet(_Mydict, _Response):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						self._values_dict[field] = dateutil.parser.parse(kwargs.pop(field))
+						self._values_dict[field] = parse_datetime(kwargs.pop(field))
 					except:
 						self._values_dict[field] = None
 				elif field == u'extInfos':
@@ -1042,7 +1129,7 @@ class RespSet(_Mydict, _Response):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						self._values_dict[field] = dateutil.parser.parse(kwargs.pop(field))
+						self._values_dict[field] = parse_datetime(kwargs.pop(field))
 					except:
 						self._values_dict[field] = None
 				else:
@@ -1134,7 +1221,7 @@ class RespSub(_Mydict, _Response):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						self._values_dict[field] = dateutil.parser.parse(kwargs.pop(field))
+						self._values_dict[field] = parse_datetime(kwargs.pop(field))
 					except:
 						self._values_dict[field] = None
 				elif field == u'query':
@@ -1180,7 +1267,7 @@ class RespUnsub(_Mydict, _Response):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						self._values_dict[field] = dateutil.parser.parse(kwargs.pop(field))
+						self._values_dict[field] = parse_datetime(kwargs.pop(field))
 					except:
 						self._values_dict[field] = None
 				elif field == u'query':
@@ -1275,9 +1362,19 @@ class SubscriptionES(EventSystem):
 	# =>caller has to attach his callback functions to this object.
 	# (Factory for this object is in DMSClient.get_dp_subscription())
 
-	def __init__(self, msghandler, sub_response):
+	def __init__(self, msghandler, sub_response, priority=PRIO_NORMAL, time_budget=CALLBACK_DURATION_WARNLEVEL, coalesce_interval=None, sub_kwargs=None):
 		self._msghandler = msghandler
 		self.sub_response = sub_response  # original DMS response (instance of RespSub())
+		# options of "subscribe" command (e.g. "event" and "query"), needed for resubscription after reconnect
+		self.sub_kwargs = sub_kwargs or {}
+		self._is_subscribed = True
+		# options for _SubscriptionES_Dispatcher:
+		# priority class of events and allowed execution duration of all callbacks (in seconds)
+		self.priority = priority
+		self.time_budget = time_budget
+		# optional coalescing of events (minimal interval in seconds between two events of the same DMS-key, latest value wins)
+		# =>look in class _EventCoalescer() for details
+		self.coalesce_interval = coalesce_interval
 		super(SubscriptionES, self).__init__()
 
 
@@ -1296,12 +1393,17 @@ class SubscriptionES(EventSystem):
 		assert not u'tag' in kwargs, u'DMS uses path and tag for identifying subscription. Changing is not allowed!'
 		if u'path' in kwargs:
 			del (kwargs[u'path'])
+		self.sub_kwargs.update(kwargs)
 		kwargs[u'tag'] = self.sub_response[u'tag']
 		resp = self._msghandler.dp_sub(path=self.sub_response[u'path'], **kwargs)
 
 
 	def unsubscribe(self):
 		# FIXME: how to report errors to caller?
+		if not self._is_subscribed:
+			# already done (explicit call and later call from destructor)
+			return
+		self._is_subscribed = False
 		resp = self._msghandler._dp_unsub(path=self.sub_response[u'path'],
 		                                  tag=self.sub_response[u'tag'])
 		self._msghandler.del_subscription(self)
@@ -1348,7 +1450,7 @@ class DMSEvent(_Mydict):
 					# timestamps are ISO 8601 formatted (or "null" after DMS restart or on nodes with type "none")
 					# https://stackoverflow.com/questions/969285/how-do-i-translate-a-iso-8601-datetime-string-into-a-python-datetime-object
 					try:
-						self._values_dict[field] = dateutil.parser.parse(kwargs[field])
+						self._values_dict[field] = parse_datetime(kwargs[field])
 					except:
 						self._values_dict[field] = None
 				elif field == u'code':
@@ -1377,15 +1479,23 @@ class DMSEvent(_Mydict):
 
 
 class _MessageHandler(object):
-	def __init__(self, dmsclient_obj, whois_str, user_str, subES_queue):
+	def __init__(self, dmsclient_obj, whois_str, user_str, subES_queue, metrics=None):
 		# backreference for sending messages
 		self._dmsclient = dmsclient_obj
 		self._whois_str = whois_str
 		self._user_str = user_str
 
+		# recording of latency, in-flight requests and throughput
+		self.metrics = metrics or dmsmetrics.DMSMetrics()
+
 		# Queue for firing Subscription-EventSystem objects
 		self._subES_queue = subES_queue
 
+		# background thread for subscriptions with event coalescing
+		# (will be started when it's needed the first time)
+		self._coalescer = None
+		self._coalescer_lock = threading.Lock()
+
 		# thread safety for shared dictionaries =>we want to be on the safe side!
 		# (documentation: https://docs.python.org/2/library/threading.html#lock-objects )
 		# http://effbot.org/pyfaq/what-kinds-of-global-value-mutation-are-thread-safe.htm
@@ -1419,6 +1529,8 @@ class _MessageHandler(object):
 		def __init__(self):
 			self.isAvailable = threading.Event()
 			self.response_list = []
+			# set when WebSocket connection got lost before response arrived
+			self.failed = False
 
 
 	def dp_get(self, path, timeout=REQ_TIMEOUT, **kwargs):
@@ -1456,6 +1568,22 @@ class _MessageHandler(object):
 			raise Exception('Please report this bug of pyVisiToolkit!')
 
 
+	def dp_set_frame(self, cmd_args_list):
+		""" many "set" commands in one request without waiting for responses (returns list of message tags in same order) """
+		# =>"cmd_args_list": iterable of tuples (path, value, dictionary with keyword arguments for "set" command)
+		req = _Request(whois=self._whois_str, user=self._user_str)
+		for path, value, kwargs in cmd_args_list:
+			req.addCmd(_CmdSet(msghandler=self, path=path, value=value, **kwargs))
+		try:
+			self._send_frame(req)
+		except Exception:
+			# nobody will get a response
+			for tag in req.get_tags():
+				self._discard_pending_response(tag)
+			raise
+		return req.get_tags()
+
+
 	def dp_del(self, path, recursive, timeout=REQ_TIMEOUT, **kwargs):
 		""" delete datapoint(s) """
 
@@ -1555,7 +1683,133 @@ class _MessageHandler(object):
 
 
 
+	def dp_get_histData_chunks(self, path, start, end, chunk_timedelta=HISTDATA_CHUNK_TIMEDELTA, max_inflight=HISTDATA_MAX_INFLIGHT, timeout=REQ_TIMEOUT, **kwargs):
+		""" read trenddata of one datapoint in smaller timeranges (generator) """
+		# =>splitting whole timerange into windows of "chunk_timedelta",
+		#   keeping up to "max_inflight" requests in DMS, yielding one RespGet() per window in chronological order.
+		#   Only a few windows are buffered at the same time, and caller gets first trenddata before last window is sent.
+		# =>keyword arguments are forwarded into HistData() (e.g. "format" and "interval") or into "get" command (e.g. "showExtInfos")
+		# workaround: when second and millisecond is not null in HistData, then DMS doesn't handle "end"...
+		#             =>caller should use timestamps and "chunk_timedelta" with whole minutes!
+		histData_kwargs = {}
+		for key in kwargs.keys():
+			if key in (u'format', u'interval'):
+				histData_kwargs[key] = kwargs.pop(key)
+
+		start_dt = self._as_datetime(start)
+		end_dt = self._as_datetime(end)
+		assert chunk_timedelta > datetime.timedelta(0), u'parameter "chunk_timedelta" has to be a positive timespan!'
+		assert max_inflight > 0, u'parameter "max_inflight" has to be a positive number!'
+
+		# list of timeranges of all windows
+		windows_list = []
+		curr_start = start_dt
+		while curr_start < end_dt:
+			curr_end = min(curr_start + chunk_timedelta, end_dt)
+			windows_list.append((curr_start, curr_end))
+			curr_start = curr_end
+
+		# FIFO of sent requests: tuples (tag, window end, is last window)
+		pending_deque = collections.deque()
+		next_idx = 0
+		try:
+			while next_idx < len(windows_list) or pending_deque:
+				# fill pipeline
+				while next_idx < len(windows_list) and len(pending_deque) < max_inflight:
+					win_start, win_end = windows_list[next_idx]
+					histDataObj = HistData(start=win_start, end=win_end, **histData_kwargs)
+					req = _Request(whois=self._whois_str, user=self._user_str).addCmd(
+						_CmdGet(msghandler=self, path=path, histData=histDataObj, **kwargs))
+					self._send_frame(req)
+					next_idx += 1
+					pending_deque.append((req.get_tags()[0], win_end, next_idx == len(windows_list)))
+
+				# responses in same order as requests
+				tag, win_end, is_last = pending_deque.popleft()
+				resp_list = self._busy_wait_for_response(tag, timeout)
+				if not is_last:
+					# DMS includes the end timestamp of a window,
+					# this sample will come again as first sample of next window
+					for resp in resp_list:
+						self._trim_histData(resp, win_end)
+				for resp in resp_list:
+					yield resp
+		finally:
+			# caller stopped iteration early: forget all unfinished requests
+			for tag, win_end, is_last in pending_deque:
+				self._discard_pending_response(tag)
+
+
+	def dp_get_pipelined(self, cmd_kwargs_list, max_inflight=GET_MAX_INFLIGHT, timeout=REQ_TIMEOUT):
+		""" many "get" requests with up to "max_inflight" requests in DMS at the same time (generator) """
+		# =>"cmd_kwargs_list": iterable of dictionaries with keyword arguments for one "get" command (e.g. {u'path': ..., u'query': ...}),
+		#   yielding one response list per command in same order
+		return self._send_pipelined(_CmdGet, cmd_kwargs_list, max_inflight, timeout)
+
+
+	def changelog_Read_pipelined(self, cmd_kwargs_list, max_inflight=CHANGELOG_MAX_INFLIGHT, timeout=REQ_TIMEOUT):
+		""" many "changelogRead" requests with up to "max_inflight" requests in DMS at the same time (generator) """
+		# =>"cmd_kwargs_list": iterable of dictionaries with keyword arguments for one "changelogRead" command
+		#   (e.g. {u'group': ..., u'start': ..., u'end': ...}), yielding one response list per command in same order
+		return self._send_pipelined(_CmdChangelogRead, cmd_kwargs_list, max_inflight, timeout)
+
+
+	def _send_pipelined(self, cmd_cls, cmd_kwargs_list, max_inflight, timeout):
+		# generator: one command per request, up to "max_inflight" requests are waiting for DMS
+		assert max_inflight > 0, u'parameter "max_inflight" has to be a positive number!'
+		cmd_kwargs_iter = iter(cmd_kwargs_list)
+		# FIFO of tags of sent requests
+		pending_deque = collections.deque()
+		try:
+			is_exhausted = False
+			while not is_exhausted or pending_deque:
+				# fill pipeline
+				while not is_exhausted and len(pending_deque) < max_inflight:
+					try:
+						cmd_kwargs = next(cmd_kwargs_iter)
+					except StopIteration:
+						is_exhausted = True
+					else:
+						req = _Request(whois=self._whois_str, user=self._user_str).addCmd(
+							cmd_cls(msghandler=self, **cmd_kwargs))
+						self._send_frame(req)
+						pending_deque.append(req.get_tags()[0])
+
+				if pending_deque:
+					# responses in same order as requests
+					tag = pending_deque.popleft()
+					yield self._busy_wait_for_response(tag, timeout)
+		finally:
+			# caller stopped iteration early: forget all unfinished requests
+			for tag in pending_deque:
+				self._discard_pending_response(tag)
+
+
+	@staticmethod
+	def _as_datetime(tstamp):
+		# accepting datetime.datetime objects and ISO 8601 strings, without timezone we assume local time
+		# (stamps in trenddata from DMS contain timezone, comparison of naive and aware datetime objects raises TypeError)
+		if not isinstance(tstamp, datetime.datetime):
+			tstamp = parse_datetime(tstamp)
+		if tstamp.tzinfo is None:
+			tstamp = tstamp.replace(tzinfo=get_tzlocal())
+		return tstamp
+
+
+	@staticmethod
+	def _trim_histData(resp, end_dt):
+		# removing all trenddata samples at or after given timestamp
+		# (RespGet() contains HistData_detail() with dictionaries or HistData_compact() with tuples)
+		histData = resp.get(u'histData', None)
+		if histData:
+			if isinstance(histData, HistData_detail):
+				histData._values_list = [item for item in histData._values_list if item[u'stamp'] is None or item[u'stamp'] < end_dt]
+			else:
+				histData._values_list = [item for item in histData._values_list if item[0] is None or item[0] < end_dt]
+
+
 	def handle(self, msg):
+		self.metrics.frame_received(len(msg))
 		payload_dict = json.loads(msg.decode('utf8'))
 
 		try:
@@ -1592,16 +1846,10 @@ class _MessageHandler(object):
 								self._curr_response.resp_list.append(resp_cls(**response))
 							else:
 								# found a new tag =>save old list and create a new one
+								# (e.g. DMSWriteBuffer sends many "set" commands in one request)
 								if self._curr_response.msg_tag and self._curr_response.resp_list:
-									# need to save last responses
-									if curr_tag in self._pending_response_dict:
-										logger.debug('message handler: found different tags in response. Storing response for other thread...')
-										with self._pending_response_lock:
-											self._pending_response_dict[curr_tag].response_list = self._curr_response.resp_list
-											# inform other thread
-											self._pending_response_dict[curr_tag].isAvailable.set()
-									else:
-										logger.warn('message handler: ignoring unexpected response "' + repr(self._curr_response.resp_list) + '"...')
+									logger.debug('message handler: found different tags in response. Storing response for other thread...')
+									self._store_response(self._curr_response.msg_tag, self._curr_response.resp_list)
 								# begin of new response list
 								self._curr_response.msg_tag = curr_tag
 								self._curr_response.resp_list = [resp_cls(**response)]
@@ -1611,11 +1859,9 @@ class _MessageHandler(object):
 
 
 					# storing collected list for other thread
-					logger.debug('message handler: storing of response for other thread...')
-					with self._pending_response_lock:
-						self._pending_response_dict[curr_tag].response_list = self._curr_response.resp_list
-						# inform other thread
-						self._pending_response_dict[curr_tag].isAvailable.set()
+					if self._curr_response.msg_tag:
+						logger.debug('message handler: storing of response for other thread...')
+						self._store_response(self._curr_response.msg_tag, self._curr_response.resp_list)
 		except Exception as ex:
 			# help from https://stackoverflow.com/questions/5191830/best-way-to-log-a-python-exception
 			logger.exception("exception occurred in _MessageHandler.handle()")
@@ -1624,6 +1870,7 @@ class _MessageHandler(object):
 		if u'event' in payload_dict:
 			# handling DMS-events
 			for event in payload_dict[u'event']:
+				self.metrics.event_received()
 				# trigger Python event
 				try:
 					event_obj = DMSEvent(**event)
@@ -1633,8 +1880,12 @@ class _MessageHandler(object):
 					# via background thread: firing Python callback functions registered in EventSystem object
 					# (result is list of tuples)
 					if len(subES) > 0:
-						logger.debug('_MsgHandler.handle(): queueing event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']...')
-						self._subES_queue.put((subES, event_obj))
+						if subES.coalesce_interval:
+							logger.debug('_MsgHandler.handle(): coalescing event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']...')
+							self._get_coalescer().put(subES, event_obj)
+						else:
+							logger.debug('_MsgHandler.handle(): queueing event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']...')
+							self._subES_queue.put((subES, event_obj))
 					else:
 						logger.info('_MsgHandler.handle(): SubscriptionsAE object is empty, suppressing firing of EventSystem object...')
 
@@ -1650,13 +1901,36 @@ class _MessageHandler(object):
 
 
 
+	def _store_response(self, tag, resp_list):
+		# hand over response list to waiting thread
+		with self._pending_response_lock:
+			if tag in self._pending_response_dict:
+				self._pending_response_dict[tag].response_list = resp_list
+				# inform other thread
+				self._pending_response_dict[tag].isAvailable.set()
+			else:
+				logger.debug('message handler: ignoring response of discarded request with tag "' + tag + '"...')
+		self.metrics.request_done(tag)
+
+
 	def _send_frame(self, frame_obj):
 		# send whole request
 
 		# create valid JSON
 		# (according to https://docs.python.org/2/library/json.html : default encoding is UTF8)
 		req_str = json.dumps(frame_obj.as_dict())
-		self._dmsclient._send_message(req_str)
+
+		# start of latency measurement has to be before sending (response could arrive immediately)
+		tags_list = frame_obj.get_tags_with_types()
+		for tag, cmdtype in tags_list:
+			self.metrics.request_sent(tag, cmdtype)
+		try:
+			self._dmsclient._send_message(req_str)
+		except Exception:
+			for tag, cmdtype in tags_list:
+				self.metrics.request_discarded(tag)
+			raise
+		self.metrics.frame_sent(len(req_str))
 
 	def _busy_wait_for_response(self, tag, timeout):
 		while not tag in self._pending_response_dict:
@@ -1668,11 +1942,74 @@ class _MessageHandler(object):
 		if isAvailable.wait(timeout=timeout):
 			with self._pending_response_lock:
 				curr_container = self._pending_response_dict.pop(tag)
+			if curr_container.failed:
+				raise IOError('_MessageHandler._busy_wait_for_response(): WebSocket connection to DMS was lost while waiting for response')
 			return curr_container.response_list
 		else:
 			# no response in given timeframe... Should we return an exception?
+			self.metrics.request_discarded(tag, is_timeout=True)
 			raise Exception('_MessageHandler.DMS_busy_wait_for_response(): got no response within ' + str(timeout) + ' seconds...')
 
+	def fail_pending_responses(self):
+		""" connection is lost: wake up all threads waiting for a response """
+		with self._pending_response_lock:
+			for curr_container in self._pending_response_dict.values():
+				if not curr_container.isAvailable.is_set():
+					curr_container.failed = True
+					curr_container.isAvailable.set()
+		self.metrics.requests_failed()
+
+
+	def replay_subscriptions(self, timeout=REQ_TIMEOUT):
+		""" after reconnection: register all active subscriptions again in DMS """
+		# =>sending all "subscribe" commands at once, then collecting responses
+		#   (same path and tag as before, so events will be fired on existing SubscriptionES objects)
+		with self._subscriptionES_objs_lock:
+			subES_list = self._subscriptionES_objs_dict.values()
+
+		sent_list = []
+		for subES in subES_list:
+			path = subES.sub_response[u'path']
+			try:
+				req = _Request(whois=self._whois_str, user=self._user_str).addCmd(
+					_CmdSub(msghandler=self, path=path, tag=subES.get_tag(), **subES.sub_kwargs))
+				self._send_frame(req)
+				sent_list.append(subES)
+			except Exception:
+				logger.exception('_MessageHandler.replay_subscriptions(): resubscription of DMS-key "' + path + '" failed')
+				# connection is probably lost again, next reconnection will retry
+				# (tag of failed command was registered, too)
+				self._discard_replay_responses(sent_list + [subES])
+				return False
+
+		for subES in sent_list:
+			path = subES.sub_response[u'path']
+			try:
+				response = self._busy_wait_for_response(subES.get_tag(), timeout)[0]
+				if response[u'code'] == u'ok':
+					subES.sub_response = response
+				else:
+					logger.error('_MessageHandler.replay_subscriptions(): DMS ignored resubscription of DMS-key "' + path + '" with error "' + response[u'code'] + '"!')
+			except Exception:
+				logger.exception('_MessageHandler.replay_subscriptions(): resubscription of DMS-key "' + path + '" failed')
+				self._discard_replay_responses(sent_list)
+				return False
+		logger.info('_MessageHandler.replay_subscriptions(): ' + str(len(sent_list)) + ' subscriptions are active again.')
+		return True
+
+
+	def _discard_replay_responses(self, subES_list):
+		# nobody will wait for responses of this replay (already received responses are gone)
+		for subES in subES_list:
+			self._discard_pending_response(subES.get_tag())
+
+
+	def _discard_pending_response(self, tag):
+		# nobody will wait for this response
+		with self._pending_response_lock:
+			self._pending_response_dict.pop(tag, None)
+		self.metrics.request_discarded(tag)
+
 	def add_subscription(self, subAE):
 		with self._subscriptionES_objs_lock:
 			self._subscriptionES_objs_dict[subAE.get_tag()] = subAE
@@ -1680,6 +2017,26 @@ class _MessageHandler(object):
 	def del_subscription(self, subAE):
 		with self._subscriptionES_objs_lock:
 			del(self._subscriptionES_objs_dict[subAE.get_tag()])
+		if self._coalescer:
+			self._coalescer.forget(subAE.get_tag())
+		self.metrics.forget_subscription(subAE.get_tag())
+
+	def get_nof_subscriptions(self):
+		with self._subscriptionES_objs_lock:
+			return len(self._subscriptionES_objs_dict)
+
+	def _get_coalescer(self):
+		with self._coalescer_lock:
+			if not self._coalescer:
+				self._coalescer = _EventCoalescer(event_q=self._subES_queue)
+				self._coalescer.start()
+			return self._coalescer
+
+	def stop_coalescer(self):
+		with self._coalescer_lock:
+			if self._coalescer:
+				self._coalescer.stop()
+				self._coalescer = None
 
 
 	def prepare_tag(self, curr_tag=None):
@@ -1697,135 +2054,1001 @@ class _MessageHandler(object):
 
 
 
+class _EventQueue(object):
+	""" queue for events of SubscriptionES objects, ordered per subscription and prioritized """
+	# =>every subscription (identified by its tag) has its own FIFO "lane",
+	#   a lane is handed out to only one worker thread at the same time (keeping order of events in one subscription),
+	#   different lanes are processed in parallel (ready lanes with higher priority first)
+
+	def __init__(self, maxsize=EVENTQUEUE_MAXSIZE, policy=QUEUE_BLOCK):
+		assert policy in (QUEUE_BLOCK, QUEUE_DROP_OLDEST, QUEUE_COALESCE), u'unknown policy "' + repr(policy) + u'" for full event queue!'
+		self._maxsize = maxsize
+		self._policy = policy
+		self._cond = threading.Condition(threading.Lock())
+
+		# key: tag, value: deque of tuples (sequence number, SubscriptionES object, DMSEvent object)
+		self._lanes_dict = {}
+		# lanes with waiting events which are not processed by a worker (one deque of tags per priority)
+		self._ready_deques = [collections.deque() for prio in range(PRIO_LOW + 1)]
+		self._ready_tags = set()
+		self._busy_tags = set()
+		self._size = 0
+		self._seq = 0
+		self._closed = False
+
+		# diagnostic values
+		self.nof_dropped = 0
+		self.nof_coalesced = 0
+
+
+	def put(self, item):
+		""" append tuple (SubscriptionES object, DMSEvent object) """
+		subES, event_obj = item
+		tag = event_obj.tag
+		with self._cond:
+			if self._maxsize > 0:
+				while self._size >= self._maxsize and not self._closed:
+					if self._policy == QUEUE_BLOCK:
+						self._cond.wait()
+					elif self._policy == QUEUE_COALESCE and self._coalesce(tag, event_obj):
+						return
+					else:
+						self._drop_oldest()
+			if self._closed:
+				return
+
+			self._seq += 1
+			if not tag in self._lanes_dict:
+				self._lanes_dict[tag] = collections.deque()
+			self._lanes_dict[tag].append((self._seq, subES, event_obj))
+			self._size += 1
+			self._set_ready(tag, subES)
+			self._cond.notify_all()
+
+
+	def get(self):
+		""" blocks until a lane is ready, returns tuple (SubscriptionES object, DMSEvent object) or None after close() """
+		# =>caller has to call task_done() with tag of this event after firing it
+		with self._cond:
+			while True:
+				if self._closed:
+					return None
+				for ready_deque in self._ready_deques:
+					if ready_deque:
+						tag = ready_deque.popleft()
+						self._ready_tags.discard(tag)
+						self._busy_tags.add(tag)
+						seq, subES, event_obj = self._lanes_dict[tag].popleft()
+						if not self._lanes_dict[tag]:
+							del(self._lanes_dict[tag])
+						self._size -= 1
+						# inform blocked producer
+						self._cond.notify_all()
+						return subES, event_obj
+				self._cond.wait()
+
+
+	def task_done(self, tag, subES):
+		""" release lane of this subscription for next event """
+		with self._cond:
+			self._busy_tags.discard(tag)
+			if tag in self._lanes_dict:
+				self._set_ready(tag, subES)
+				self._cond.notify_all()
+
+
+	def close(self):
+		""" wake up all waiting threads, get() returns None from now on """
+		with self._cond:
+			self._closed = True
+			self._cond.notify_all()
+
+
+	def qsize(self):
+		with self._cond:
+			return self._size
+
+
+	def _set_ready(self, tag, subES):
+		# (caller has to hold lock)
+		if not tag in self._busy_tags and not tag in self._ready_tags:
+			prio = min(max(subES.priority, PRIO_HIGH), PRIO_LOW)
+			self._ready_deques[prio].append(tag)
+			self._ready_tags.add(tag)
+
+
+	def _coalesce(self, tag, event_obj):
+		# replace newest waiting event of same subscription and DMS-key by newer event, keeping position in queue
+		# (caller has to hold lock)
+		lane = self._lanes_dict.get(tag, None)
+		if lane:
+			for idx in reversed(range(len(lane))):
+				item = lane[idx]
+				if item[2].path == event_obj.path:
+					lane[idx] = (item[0], item[1], event_obj)
+					self.nof_coalesced += 1
+					return True
+		return False
+
+
+	def _drop_oldest(self):
+		# discard oldest waiting event of lowest priority
+		# (caller has to hold lock)
+		for prio in reversed(range(PRIO_LOW + 1)):
+			oldest_tag = None
+			oldest_seq = None
+			for tag, lane in self._lanes_dict.items():
+				if lane[0][1].priority == prio or (prio == PRIO_LOW and lane[0][1].priority > PRIO_LOW):
+					if oldest_seq is None or lane[0][0] < oldest_seq:
+						oldest_tag = tag
+						oldest_seq = lane[0][0]
+			if oldest_tag is not None:
+				seq, subES, event_obj = self._lanes_dict[oldest_tag].popleft()
+				if not self._lanes_dict[oldest_tag]:
+					del(self._lanes_dict[oldest_tag])
+					if oldest_tag in self._ready_tags:
+						self._ready_tags.discard(oldest_tag)
+						for ready_deque in self._ready_deques:
+							if oldest_tag in ready_deque:
+								ready_deque.remove(oldest_tag)
+				self._size -= 1
+				self.nof_dropped += 1
+				logger.warn('_EventQueue._drop_oldest(): event queue is full, discarding event [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']')
+				return
+		# queue is empty (should never happen...)
+		self._size = 0
+
+
+
+class _EventCoalescer(threading.Thread):
+	""" collapsing bursts of events of one DMS-key into fewer callbacks (latest value wins) """
+	# =>used by subscriptions with "coalesce_interval":
+	#   first event of a DMS-key gets queued immediately, events during the following "coalesce_interval" seconds
+	#   replace each other, the latest one gets queued at the end of the interval (also when DMS stays quiet afterwards).
+	#   This way a callback gets fired at most once per interval and DMS-key, and event queue doesn't grow under load.
+	# =>only value events (onChange/onSet) get coalesced: structural events (onCreate/onDelete/onRename) are always queued,
+	#   a waiting value event of the same DMS-key is queued before them (callbacks see the original order)
+
+	# events where only the latest one is interesting
+	COALESCED_CODES = (DMSEvent.CODE_CHANGE, DMSEvent.CODE_SET)
+
+	def __init__(self, event_q):
+		super(_EventCoalescer, self).__init__()
+		self.daemon = True
+		self._event_q = event_q
+		self._cond = threading.Condition(threading.Lock())
+		# serializes all puts into event queue: a flushed value event and a following structural event
+		# of the same DMS-key mustn't overtake each other (queue could block, so we don't hold "_cond" there)
+		self._put_lock = threading.Lock()
+		self._keep_running = True
+
+		# key: tuple (tag, DMS-key), value: timestamp of last queued event
+		self._last_queued_dict = {}
+		# key: tuple (tag, DMS-key), value: tuple (SubscriptionES object, latest DMSEvent object)
+		self._pending_dict = {}
+		# heap of tuples (due timestamp, tag, DMS-key) for flushing pending events
+		self._due_heap = []
+
+		# diagnostic values
+		self.nof_coalesced = 0
+
+
+	def put(self, subES, event_obj):
+		key = (event_obj.tag, event_obj.path)
+		if not event_obj.code in _EventCoalescer.COALESCED_CODES:
+			with self._put_lock:
+				with self._cond:
+					pending = self._pending_dict.pop(key, None)
+				if pending:
+					self._event_q.put(pending)
+				self._event_q.put((subES, event_obj))
+			return
+
+		now = time.time()
+		with self._cond:
+			if key in self._pending_dict:
+				# burst: replace waiting event
+				self._pending_dict[key] = (subES, event_obj)
+				self.nof_coalesced += 1
+				return
+			last_queued = self._last_queued_dict.get(key, None)
+			if last_queued is None or now - last_queued >= subES.coalesce_interval:
+				self._last_queued_dict[key] = now
+			else:
+				# interval is not over: keep event until end of interval
+				self._pending_dict[key] = (subES, event_obj)
+				heapq.heappush(self._due_heap, (last_queued + subES.coalesce_interval, event_obj.tag, event_obj.path))
+				self._cond.notify()
+				return
+		# (outside of "_cond": queue could block)
+		with self._put_lock:
+			self._event_q.put((subES, event_obj))
+
+
+	def run(self):
+		logger.debug('_EventCoalescer.run(): background thread for coalescing events is running...')
+		while True:
+			with self._cond:
+				# waiting until first pending event is due
+				while self._keep_running and not (self._due_heap and self._due_heap[0][0] <= time.time()):
+					if self._due_heap:
+						self._cond.wait(self._due_heap[0][0] - time.time())
+					else:
+						self._cond.wait()
+				if not self._keep_running:
+					break
+
+			with self._put_lock:
+				flush_list = []
+				with self._cond:
+					now = time.time()
+					while self._due_heap and self._due_heap[0][0] <= now:
+						due, tag, path = heapq.heappop(self._due_heap)
+						key = (tag, path)
+						# (pending event could be gone: flushed by a structural event)
+						if key in self._pending_dict:
+							flush_list.append(self._pending_dict.pop(key))
+							self._last_queued_dict[key] = now
+				for item in flush_list:
+					self._event_q.put(item)
+		logger.debug('_EventCoalescer.run(): background thread is exiting...')
+
+
+	def forget(self, tag):
+		""" removing all state of an unsubscribed subscription """
+		with self._cond:
+			for key in self._last_queued_dict.keys():
+				if key[0] == tag:
+					del(self._last_queued_dict[key])
+			for key in self._pending_dict.keys():
+				if key[0] == tag:
+					del(self._pending_dict[key])
+
+
+	def stop(self):
+		with self._cond:
+			self._keep_running = False
+			self._cond.notify()
+
+
+
+class _SubscriptionES_Worker(threading.Thread):
+	""" one thread of the pool firing SubscriptionES objects """
+
+	def __init__(self, dispatcher):
+		super(_SubscriptionES_Worker, self).__init__()
+		# a retired worker could be stuck in a user callback forever, it must not keep Python program running
+		self.daemon = True
+		self._dispatcher = dispatcher
+
+		# current job (used by dispatcher for monitoring time budget)
+		self.job_started = None
+		self.job_deadline = None
+		self.job_event = None
+		self.job_overdue = False
+		self.retired = False
+
+
+	def run(self):
+		logger.debug('_SubscriptionES_Worker.run(): worker thread for firing EventSystem objects is running...')
+		event_q = self._dispatcher.event_q
+		while not self.retired:
+			item = event_q.get()
+			if item is None:
+				# queue is closed
+				break
+			subES, event_obj = item
+			self._dispatcher.job_begin(self, subES, event_obj)
+			try:
+				logger.debug('_SubscriptionES_Worker.run(): event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']')
+				result = subES(event_obj)
+				self._dispatcher.log_result(subES, event_obj, result)
+			except Exception as ex:
+				logger.error('_SubscriptionES_Worker.run(): got exception ' + repr(ex))
+			finally:
+				self._dispatcher.job_end(self, subES, event_obj)
+				event_q.task_done(event_obj.tag, subES)
+
+			# help garbage collector
+			# (FIXME: execution in PyCharm works, execution as freezed code with py2exe has thread and/or memory leakage... Why?!?)
+			subES = None
+			event_obj = None
+			result = None
+			item = None
+		logger.debug('_SubscriptionES_Worker.run(): worker thread is exiting...')
+
+
+
 class _SubscriptionES_Dispatcher(threading.Thread):
-	""" firing Subscription-EventSystem objects in a separated thread """
-	# =>if user adds an infinitly running function, then only the event-monitoring is blocked,
+	""" firing Subscription-EventSystem objects by a pool of worker threads """
+	# =>if user adds an infinitly running function, then only the event-monitoring of this subscription is blocked,
 	#   instead of blocking whole _MessageHandler.handle() function
 	# =>this way a users callback function should be able to send WebSocket messages
 	#   (ealier we had a deadlock sending a message while processing _cb_on_message() function)
-	# FIXME: should we implement a hard timeout when synchronous execution of a fired SubscriptionES() with masses of handlers uses too much time?
-	# FIXME: should we implement a priority queue for event handling?
-	# FIXME: should we fire SubscriptionES() in parallel?
-	# FIXME: we use a "polling queue", it's a waste of CPU time when no datapoint subscription is active...
+	# =>events of one subscription are fired in order, different subscriptions are fired in parallel
+	# =>this thread supervises the time budget of running callbacks:
+	#   in Python it isn't possible to cleanly kill a thread, so an overdue worker gets retired
+	#   (it exits after its callbacks returned) and a new worker takes its place in the pool.
 
-	def __init__(self, event_q):
-		self._event_q = event_q
+	def __init__(self, event_q, nof_workers=EVENT_WORKERS, metrics=None):
+		self.event_q = event_q
 		self.keep_running = True
 		super(_SubscriptionES_Dispatcher, self).__init__()
 
+		# optional recording of callback execution time per subscription (DMSMetrics object)
+		self._metrics = metrics
+
+		self._nof_workers = nof_workers
+		self._workers_list = []
+		self._cond = threading.Condition(threading.Lock())
+
 		# helper variables for diagnostic warnings
 		self._do_warn_queuesize = True
 
 
 	def run(self):
-		# "polling queue" based on code from http://stupidpythonideas.blogspot.ch/2013/10/why-your-gui-app-freezes.html
-		logger.debug('_SubscriptionES_Dispatcher.run(): background thread for firing EventSystem objects is running...')
-		while self.keep_running:
+		logger.debug('_SubscriptionES_Dispatcher.run(): background thread for supervising worker threads is running...')
+		with self._cond:
+			for x in range(self._nof_workers):
+				self._start_worker()
+
+			while self.keep_running:
+				# sleeping until next deadline of a running callback
+				# (or until a worker begins a job or dispatcher gets stopped)
+				now = time.time()
+				next_deadline = None
+				for worker in list(self._workers_list):
+					if worker.job_deadline and not worker.job_overdue:
+						if worker.job_deadline <= now:
+							self._retire_worker(worker, now)
+						elif next_deadline is None or worker.job_deadline < next_deadline:
+							next_deadline = worker.job_deadline
+				if next_deadline is None:
+					self._cond.wait()
+				else:
+					self._cond.wait(next_deadline - now)
+
+			for worker in self._workers_list:
+				worker.retired = True
+		self.event_q.close()
+		logger.debug('_SubscriptionES_Dispatcher.run(): background thread is exiting...')
+
+
+	def stop(self):
+		""" stopping all worker threads """
+		with self._cond:
+			self.keep_running = False
+			self._cond.notify_all()
+		self.event_q.close()
+
+
+	def _start_worker(self):
+		# (caller has to hold lock)
+		worker = _SubscriptionES_Worker(dispatcher=self)
+		self._workers_list.append(worker)
+		worker.start()
+
+
+	def _retire_worker(self, worker, now):
+		# (caller has to hold lock)
+		worker.job_overdue = True
+		worker.retired = True
+		self._workers_list.remove(worker)
+		event_obj = worker.job_event
+		logger.warn('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + '] is running since ' + str(now - worker.job_started) + ' seconds... =>you should shorten your callback functions! (replacing worker thread, events of this subscription have to wait)')
+		self._start_worker()
+
+
+	def job_begin(self, worker, subES, event_obj):
+		""" called by worker before firing a SubscriptionES object """
+		with self._cond:
+			worker.job_event = event_obj
+			worker.job_started = time.time()
+			if subES.time_budget:
+				worker.job_deadline = worker.job_started + subES.time_budget
+			else:
+				worker.job_deadline = None
+			worker.job_overdue = False
+			self._cond.notify_all()
+
+
+	def job_end(self, worker, subES, event_obj):
+		""" called by worker after firing a SubscriptionES object """
+		with self._cond:
+			if worker.job_overdue:
+				logger.warn('_SubscriptionES_Dispatcher.job_end(): event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + '] took ' + str(subES.duration_secs) + ' seconds... =>you should shorten your callback functions!')
+			duration_secs = time.time() - worker.job_started
+			worker.job_event = None
+			worker.job_started = None
+			worker.job_deadline = None
+
+		# diagnostic values
+		if self._metrics:
 			try:
-				subES, event_obj = self._event_q.get(block=False)
-			except queue.Empty:
-				# give other threads some CPU time...
-				time.sleep(SLEEP_TIMEBASE)
-			except Exception as ex:
-				logger.error('_SubscriptionES_Dispatcher.run(): got exception ' + repr(ex))
+				sub_path = subES.sub_response[u'path']
+			except AttributeError:
+				# (SubscriptionES object without DMS response)
+				sub_path = event_obj.path
+			self._metrics.callback_done(event_obj.tag, sub_path, duration_secs)
+		qsize = self.event_q.qsize()
+		if qsize > EVENTQUEUE_WARNSIZE and self._do_warn_queuesize:
+			self._do_warn_queuesize = False
+			logger.warn('_SubscriptionES_Dispatcher.job_end(): number of waiting events is over ' + str(EVENTQUEUE_WARNSIZE) + '... =>you should shorten your callback functions and unsubscribe BEFORE removing handlers of SubscriptionES object!')
+		if qsize < EVENTQUEUE_WARNSIZE:
+			self._do_warn_queuesize = True
+
+
+	def log_result(self, subES, event_obj, result):
+		# FIXME: how to inform caller about exceptions while executing his callbacks? Currently we log them, no other information.
+		if result:
+			for idx, res in enumerate(result):
+				if res[0] == None:
+					logger.debug('_SubscriptionES_Dispatcher.log_result(): event-firing on SubscriptionES object: asynchronously started callback no.' + str(idx) + ': handler=' + repr(res[2]))
+				else:
+					logger.debug('_SubscriptionES_Dispatcher.log_result(): event-firing on SubscriptionES object: synchronous callback no.' + str(idx) + ': success=' + str(res[0]) + ', result=' + str(res[1]) + ', handler=' + repr(res[2]))
+
+				# since we process EventSystem objects synchronously (this could be a bottleneck or risk of blocking!!!) we get success or failure data
+				# =>look in constructor of SubscriptionES() for details
+				if res[0] == False:
+					# example: res[1] without traceback: (<type 'exceptions.TypeError'>, TypeError("cannot concatenate 'str' and 'int' objects",))
+					#          =>when traceback=True, then ID of traceback object is added to the part above.
+					#            Assumption: traceback is not needed. It would be useful when debugging client code...
+					logger.error('_SubscriptionES_Dispatcher.log_result(): event-firing on SubscriptionES object: synchronous callback no.' + str(idx) + ' failed: ' + str(res[1]) + ' [handler=' + repr(res[2]) + ']')
+		else:
+			logger.info('_SubscriptionES_Dispatcher.log_result(): event-firing had no effect (all handlers of SubscriptionES object were removed while waiting in event queue...) [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']')
+
+
+def _copy_resp_list(resp_list):
+	# responses handed out by DMSValueCache are copies: RespGet.as_dict() gives access to it's dictionary,
+	# a caller changing a response mustn't change the cached one
+	# (plain "get" responses contain only immutable values, so a shallow copy of every dictionary is enough)
+	copy_list = []
+	for resp in resp_list:
+		new_resp = copy.copy(resp)
+		new_resp._values_dict = dict(resp._values_dict)
+		copy_list.append(new_resp)
+	return copy_list
+
+
+class DMSValueCache(object):
+	""" read-through cache for values of DMS-keys, kept consistent by DMS-events """
+	# =>only plain "get" requests (without query, histData, changelog or extInfos) are cached
+	# =>only DMS-keys inside monitored subtrees get cached, every subtree has one subscription for
+	#   updating cached values (onChange/onSet) and invalidating them (onCreate/onDelete/onRename)
+	# =>events are fired asynchronously by _SubscriptionES_Dispatcher, so a cached value could be
+	#   a little bit behind DMS. Entries older than "max_age" (in seconds) get read again
+	#   (this bound also protects against events lost during connection loss).
+	# =>writes through the same DMSClient invalidate their DMS-keys immediately
+
+	def __init__(self, msghandler, maxsize=VALUECACHE_MAXSIZE, max_age=VALUECACHE_MAX_AGE):
+		self._msghandler = msghandler
+		self.maxsize = maxsize
+		self.max_age = max_age
+		self._lock = threading.Lock()
+		# key: DMS-key, value: tuple (timestamp of caching, list of RespGet objects)
+		# =>order of OrderedDict is used as LRU list: most recently used entry at the end
+		self._entries_odict = collections.OrderedDict()
+		# DMS-keys currently read from DMS: flag gets set by events during request
+		# =>such responses could be outdated and don't get stored
+		self._fetching_dict = {}
+		# key: root of monitored subtree, value: SubscriptionES object
+		self._subscriptions_dict = {}
+
+		# statistics
+		self.nof_hits = 0
+		self.nof_misses = 0
+		self.nof_expired = 0
+		self.nof_updates = 0
+		self.nof_invalidations = 0
+		self.nof_evictions = 0
+
+
+	def add_subtree(self, subES):
+		""" register subscription of a subtree (created by DMSClient.enable_value_cache()) """
+		subES += self._cb_event
+		with self._lock:
+			self._subscriptions_dict[subES.sub_response[u'path']] = subES
+
+
+	def covers(self, path):
+		""" are changes of this DMS-key monitored? """
+		for base_path in list(self._subscriptions_dict):
+			if not base_path or path == base_path or path.startswith(base_path + u':'):
+				return True
+		return False
+
+
+	def get(self, path, timeout=REQ_TIMEOUT):
+		""" same as DMSClient.dp_get(path), but answered from cache when possible """
+		with self._lock:
+			entry = self._entries_odict.pop(path, None)
+			if entry:
+				if time.time() - entry[0] <= self.max_age:
+					# reinsert as most recently used
+					self._entries_odict[path] = entry
+					self.nof_hits += 1
+					return _copy_resp_list(entry[1])
+				self.nof_expired += 1
+			self.nof_misses += 1
+			# (parallel requests of same DMS-key: only first response could get stored)
+			self._fetching_dict.setdefault(path, False)
+
+		try:
+			resp_list = self._msghandler.dp_get(path, timeout=timeout)
+		finally:
+			with self._lock:
+				was_changed = self._fetching_dict.pop(path, True)
+		if not was_changed and resp_list and resp_list[0].code == _Response.CODE_OK:
+			with self._lock:
+				self._store(path, _copy_resp_list(resp_list))
+		return resp_list
+
+
+	def _store(self, path, resp_list):
+		# (caller has to hold lock)
+		self._entries_odict.pop(path, None)
+		self._entries_odict[path] = (time.time(), resp_list)
+		while len(self._entries_odict) > self.maxsize:
+			self._entries_odict.popitem(last=False)
+			self.nof_evictions += 1
+
+
+	def invalidate(self, path, recursive=False):
+		""" remove DMS-key (and optional all it's descendants) from cache """
+		with self._lock:
+			self._invalidate(path, recursive)
+
+
+	def _invalidate(self, path, recursive):
+		# (caller has to hold lock)
+		if path in self._fetching_dict:
+			self._fetching_dict[path] = True
+		if self._entries_odict.pop(path, None):
+			self.nof_invalidations += 1
+		if recursive:
+			prefix = path + u':'
+			for curr_path in [key for key in self._fetching_dict if key.startswith(prefix)]:
+				self._fetching_dict[curr_path] = True
+			for curr_path in [key for key in self._entries_odict if key.startswith(prefix)]:
+				del(self._entries_odict[curr_path])
+				self.nof_invalidations += 1
+
+
+	def clear(self):
+		""" forget all cached values (e.g. after loss of WebSocket connection) """
+		with self._lock:
+			for path in self._fetching_dict:
+				self._fetching_dict[path] = True
+			self.nof_invalidations += len(self._entries_odict)
+			self._entries_odict.clear()
+
+
+	def close(self):
+		""" unsubscribe all monitored subtrees """
+		with self._lock:
+			subscriptions_list = self._subscriptions_dict.values()
+			self._subscriptions_dict = {}
+			self._entries_odict.clear()
+		for subES in subscriptions_list:
+			subES.unsubscribe()
+
+
+	def _cb_event(self, event):
+		# callback of subscriptions
+		with self._lock:
+			if event.code in (DMSEvent.CODE_CHANGE, DMSEvent.CODE_SET):
+				if event.path in self._fetching_dict:
+					self._fetching_dict[event.path] = True
+				entry = self._entries_odict.get(event.path, None)
+				if entry:
+					# late event: cached response could be newer (timestamps are missing after DMS restart)
+					event_stamp = getattr(event, u'stamp', None)
+					cached_stamp = getattr(entry[1][0], u'stamp', None)
+					if event_stamp and cached_stamp and event_stamp < cached_stamp:
+						entry = None
+				if entry:
+					# update cached response with new value, keeping LRU position and age
+					# (other fields like "hasChild" stay the same)
+					new_resp = _copy_resp_list(entry[1][:1])[0]
+					new_resp._values_dict.update({u'value': event.value,
+					                              u'type': event.type,
+					                              u'stamp': event.stamp})
+					self._entries_odict[event.path] = (entry[0], [new_resp])
+					self.nof_updates += 1
+			elif event.code == DMSEvent.CODE_CREATE:
+				# parent has now a child
+				self._invalidate(event.path.rpartition(u':')[0], recursive=False)
+				self._invalidate(event.path, recursive=False)
 			else:
-				# (this is an optional else clause when no exception occured)
-				logger.debug('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']')
-				result = subES(event_obj)
+				# onDelete and onRename: DMS-key and it's whole subtree is gone
+				self._invalidate(event.path, recursive=True)
+				self._invalidate(event.path.rpartition(u':')[0], recursive=False)
+				if event.newPath:
+					self._invalidate(event.newPath, recursive=True)
+
+
+	def get_stats(self):
+		""" statistics as dictionary """
+		with self._lock:
+			nof_requests = self.nof_hits + self.nof_misses
+			return {u'size': len(self._entries_odict),
+			        u'hits': self.nof_hits,
+			        u'misses': self.nof_misses,
+			        u'expired': self.nof_expired,
+			        u'updates': self.nof_updates,
+			        u'invalidations': self.nof_invalidations,
+			        u'evictions': self.nof_evictions,
+			        u'hit_rate': float(self.nof_hits) / nof_requests if nof_requests else 0.0}
+
+
+class DMSWriteBuffer(object):
+	""" write-behind buffer for DMS values: "set" commands are collected and sent in batches """
+	# =>repeated writes of the same DMS-key are coalesced, only the latest value gets sent
+	# =>background thread flushes buffered values at latest "max_delay" seconds after first buffered value,
+	#   caller flushes synchronously when "max_keys" DMS-keys are buffered (this limits memory usage)
+	# =>one flush sends requests with up to "frame_size" "set" commands, all requests are sent
+	#   before waiting for the responses
+	# =>with "fire_and_forget" responses are ignored, otherwise every error response and every lost request
+	#   is given to callback on_error(path, value, error) with RespSet object or exception as "error"
+	#   (without callback it gets logged)
+
+	def __init__(self, dmsclient, max_keys=WRITEBUFFER_MAX_KEYS, max_delay=WRITEBUFFER_MAX_DELAY, frame_size=WRITEBUFFER_FRAME_SIZE, fire_and_forget=False, on_error=None, timeout=REQ_TIMEOUT):
+		assert frame_size > 0, u'parameter "frame_size" has to be a positive number!'
+		self._dmsclient = dmsclient
+		self._msghandler = dmsclient._msghandler
+		self.max_keys = max_keys
+		self.max_delay = max_delay
+		self.frame_size = frame_size
+		self.fire_and_forget = fire_and_forget
+		self.on_error = on_error
+		self.timeout = timeout
+
+		# background thread waits on this condition without timeout while buffer is empty
+		self._cond = threading.Condition(threading.Lock())
+		# only one flush at the same time: requests leave in same order as values were buffered
+		self._flush_lock = threading.Lock()
+		# key: DMS-key, value: tuple (value, dictionary with keyword arguments for "set" command)
+		# =>order of OrderedDict is order of last write
+		self._pending_odict = collections.OrderedDict()
+		# time of first buffered value since last flush (None means buffer is empty)
+		self._oldest_timestamp = None
+		# DMS-keys of current flush (sent, but DMS hasn't answered yet)
+		self._sending_set = set()
+		self._is_closing = threading.Event()
+
+		# statistics
+		self.nof_sets = 0
+		self.nof_coalesced = 0
+		self.nof_frames = 0
+		self.nof_errors = 0
+
+		self._flush_thread = threading.Thread(target=self._run)
+		self._flush_thread.daemon = True
+		self._flush_thread.start()
+
+
+	def dp_set(self, path, value, **kwargs):
+		""" buffered write of datapoint value (same keyword arguments as DMSClient.dp_set(), returns nothing) """
+		if self._is_closing.is_set():
+			raise IOError('DMSWriteBuffer.dp_set(): buffer is already closed!')
+		path = u'' + path
+		with self._cond:
+			if path in self._pending_odict:
+				# coalescing: older value will never be sent
+				del(self._pending_odict[path])
+				self.nof_coalesced += 1
+			elif not self._pending_odict:
+				self._oldest_timestamp = time.time()
+				# first value in empty buffer: background thread starts counting "max_delay"
+				self._cond.notify()
+			self._pending_odict[path] = (value, kwargs)
+			self.nof_sets += 1
+			is_full = len(self._pending_odict) >= self.max_keys
+		if is_full:
+			self.flush()
+
+
+	def flush(self):
+		""" send all buffered values (waiting for responses, except with "fire_and_forget") """
+		with self._flush_lock:
+			with self._cond:
+				items_list = self._pending_odict.items()
+				self._pending_odict = collections.OrderedDict()
+				self._oldest_timestamp = None
+				self._sending_set = set(path for path, _ in items_list)
+			try:
+				if items_list:
+					self._send(items_list)
+			finally:
+				with self._cond:
+					self._sending_set = set()
+
+
+	def is_pending(self, path):
+		""" True while value of this DMS-key is buffered or it's "set" command is waiting for DMS """
+		with self._cond:
+			return path in self._pending_odict or path in self._sending_set
+
+
+	def _send(self, items_list):
+		# list of tuples (tag, path, value)
+		sent_list = []
+		for idx in range(0, len(items_list), self.frame_size):
+			chunk_list = items_list[idx:idx + self.frame_size]
+			for path, _ in chunk_list:
+				self._dmsclient._invalidate_cache_of_set(path)
+			try:
+				tags_list = self._msghandler.dp_set_frame([(path, value, kwargs) for path, (value, kwargs) in chunk_list])
+			except Exception as ex:
+				# connection to DMS is lost =>values of this and all following requests are lost
+				for path, (value, kwargs) in items_list[idx:]:
+					self._report_error(path, value, ex)
+				break
+			self.nof_frames += 1
+			for tag, (path, (value, kwargs)) in zip(tags_list, chunk_list):
+				sent_list.append((tag, path, value))
+
+		if self.fire_and_forget:
+			for tag, path, value in sent_list:
+				self._msghandler._discard_pending_response(tag)
+		else:
+			for tag, path, value in sent_list:
+				try:
+					resp = self._msghandler._busy_wait_for_response(tag, self.timeout)[0]
+					if resp.code != _Response.CODE_OK:
+						self._report_error(path, value, resp)
+				except Exception as ex:
+					self._report_error(path, value, ex)
 
-				# FIXME: how to inform caller about exceptions while executing his callbacks? Currently we log them, no other information.
-				if result:
-					for idx, res in enumerate(result):
-						if res[0] == None:
-							logger.debug('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object: asynchronously started callback no.' + str(idx) + ': handler=' + repr(res[2]))
-						else:
-							logger.debug('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object: synchronous callback no.' + str(idx) + ': success=' + str(res[0]) + ', result=' + str(res[1]) + ', handler=' + repr(res[2]))
-
-						# since we process EventSystem objects synchronously (this could be a bottleneck or risk of blocking!!!) we get success or failure data
-						# =>look in constructor of SubscriptionES() for details
-						if res[0] == False:
-							# example: res[1] without traceback: (<type 'exceptions.TypeError'>, TypeError("cannot concatenate 'str' and 'int' objects",))
-							#          =>when traceback=True, then ID of traceback object is added to the part above.
-							#            Assumption: traceback is not needed. It would be useful when debugging client code...
-							logger.error('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object: synchronous callback no.' + str(idx) + ' failed: ' + str(res[1]) + ' [handler=' + repr(res[2]) + ']')
-				else:
-					logger.info('_SubscriptionES_Dispatcher.run(): event-firing had no effect (all handlers of SubscriptionES object were removed while waiting in event queue...) [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + ']')
-
-				# diagnostic values
-				if subES.duration_secs > CALLBACK_DURATION_WARNLEVEL:
-					logger.warn('_SubscriptionES_Dispatcher.run(): event-firing on SubscriptionES object [DMS-key="' + event_obj.path + '" / tag=' + event_obj.tag + '] took ' + str(subES.duration_secs) + ' seconds... =>you should shorten your callback functions!')
-				if self._event_q.qsize() > EVENTQUEUE_WARNSIZE and self._do_warn_queuesize:
-					self._do_warn_queuesize = False
-					logger.warn('_SubscriptionES_Dispatcher.run(): number of waiting events is over ' + str(EVENTQUEUE_WARNSIZE) + '... =>you should shorten your callback functions and unsubscribe BEFORE removing handlers of SubscriptionES object!')
-				if self._event_q.qsize() < EVENTQUEUE_WARNSIZE:
-					self._do_warn_queuesize = True
-
-				# help garbage collector
-				# (FIXME: execution in PyCharm works, execution as freezed code with py2exe has thread and/or memory leakage... Why?!?)
-				for obj in [subES, event_obj, result]:
-					try:
-						del(obj)
-					except NameError:
-						pass
+
+	def _report_error(self, path, value, error):
+		self.nof_errors += 1
+		if self.on_error:
+			try:
+				self.on_error(path, value, error)
+			except Exception:
+				logger.exception('DMSWriteBuffer._report_error(): callback "on_error" failed')
+		else:
+			logger.error('DMSWriteBuffer._report_error(): writing value ' + repr(value) + ' into DMS key "' + path + '" failed: ' + repr(error))
+
+
+	def _run(self):
+		# background flushing of buffered values after "max_delay" seconds
+		# (no polling: an empty buffer means sleeping until dp_set() or close())
+		while True:
+			with self._cond:
+				while self._oldest_timestamp is None and not self._is_closing.is_set():
+					self._cond.wait()
+				if self._is_closing.is_set():
+					break
+				delay = self._oldest_timestamp + self.max_delay - time.time()
+				if delay > 0:
+					self._cond.wait(delay)
+					continue
+			try:
+				self.flush()
+			except Exception:
+				logger.exception('DMSWriteBuffer._run(): flushing of buffered values failed')
+		logger.debug('DMSWriteBuffer._run(): flushing thread is exiting...')
+
+
+	def close(self):
+		""" stop background thread and send remaining values """
+		if not self._is_closing.is_set():
+			self._is_closing.set()
+			with self._cond:
+				self._cond.notify()
+			if threading.current_thread() is not self._flush_thread:
+				self._flush_thread.join()
+			self.flush()
+
+
+	def get_nof_pending(self):
+		with self._cond:
+			return len(self._pending_odict)
+
+
+	def get_stats(self):
+		""" statistics as dictionary """
+		with self._cond:
+			return {u'pending': len(self._pending_odict),
+			        u'sets': self.nof_sets,
+			        u'coalesced': self.nof_coalesced,
+			        u'frames': self.nof_frames,
+			        u'errors': self.nof_errors}
+
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
 
 
 class DMSClient(object):
-	def __init__(self, whois_str, user_str, dms_host_str=DMS_HOST, dms_port_int=DMS_PORT):
+	def __init__(self, whois_str, user_str, dms_host_str=DMS_HOST, dms_port_int=DMS_PORT, event_workers=EVENT_WORKERS, eventqueue_maxsize=EVENTQUEUE_MAXSIZE, eventqueue_policy=QUEUE_BLOCK, auto_reconnect=False):
 		self._dms_host_str = dms_host_str
 		self._dms_port_int = dms_port_int
-		self._subAE_queue = queue.Queue()
-		self._msghandler = _MessageHandler(dmsclient_obj=self, whois_str=whois_str, user_str=user_str, subES_queue=self._subAE_queue)
+		# reconnect after lost WebSocket connection, active subscriptions get registered again
+		# (while connection is lost every request raises an IOError)
+		self._auto_reconnect = auto_reconnect
+		self._subAE_queue = _EventQueue(maxsize=eventqueue_maxsize, policy=eventqueue_policy)
+		# built-in metrics (look in dms.dmsmetrics for details)
+		self._metrics = dmsmetrics.DMSMetrics()
+		self._msghandler = _MessageHandler(dmsclient_obj=self, whois_str=whois_str, user_str=user_str, subES_queue=self._subAE_queue, metrics=self._metrics)
+		self._metrics.add_gauge(u'event_queue_depth', self._subAE_queue.qsize)
+		self._metrics.add_gauge(u'events_dropped', lambda: self._subAE_queue.nof_dropped)
+		self._metrics.add_gauge(u'subscriptions', self._msghandler.get_nof_subscriptions)
+		# optional read-through cache (activated by enable_value_cache())
+		self._value_cache = None
+		# write-behind buffers (created by get_write_buffer()), remaining values get sent when closing DMSClient
+		self._write_buffers_list = []
+		# functions called after reconnection (look in add_reconnect_callback())
+		self._reconnect_callbacks_list = []
 
 		# thread synchronisation flag for Websocket connection state
 		# (documentation: https://docs.python.org/2/library/threading.html#event-objects )
 		self.ready_to_send = threading.Event()
+		# set after first established connection: from now on we don't wait for connection in _send_message()
+		self._was_connected = False
+		# set when caller closes DMSClient: no more reconnection
+		self._is_closing = threading.Event()
+
+		# background thread for firing Subscription-EventSystem objects
+		self._subES_disp_thread = _SubscriptionES_Dispatcher(event_q=self._subAE_queue, nof_workers=event_workers, metrics=self._metrics)
 
 		# based on example on https://github.com/websocket-client/websocket-client
 		# and comments in sourcecode:
 		#   https://github.com/websocket-client/websocket-client/blob/master/websocket/_app.py
 		#   https://github.com/websocket-client/websocket-client/blob/master/websocket/_core.py
 		#websocket.enableTrace(True)
-		ws_URI = u"ws://" + self._dms_host_str + u':' + str(self._dms_port_int) + DMS_BASEPATH
-		self._ws = websocket.WebSocketApp(ws_URI,
-		                            on_message = self._cb_on_message,
-		                            on_error = self._cb_on_error,
-		                            on_open = self._cb_on_open,
-		                            on_close = self._cb_on_close)
+		self._ws_URI = u"ws://" + self._dms_host_str + u':' + str(self._dms_port_int) + DMS_BASEPATH
+		self._ws = self._create_ws()
 		# executing WebSocket eventloop in background
-		self._ws_thread = thread.start_new_thread(self._ws.run_forever, ())
+		self._ws_thread = threading.Thread(target=self._ws_loop)
+		self._ws_thread.daemon = True
+		self._ws_thread.start()
 		# FIXME: how to return caller a non-reachable WebSocket server?
 		logger.info("WebSocket connection will be established in background...")
 
-		# background thread for firing Subscription-EventSystem objects
-		self._subES_disp_thread = _SubscriptionES_Dispatcher(event_q=self._subAE_queue)
+
+	def _create_ws(self):
+		import websocket
+		return websocket.WebSocketApp(self._ws_URI,
+		                              on_message = self._cb_on_message,
+		                              on_error = self._cb_on_error,
+		                              on_open = self._cb_on_open,
+		                              on_close = self._cb_on_close)
+
+
+	def _ws_loop(self):
+		# WebSocket eventloop, with optional reconnection using exponential backoff
+		delay = RECONNECT_DELAY_MIN
+		while True:
+			self._ws.run_forever()
+			if not self._auto_reconnect or self._is_closing.is_set():
+				break
+			if self._was_connected and self.ready_to_send.is_set():
+				# connection was lost without callback "on_close"
+				self._cb_on_close(self._ws)
+			if self._connected_secs_ago() > delay:
+				# last connection was up for a while: begin with short delay
+				delay = RECONNECT_DELAY_MIN
+			logger.warn('DMSClient._ws_loop(): WebSocket connection to DMS is lost, next try in ' + str(delay) + ' seconds...')
+			if self._is_closing.wait(timeout=delay):
+				break
+			delay = min(delay * 2, RECONNECT_DELAY_MAX)
+			self._ws = self._create_ws()
+		logger.debug('DMSClient._ws_loop(): WebSocket thread is exiting...')
+
+
+	def _connected_secs_ago(self):
+		try:
+			return time.time() - self._connected_timestamp
+		except AttributeError:
+			return 0.0
 
 
 	# API
 	def dp_get(self, path, timeout=REQ_TIMEOUT, **kwargs):
 		""" read datapoint value(s) """
+		if self._value_cache and not kwargs and self._value_cache.covers(path):
+			return self._value_cache.get(path, timeout=timeout)
 		return self._msghandler.dp_get(path, timeout=timeout, **kwargs)
 
 	def dp_set(self, path, timeout=REQ_TIMEOUT, **kwargs):
 		""" write datapoint value(s) """
+		self._invalidate_cache_of_set(path)
 		return self._msghandler.dp_set(path, timeout=timeout, **kwargs)
 
+	def _invalidate_cache_of_set(self, path):
+		if self._value_cache:
+			# parent gets a child when DMS-key is created
+			self._value_cache.invalidate(path)
+			self._value_cache.invalidate(path.rpartition(u':')[0])
+
 	def dp_del(self, path, recursive, timeout=REQ_TIMEOUT, **kwargs):
 		""" delete datapoint(s) """
+		if self._value_cache:
+			self._value_cache.invalidate(path, recursive=True)
+			self._value_cache.invalidate(path.rpartition(u':')[0])
 		return self._msghandler.dp_del(path, recursive, timeout=timeout, **kwargs)
 
 	def dp_ren(self, path, newPath, timeout=REQ_TIMEOUT, **kwargs):
 		""" rename datapoint(s) """
+		if self._value_cache:
+			for curr_path in (path, newPath):
+				self._value_cache.invalidate(curr_path, recursive=True)
+				self._value_cache.invalidate(curr_path.rpartition(u':')[0])
 		return self._msghandler.dp_ren(path, newPath, timeout=timeout, **kwargs)
 
-	def get_dp_subscription(self, path, timeout=REQ_TIMEOUT, **kwargs):
+	def enable_value_cache(self, paths, maxsize=VALUECACHE_MAXSIZE, max_age=VALUECACHE_MAX_AGE, timeout=REQ_TIMEOUT):
+		""" answer plain dp_get() of DMS-keys in given subtrees from cache (look in class DMSValueCache() for details) """
+		# =>one subscription per subtree (path u'' means whole DMS)
+		# =>returns DMSValueCache object, e.g. for retrieving statistics with get_stats()
+		if not self._value_cache:
+			self._value_cache = DMSValueCache(msghandler=self._msghandler, maxsize=maxsize, max_age=max_age)
+		for path in paths:
+			subES = self.get_dp_subscription(path,
+			                                 timeout=timeout,
+			                                 priority=PRIO_HIGH,
+			                                 event=ON_ALL,
+			                                 query=Query(maxDepth=0))
+			self._value_cache.add_subtree(subES)
+		return self._value_cache
+
+	def disable_value_cache(self):
+		if self._value_cache:
+			value_cache = self._value_cache
+			self._value_cache = None
+			value_cache.close()
+
+	def get_value_cache(self):
+		""" DMSValueCache object or None """
+		return self._value_cache
+
+	def get_write_buffer(self, max_keys=WRITEBUFFER_MAX_KEYS, max_delay=WRITEBUFFER_MAX_DELAY, frame_size=WRITEBUFFER_FRAME_SIZE, fire_and_forget=False, on_error=None, timeout=REQ_TIMEOUT):
+		""" new write-behind buffer for batched "set" commands (look in class DMSWriteBuffer() for details) """
+		write_buffer = DMSWriteBuffer(dmsclient=self,
+		                              max_keys=max_keys,
+		                              max_delay=max_delay,
+		                              frame_size=frame_size,
+		                              fire_and_forget=fire_and_forget,
+		                              on_error=on_error,
+		                              timeout=timeout)
+		self._write_buffers_list.append(write_buffer)
+		return write_buffer
+
+	def add_reconnect_callback(self, func):
+		""" func() gets called after automatic reconnection, when all subscriptions are active again (DMS-events of meantime are lost) """
+		self._reconnect_callbacks_list.append(func)
+
+	def get_metrics(self):
+		""" DMSMetrics object (pull API with get_stats(), exporters as_prometheus_text() and as_statsd_lines()) """
+		return self._metrics
+
+	def dp_get_histData_chunks(self, path, start, end, chunk_timedelta=HISTDATA_CHUNK_TIMEDELTA, max_inflight=HISTDATA_MAX_INFLIGHT, timeout=REQ_TIMEOUT, **kwargs):
+		""" read trenddata of one datapoint in smaller timeranges (generator yielding responses in chronological order) """
+		return self._msghandler.dp_get_histData_chunks(path, start, end, chunk_timedelta=chunk_timedelta, max_inflight=max_inflight, timeout=timeout, **kwargs)
+
+	def dp_get_pipelined(self, cmd_kwargs_list, max_inflight=GET_MAX_INFLIGHT, timeout=REQ_TIMEOUT):
+		""" many "get" requests without waiting for every response (generator yielding one response list per command in same order) """
+		return self._msghandler.dp_get_pipelined(cmd_kwargs_list, max_inflight=max_inflight, timeout=timeout)
+
+	def get_dp_subscription(self, path, timeout=REQ_TIMEOUT, priority=PRIO_NORMAL, time_budget=CALLBACK_DURATION_WARNLEVEL, coalesce_interval=None, **kwargs):
 		""" subscribe monitoring of datapoints(s) """
+		# =>"priority" and "time_budget" (in seconds) are used by event dispatcher when firing Python callbacks
+		# =>"coalesce_interval" (in seconds) enables coalescing of events: when a DMS-key changes faster,
+		#   then only the latest event gets fired once per interval
 		# FIXME: now we care only the first response... is this ok in every case?
 		response = self._msghandler.dp_sub(path, timeout=timeout, **kwargs)[0]
 		if DEBUGGING:
 			print('DEBUGGING: get_dp_subscription(): type(response)=' + repr(type(response)) + ', repr(response)=' + repr(response))
 		if response["code"] == u'ok':
 			# DMS accepted subscription
-			subAE = SubscriptionES(msghandler=self._msghandler, sub_response=response)
+			sub_kwargs = dict(kwargs)
+			sub_kwargs.pop(u'tag', None)
+			subAE = SubscriptionES(msghandler=self._msghandler, sub_response=response, priority=priority, time_budget=time_budget, coalesce_interval=coalesce_interval, sub_kwargs=sub_kwargs)
 			self._msghandler.add_subscription(subAE=subAE)
 			return subAE
 		else:
@@ -1839,10 +3062,18 @@ class DMSClient(object):
 		""" get protocol entries in given changelog group """
 		return self._msghandler.changelog_Read(group, start, timeout=timeout, **kwargs)
 
+	def changelog_Read_pipelined(self, cmd_kwargs_list, max_inflight=CHANGELOG_MAX_INFLIGHT, timeout=REQ_TIMEOUT):
+		""" many "changelogRead" requests without waiting for every response (generator yielding one response list per command in same order) """
+		return self._msghandler.changelog_Read_pipelined(cmd_kwargs_list, max_inflight=max_inflight, timeout=timeout)
+
 	def _send_message(self, msg):
 		if not self.ready_to_send.is_set():
+			if self._was_connected:
+				# connection is lost: fast fail instead of waiting for reconnection
+				logger.error('DMSClient._send_message(): ERROR WebSocket connection is lost, can not send request "' + repr(msg) + '"')
+				raise IOError('DMSClient._send_message(): ERROR WebSocket connection is lost')
 			logger.warn('DMSClient._send_message(): WebSocket not ready for sending, giving it more time for connection establishment...')
-		if self.ready_to_send.wait(timeout=60):     # timeout in seconds
+		if self.ready_to_send.wait(timeout=CONNECT_TIMEOUT):     # timeout in seconds
 			logger.debug('DMSClient._send_message(): sending request "' + repr(msg) + '"')
 			self._ws.send(msg)
 		else:
@@ -1860,21 +3091,47 @@ class DMSClient(object):
 		self._msghandler.handle(message)
 
 	def _cb_on_error(self, ws, error):
-		logger.error("DMSClient: websocket callback _on_error(): " + error)
+		logger.error("DMSClient: websocket callback _on_error(): " + repr(error))
 
 	def _cb_on_open(self, ws):
 		logger.info("DMSClient: websocket callback _on_open(): WebSocket connection is established.")
-		self._subES_disp_thread.start()
-		self.ready_to_send.set()
+		self._connected_timestamp = time.time()
+		if not self._was_connected:
+			self._subES_disp_thread.start()
+			self._was_connected = True
+			self.ready_to_send.set()
+		else:
+			self.ready_to_send.set()
+			# resubscription needs responses from WebSocket thread, so we can't wait for them in this callback
+			replay_thread = threading.Thread(target=self._replay_subscriptions)
+			replay_thread.daemon = True
+			replay_thread.start()
+
+	def _replay_subscriptions(self):
+		if self._msghandler.replay_subscriptions():
+			for func in list(self._reconnect_callbacks_list):
+				try:
+					func()
+				except Exception:
+					logger.exception('DMSClient._replay_subscriptions(): reconnect callback ' + repr(func) + ' failed')
 
 	def _cb_on_close(self, ws):
-		logger.info("DMSClient: websocket callback _on_close(): server closed connection =>shutting down own client thread")
 		self.ready_to_send.clear()
-		self._exit_subAE_thread()
-		self._exit_ws_thread()
+		# nobody should wait for responses which will never arrive
+		self._msghandler.fail_pending_responses()
+		if self._value_cache:
+			# DMS-events get lost while disconnected
+			self._value_cache.clear()
+		if self._auto_reconnect and not self._is_closing.is_set():
+			logger.info("DMSClient: websocket callback _on_close(): server closed connection =>trying to reconnect")
+		else:
+			logger.info("DMSClient: websocket callback _on_close(): server closed connection =>shutting down own client thread")
+			self._exit_subAE_thread()
+			self._exit_ws_thread()
 
 	def __del__(self):
 		"""" closing websocket connection on object destruction """
+		self._is_closing.set()
 		self._ws.close()
 		time.sleep(1)
 		self._exit_ws_thread()
@@ -1882,11 +3139,13 @@ class DMSClient(object):
 	def _exit_ws_thread(self):
 		# FIXME: this function is never called from callbacks... But why?
 		logger.debug("DMSClient._exit_ws_thread(): exiting websocket thread...")
+		self._is_closing.set()
 		self._ws.keep_running = False
 
 	def _exit_subAE_thread(self):
 		logger.debug("DMSClient._exit_subAE_thread(): exiting subscriptionAE-dispatcher thread...")
-		self._subES_disp_thread.keep_running = False
+		self._msghandler.stop_coalescer()
+		self._subES_disp_thread.stop()
 
 	# trying to implement Context Manager.
 	# help from https://jeffknupp.com/blog/2016/03/07/python-with-context-managers/
@@ -1896,6 +3155,11 @@ class DMSClient(object):
 		return self
 
 	def __exit__(self, exc_type, exc_value, traceback):
+		for write_buffer in self._write_buffers_list:
+			try:
+				write_buffer.close()
+			except Exception:
+				logger.exception('DMSClient.__exit__(): sending remaining values of write-behind buffer failed')
 		self._exit_ws_thread()
 		self._exit_subAE_thread()
 		if traceback:
@@ -2151,4 +3415,39 @@ if __name__ == '__main__':
 			                                   start="2017-12-05T19:00:00,000+02:00",
 			                                   #end="2017-12-10T20:30:00,000+02:00"
 			                                   )
-			print('response: ' + repr(response))
\ No newline at end of file
+			print('response: ' + repr(response))
+
+		if 18 in test_set:
+			print('\nTesting retrieving HistData in smaller timeranges:')
+			DEBUGGING = True
+			for response in myClient.dp_get_histData_chunks(path="MSR01:Ala101:Output_Lampe",
+			                                                start="2017-11-05T19:00:00,000+02:00",
+			                                                end="2017-12-05T19:00:00,000+02:00",
+			                                                chunk_timedelta=datetime.timedelta(days=1),
+			                                                format="detail",
+			                                                interval=0):
+				print('response: ' + repr(response))
+
+		if 19 in test_set:
+			print('\nTesting read-through cache of DMS values:')
+			value_cache = myClient.enable_value_cache(paths=[u'MSR01'])
+			for x in range(10):
+				response = myClient.dp_get(path="MSR01:Ala101:Output_Lampe")
+				print('response: ' + repr(response))
+			print('cache statistics: ' + repr(value_cache.get_stats()))
+
+		if 20 in test_set:
+			print('\nTesting built-in metrics:')
+			for x in range(10):
+				response = myClient.dp_get(path="System:Time")
+			metrics = myClient.get_metrics()
+			print('metrics: ' + repr(metrics.get_stats()))
+			print(metrics.as_prometheus_text())
+
+		if 21 in test_set:
+			print('\nTesting write-behind buffer:')
+			with myClient.get_write_buffer() as write_buffer:
+				for x in range(1000):
+					write_buffer.dp_set(path="MSR01:Test_str", value=u'value ' + str(x), create=True)
+					write_buffer.dp_set(path="MSR01:Test_int_" + str(x % 100).zfill(3), value=x, create=True)
+			print('write buffer statistics: ' + repr(write_buffer.get_stats()))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.dmswebsocket_benchmark.py
+
+Copyright (C) 2018 Stefan Braun
+
+benchmark of event delivery in dms.dmswebsocket (runs without DMS):
+-CPU usage of idle background threads (event dispatcher and asynchronous EventSystem executor)
+-latency between queueing of a DMS-event and execution of Python callback
+=>background threads should block while idle, measured CPU time should be nearly zero
+
+load tests over WebSocket against dms.dmsemulator on localhost (option "--emulator", also runs on Linux without Visi.Plus):
+-request latency of sequential "get" requests
+-throughput of pipelined "get" requests
+-event fan-out rate (many subscriptions of the same DMS-key)
+-memory per subscription (only where /proc/self/statm is available, measured over client and emulator in same process)
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import dms.dmswebsocket as dms
+import dms.dmsemulator as dmsemulator
+from misc.EventSystem import EventSystem
+import argparse
+import gc
+import os
+import time
+import threading
+
+
+class _Fake_SubscriptionES(EventSystem):
+	""" SubscriptionES() without DMS connection """
+	def __init__(self, tag, sync_mode=True):
+		super(_Fake_SubscriptionES, self).__init__(sync_mode=sync_mode)
+		self.tag = tag
+		self.priority = dms.PRIO_NORMAL
+		self.time_budget = dms.CALLBACK_DURATION_WARNLEVEL
+		self.coalesce_interval = None
+
+
+def _get_cpu_secs():
+	# user + system CPU time of whole process
+	times = os.times()
+	return times[0] + times[1]
+
+
+def _get_event(tag, path, value):
+	return dms.DMSEvent(code=dms.DMSEvent.CODE_CHANGE,
+	                    path=path,
+	                    value=value,
+	                    tag=tag)
+
+
+def _print_latencies(name, latencies_list, unit_str='events'):
+	latencies_list = sorted(latencies_list)
+	nof = len(latencies_list)
+	if nof:
+		print(name + ': ' + str(nof) + ' ' + unit_str + ', latency in milliseconds: '
+		      + 'min=' + '{:.3f}'.format(latencies_list[0] * 1000.0)
+		      + ', median=' + '{:.3f}'.format(latencies_list[nof // 2] * 1000.0)
+		      + ', p99=' + '{:.3f}'.format(latencies_list[min(nof - 1, int(nof * 0.99))] * 1000.0)
+		      + ', max=' + '{:.3f}'.format(latencies_list[-1] * 1000.0))
+	else:
+		print(name + ': no events were delivered!')
+
+
+def measure_idle_cpu(idle_secs):
+	""" CPU time used by idle background threads """
+	event_q = dms._EventQueue()
+	dispatcher = dms._SubscriptionES_Dispatcher(event_q=event_q)
+	dispatcher.start()
+	async_es = _Fake_SubscriptionES(tag=u'async', sync_mode=False)
+
+	# give threads time for starting
+	time.sleep(0.5)
+	cpu_secs_old = _get_cpu_secs()
+	time.sleep(idle_secs)
+	cpu_secs = _get_cpu_secs() - cpu_secs_old
+
+	dispatcher.stop()
+	dispatcher.join()
+	async_es = None
+	print('idle CPU: ' + '{:.3f}'.format(cpu_secs) + ' seconds CPU time during ' + str(idle_secs) + ' seconds idle (' + '{:.2f}'.format(100.0 * cpu_secs / idle_secs) + '%)')
+	return cpu_secs
+
+
+def measure_event_latency(nof_events, pause_secs):
+	""" latency between queueing DMS-event and execution of callback """
+	event_q = dms._EventQueue()
+	dispatcher = dms._SubscriptionES_Dispatcher(event_q=event_q)
+	dispatcher.start()
+
+	latencies_list = []
+	done = threading.Event()
+	def cb(event):
+		latencies_list.append(time.time() - event.value)
+		if len(latencies_list) == nof_events:
+			done.set()
+
+	subES = _Fake_SubscriptionES(tag=u'latency')
+	subES += cb
+	for x in range(nof_events):
+		# sporadic events: dispatcher is idle before every event
+		time.sleep(pause_secs)
+		event_q.put((subES, _get_event(tag=subES.tag, path=u'Benchmark:Latency', value=time.time())))
+	done.wait(10.0)
+	dispatcher.stop()
+	dispatcher.join()
+	_print_latencies('dispatcher', latencies_list)
+
+	# asynchronous EventSystem executor thread
+	latencies_list = []
+	done.clear()
+	async_es = _Fake_SubscriptionES(tag=u'async', sync_mode=False)
+	async_es += cb
+	for x in range(nof_events):
+		time.sleep(pause_secs)
+		async_es(_get_event(tag=async_es.tag, path=u'Benchmark:Latency', value=time.time()))
+	done.wait(10.0)
+	async_es = None
+	_print_latencies('async EventSystem', latencies_list)
+
+
+def _get_rss_bytes():
+	# resident memory of whole process (None when OS doesn't provide it, e.g. on Windows)
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (IOError, OSError, ValueError):
+		return None
+
+
+def _get_emulator_client(nof_keys):
+	# emulated DMS with "nof_keys" DMS-keys and a connected DMSClient
+	emulator = dmsemulator.DMSEmulator(port=0)
+	emulator.load_tree(dict((u'Benchmark:Key{:05d}'.format(idx), idx) for idx in range(nof_keys)))
+	emulator.start()
+	dms_ws = dms.DMSClient(whois_str=u'pyVisiToolkit',
+	                       user_str=u'dms.dmswebsocket_benchmark',
+	                       dms_port_int=emulator.get_port())
+	# waiting for established connection
+	dms_ws.dp_get(path=u'Benchmark:Key00000')
+	return emulator, dms_ws
+
+
+def measure_request_latency(dms_ws, nof_requests):
+	""" sequential "get" requests: every request waits for its response """
+	latencies_list = []
+	begin = time.time()
+	for idx in range(nof_requests):
+		started = time.time()
+		dms_ws.dp_get(path=u'Benchmark:Key00000')
+		latencies_list.append(time.time() - started)
+	duration = time.time() - begin
+	_print_latencies('sequential "get"', latencies_list, unit_str='requests')
+	print('\t=>' + '{:.0f}'.format(nof_requests / duration) + ' requests per second')
+	return nof_requests / duration
+
+
+def measure_pipelined_throughput(dms_ws, nof_requests, nof_keys, max_inflight):
+	""" "get" requests with up to "max_inflight" requests waiting in DMS """
+	cmd_kwargs_gen = ({u'path': u'Benchmark:Key{:05d}'.format(idx % nof_keys)} for idx in range(nof_requests))
+	begin = time.time()
+	nof_responses = 0
+	for resp_list in dms_ws.dp_get_pipelined(cmd_kwargs_gen, max_inflight=max_inflight):
+		nof_responses += len(resp_list)
+	duration = time.time() - begin
+	print('pipelined "get" (max_inflight=' + str(max_inflight) + '): ' + str(nof_responses) + ' responses in ' + '{:.3f}'.format(duration) + ' seconds'
+	      + ' =>' + '{:.0f}'.format(nof_requests / duration) + ' requests per second')
+	return nof_requests / duration
+
+
+def measure_event_fanout(emulator, dms_ws, nof_subscriptions, nof_changes):
+	""" all subscriptions monitor same DMS-key, every change fires one callback per subscription """
+	nof_expected = nof_subscriptions * nof_changes
+	counter = [0]
+	lock = threading.Lock()
+	done = threading.Event()
+	def cb(event):
+		with lock:
+			counter[0] += 1
+			if counter[0] == nof_expected:
+				done.set()
+
+	subs_list = []
+	for idx in range(nof_subscriptions):
+		sub = dms_ws.get_dp_subscription(path=u'Benchmark:Key00001', event=dms.ON_CHANGE)
+		sub += cb
+		subs_list.append(sub)
+
+	begin = time.time()
+	for idx in range(nof_changes):
+		emulator.dp_set(u'Benchmark:Key00001', 100000 + idx)
+	done.wait(60.0)
+	duration = time.time() - begin
+	print('event fan-out (' + str(nof_subscriptions) + ' subscriptions, ' + str(nof_changes) + ' changes): ' + str(counter[0]) + ' of ' + str(nof_expected) + ' callbacks in ' + '{:.3f}'.format(duration) + ' seconds'
+	      + ' =>' + '{:.0f}'.format(counter[0] / duration) + ' callbacks per second')
+	for sub in subs_list:
+		sub.unsubscribe()
+	return counter[0] / duration
+
+
+def measure_subscription_memory(dms_ws, nof_subscriptions, nof_keys):
+	""" growth of resident memory per active subscription """
+	gc.collect()
+	rss_old = _get_rss_bytes()
+	if rss_old is None:
+		print('memory per subscription: not available on this OS')
+		return None
+	subs_list = []
+	for idx in range(nof_subscriptions):
+		subs_list.append(dms_ws.get_dp_subscription(path=u'Benchmark:Key{:05d}'.format(idx % nof_keys)))
+	gc.collect()
+	bytes_per_sub = float(_get_rss_bytes() - rss_old) / nof_subscriptions
+	print('memory per subscription: ' + '{:.0f}'.format(bytes_per_sub) + ' bytes (' + str(nof_subscriptions) + ' subscriptions)')
+	for sub in subs_list:
+		sub.unsubscribe()
+	return bytes_per_sub
+
+
+def run_emulator_benchmarks(nof_requests, nof_keys, max_inflight, nof_subscriptions, nof_changes):
+	""" load tests over WebSocket against dms.dmsemulator, returns dictionary with results """
+	emulator, dms_ws = _get_emulator_client(nof_keys)
+	results_dict = {}
+	try:
+		results_dict[u'sequential_per_sec'] = measure_request_latency(dms_ws, nof_requests)
+		results_dict[u'pipelined_per_sec'] = measure_pipelined_throughput(dms_ws, nof_requests, nof_keys, max_inflight)
+		results_dict[u'fanout_per_sec'] = measure_event_fanout(emulator, dms_ws, nof_subscriptions, nof_changes)
+		results_dict[u'bytes_per_subscription'] = measure_subscription_memory(dms_ws, nof_subscriptions * 10, nof_keys)
+		stats_dict = dms_ws.get_metrics().get_stats()
+		print('client metrics: ' + str(stats_dict[u'frames_sent'][u'total']) + ' frames sent, ' + str(stats_dict[u'frames_received'][u'total']) + ' frames received, '
+		      + str(stats_dict[u'events_received'][u'total']) + ' DMS-events')
+	finally:
+		dms_ws.__exit__(None, None, None)
+		emulator.stop()
+	return results_dict
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark of event delivery in dms.dmswebsocket (no DMS needed).')
+	parser.add_argument('--idle_secs', '-i', dest='idle_secs', default=5.0, type=float, help='duration of idle CPU measurement in seconds (default: 5.0)')
+	parser.add_argument('--nof_events', '-n', dest='nof_events', default=200, type=int, help='number of events for latency measurement (default: 200)')
+	parser.add_argument('--pause_secs', '-p', dest='pause_secs', default=0.01, type=float, help='pause between two events in seconds (default: 0.01)')
+
+	# load tests against emulated DMS
+	parser.add_argument('--emulator', '-e', action='store_true', help='run load tests over WebSocket against dms.dmsemulator instead of event delivery benchmark')
+	parser.add_argument('--nof_requests', '-r', dest='nof_requests', default=2000, type=int, help='number of "get" requests (default: 2000)')
+	parser.add_argument('--nof_keys', '-k', dest='nof_keys', default=1000, type=int, help='number of DMS-keys in emulated DMS (default: 1000)')
+	parser.add_argument('--max_inflight', '-m', dest='max_inflight', default=dms.GET_MAX_INFLIGHT, type=int, help='pipelined requests waiting in DMS (default: ' + str(dms.GET_MAX_INFLIGHT) + ')')
+	parser.add_argument('--nof_subscriptions', '-s', dest='nof_subscriptions', default=100, type=int, help='number of subscriptions for event fan-out (default: 100)')
+	parser.add_argument('--nof_changes', '-c', dest='nof_changes', default=50, type=int, help='number of changes for event fan-out (default: 50)')
+	args = parser.parse_args()
+
+	if args.emulator:
+		run_emulator_benchmarks(nof_requests=args.nof_requests,
+		                        nof_keys=args.nof_keys,
+		                        max_inflight=args.max_inflight,
+		                        nof_subscriptions=args.nof_subscriptions,
+		                        nof_changes=args.nof_changes)
+	else:
+		measure_idle_cpu(idle_secs=args.idle_secs)
+		measure_event_latency(nof_events=args.nof_events, pause_secs=args.pause_secs)
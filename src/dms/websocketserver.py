@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dms.websocketserver.py
+
+Copyright (C) 2018 Stefan Braun
+
+minimal WebSocket server (RFC 6455) without external dependencies,
+used by pyVisiToolkit components which are talking to DMS clients (e.g. dms.dmsproxy)
+=>only cleartext WebSocket ("ws" instead of "wss"/SSL)
+=>only unfragmented sending of text frames, receiving handles fragmented text and binary frames (up to MAX_PAYLOAD bytes per message)
+=>every connection runs in its own thread, calling callbacks of given application object:
+	app.on_open(conn)
+	app.on_message(conn, message)
+	app.on_close(conn)
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import SocketServer
+import threading
+import hashlib
+import base64
+import struct
+import socket
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('dms.websocketserver')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# according RFC 6455
+WS_MAGIC_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT         = 0x1
+OPCODE_BINARY       = 0x2
+OPCODE_CLOSE        = 0x8
+OPCODE_PING         = 0x9
+OPCODE_PONG         = 0xA
+
+# maximum size of HTTP upgrade request
+MAX_HANDSHAKE_SIZE = 16384
+
+# maximum size of received message in bytes (DMS requests are small, bigger frames get closed with status code 1009)
+MAX_PAYLOAD = 65536
+
+# status codes of close frame
+CLOSE_NORMAL   = 1000
+CLOSE_TOO_BIG  = 1009
+
+
+def unmask(payload, mask):
+	""" XOR payload with 4 byte mask, help from https://tools.ietf.org/html/rfc6455#section-5.3 """
+	# =>whole payload as one long integer, much faster than looping over every byte in Python
+	length = len(payload)
+	if not length:
+		return payload
+	mask_tiled = (mask * (length // 4 + 1))[:length]
+	value = int(payload.encode('hex'), 16) ^ int(mask_tiled.encode('hex'), 16)
+	return (('%0' + str(length * 2) + 'x') % value).decode('hex')
+
+
+class WebSocketConnection(object):
+	""" one connected WebSocket client (threadsafe sending) """
+
+	def __init__(self, sock, address):
+		self._sock = sock
+		self.address = address
+		self._send_lock = threading.Lock()
+		self.is_open = True
+
+	def send(self, msg):
+		""" send text frame (unicode strings get UTF8 encoded) """
+		if isinstance(msg, unicode):
+			msg = msg.encode('utf8')
+		self._send_frame(OPCODE_TEXT, msg)
+
+	def close(self, code=CLOSE_NORMAL):
+		if self.is_open:
+			try:
+				self._send_frame(OPCODE_CLOSE, struct.pack('!H', code))
+			except (socket.error, IOError):
+				pass
+			self.is_open = False
+			try:
+				self._sock.shutdown(socket.SHUT_RDWR)
+			except (socket.error, IOError):
+				pass
+
+	def _send_frame(self, opcode, payload):
+		# server never masks frames
+		length = len(payload)
+		if length < 126:
+			header = struct.pack('!BB', 0x80 | opcode, length)
+		elif length < 65536:
+			header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+		else:
+			header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+		with self._send_lock:
+			if not self.is_open:
+				raise IOError('WebSocketConnection._send_frame(): connection is closed')
+			self._sock.sendall(header + payload)
+
+	def _recv_exactly(self, nof_bytes):
+		chunks = []
+		while nof_bytes > 0:
+			chunk = self._sock.recv(nof_bytes)
+			if not chunk:
+				raise IOError('WebSocketConnection._recv_exactly(): connection closed by peer')
+			chunks.append(chunk)
+			nof_bytes -= len(chunk)
+		return ''.join(chunks)
+
+	def recv_message(self):
+		""" blocks until a whole message arrived, returns None when connection is closed """
+		fragments = []
+		nof_bytes = 0
+		while True:
+			byte1, byte2 = struct.unpack('!BB', self._recv_exactly(2))
+			is_fin = byte1 & 0x80
+			opcode = byte1 & 0x0F
+			is_masked = byte2 & 0x80
+			length = byte2 & 0x7F
+			if length == 126:
+				length = struct.unpack('!H', self._recv_exactly(2))[0]
+			elif length == 127:
+				length = struct.unpack('!Q', self._recv_exactly(8))[0]
+			nof_bytes += length
+			if nof_bytes > MAX_PAYLOAD:
+				logger.warn('WebSocketConnection.recv_message(): message of client ' + repr(self.address) + ' is bigger than ' + str(MAX_PAYLOAD) + ' bytes, closing connection...')
+				self.close(code=CLOSE_TOO_BIG)
+				return None
+			mask = self._recv_exactly(4) if is_masked else None
+			payload = self._recv_exactly(length) if length else ''
+			if mask:
+				payload = unmask(payload, mask)
+
+			if opcode == OPCODE_CLOSE:
+				self.close()
+				return None
+			elif opcode == OPCODE_PING:
+				self._send_frame(OPCODE_PONG, payload)
+			elif opcode == OPCODE_PONG:
+				pass
+			else:
+				# text, binary or continuation frame
+				fragments.append(payload)
+				if is_fin:
+					return ''.join(fragments)
+
+
+class _WebSocketHandler(SocketServer.BaseRequestHandler):
+	""" handshake and receive loop of one connection """
+
+	def handle(self):
+		conn = None
+		try:
+			if not self._do_handshake():
+				return
+			conn = WebSocketConnection(self.request, self.client_address)
+			self.server.app.on_open(conn)
+			while conn.is_open:
+				msg = conn.recv_message()
+				if msg is None:
+					break
+				try:
+					self.server.app.on_message(conn, msg)
+				except Exception:
+					logger.exception('_WebSocketHandler.handle(): exception in on_message() of application')
+		except (socket.error, IOError) as ex:
+			logger.debug('_WebSocketHandler.handle(): connection ' + repr(self.client_address) + ' closed: ' + repr(ex))
+		finally:
+			if conn:
+				conn.is_open = False
+				try:
+					self.server.app.on_close(conn)
+				except Exception:
+					logger.exception('_WebSocketHandler.handle(): exception in on_close() of application')
+
+	def _do_handshake(self):
+		# reading HTTP upgrade request
+		data = ''
+		while not '\r\n\r\n' in data:
+			chunk = self.request.recv(4096)
+			if not chunk or len(data) > MAX_HANDSHAKE_SIZE:
+				return False
+			data += chunk
+		headers = {}
+		for line in data.split('\r\n')[1:]:
+			if ':' in line:
+				name, value = line.split(':', 1)
+				headers[name.strip().lower()] = value.strip()
+		key = headers.get('sec-websocket-key', None)
+		if not key or headers.get('upgrade', '').lower() != 'websocket':
+			self.request.sendall('HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n')
+			return False
+		accept = base64.b64encode(hashlib.sha1(key + WS_MAGIC_GUID).digest())
+		self.request.sendall('HTTP/1.1 101 Switching Protocols\r\n'
+		                     'Upgrade: websocket\r\n'
+		                     'Connection: Upgrade\r\n'
+		                     'Sec-WebSocket-Accept: ' + accept + '\r\n\r\n')
+		return True
+
+
+class WebSocketServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+	""" threaded WebSocket server, forwarding all connections to callbacks of "app" """
+	daemon_threads = True
+	allow_reuse_address = True
+
+	def __init__(self, app, host, port):
+		self.app = app
+		SocketServer.TCPServer.__init__(self, (host, port), _WebSocketHandler)
+		self._serve_thread = None
+
+	def get_port(self):
+		""" TCP port (useful when server was created with port 0) """
+		return self.server_address[1]
+
+	def start(self):
+		""" serving in background thread """
+		self._serve_thread = threading.Thread(target=self.serve_forever)
+		self._serve_thread.daemon = True
+		self._serve_thread.start()
+		logger.info('WebSocketServer.start(): listening on ' + repr(self.server_address))
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+		logger.info('WebSocketServer.stop(): server on ' + repr(self.server_address) + ' is stopped.')
@@ -57,13 +57,17 @@ class Display(object):
 
 	def __init__(self, dms_ws):
 		self._dms_ws = dms_ws
+		# write-behind buffer: whole screen is sent in a few requests instead of one request per DMS key
+		self._dms_writer = dms_ws.get_write_buffer()
 
 	def show_random_points(self):
 		for y in range(Display.SCREEN_HEIGHT):
 			for x in range(Display.SCREEN_WIDTH):
-				resp = self._dms_ws.dp_set(path=Display.DMS_BASEKEY + ':' + str(x).zfill(3) + ':' + str(y).zfill(3),
-			                           value=random.choice([False, True]),
-			                           create=True)
+				self._dms_writer.dp_set(path=Display.DMS_BASEKEY + ':' + str(x).zfill(3) + ':' + str(y).zfill(3),
+			                        value=random.choice([False, True]),
+			                        create=True)
+		# waiting until DMS has got whole screen
+		self._dms_writer.flush()
 
 
 
@@ -67,6 +67,8 @@ class Display(object):
 
 	def __init__(self, dms_ws):
 		self._dms_ws = dms_ws
+		# write-behind buffer: whole screen is sent in a few requests instead of one request per DMS key
+		self._dms_writer = dms_ws.get_write_buffer()
 
 		# storing bitfield: one row is a 100 bit integer, storing a list of integers
 		# (attention: bit order is reversed compared to display position!)
@@ -174,10 +176,12 @@ class Display(object):
 					else:
 						chars_list.append(Display.PIXEL_OFF)
 				curr_dmskey = Display.DMS_BASEKEY + ':' + str(y).zfill(3)
-				resp = self._dms_ws.dp_set(path=curr_dmskey,
-				                           value=''.join(chars_list),
-				                           create=True)
+				self._dms_writer.dp_set(path=curr_dmskey,
+				                        value=''.join(chars_list),
+				                        create=True)
 				self._dirty_rows[y] = False
+		# waiting until DMS has got all changed rows
+		self._dms_writer.flush()
 
 
 def main(dms_server, dms_port):
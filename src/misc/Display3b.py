@@ -70,6 +70,8 @@ class Display(object):
 
 	def __init__(self, dms_ws):
 		self._dms_ws = dms_ws
+		# write-behind buffer: whole screen is sent in a few requests instead of one request per DMS key
+		self._dms_writer = dms_ws.get_write_buffer()
 
 		# storing display: using numpy two dimensional array, one 8bit value per pixel
 		# help from https://stackoverflow.com/questions/16396141/python-numpy-2d-array-indexing
@@ -167,10 +169,12 @@ class Display(object):
 					intensity = self._get_pixel(x, y)
 					chars_list.append(self._map_char_to_8bit(intensity))
 				curr_dmskey = Display.DMS_BASEKEY + ':' + str(y).zfill(3)
-				resp = self._dms_ws.dp_set(path=curr_dmskey,
-				                           value=''.join(chars_list),
-				                           create=True)
+				self._dms_writer.dp_set(path=curr_dmskey,
+				                        value=''.join(chars_list),
+				                        create=True)
 				self._dirty_rows[y] = False
+		# waiting until DMS has got all changed rows
+		self._dms_writer.flush()
 
 
 def main(dms_server, dms_port):
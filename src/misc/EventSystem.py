@@ -42,9 +42,6 @@ import copy
 import sys
 import logging
 
-# pause in busy-waiting-loop
-SLEEP_TIMEBASE = 0.001
-
 # setup of logging
 # (based on tutorial https://docs.python.org/2/howto/logging.html )
 # create logger =>set level to DEBUG if you want to catch all log messages!
@@ -95,11 +92,9 @@ class EventSystem(object):
 		with EventSystem._alock:
 			if not EventSystem._async_queue:
 				EventSystem._async_queue = queue.Queue()
-			if EventSystem._async_thread:
+			if EventSystem._async_thread and EventSystem._async_thread.inc_nof_eventsources():
 				logger.info('EventSystem._setup_async_thread(): using existing background thread for asynchronous handler execution...')
 				logger.debug('[number of active threads: ' + repr(threading.enumerate()) + ']')
-				EventSystem._async_thread.inc_nof_eventsources()
-				logger.debug('[number of active threads: ' + repr(threading.enumerate()) + ']')
 			else:
 				logger.debug('[number of active threads: ' + repr(threading.enumerate()) + ']')
 				EventSystem._async_thread = _Async_Executor_thread(target_q=EventSystem._async_queue)
@@ -218,6 +213,10 @@ class EventSystem(object):
 class _Async_Executor_thread(threading.Thread):
 	""" executing handler functions asynchronously in background """
 	# =>attention: if EventSystem doesn't keep "self._nof_eventsources" up to date, then this thread will keep whole Python program running!
+	# =>thread is blocked in queue while idle, last EventSystem instance wakes it up with a sentinel for shutdown
+
+	# sentinel in queue: check if thread should exit
+	_SHUTDOWN = object()
 
 	def __init__(self, target_q):
 		threading.Thread.__init__(self)
@@ -227,35 +226,45 @@ class _Async_Executor_thread(threading.Thread):
 		self._target_q = target_q
 		#self.keep_running = True
 		self._nof_eventsources = 1
+		self._has_exited = False
 		self._lock = threading.Lock()
 
 	def run(self):
-		while self._nof_eventsources > 0:
+		while True:
+			item = self._target_q.get()
+			if item is _Async_Executor_thread._SHUTDOWN:
+				with self._lock:
+					# meanwhile a new EventSystem instance could have registered...
+					if self._nof_eventsources <= 0:
+						self._has_exited = True
+						break
+				continue
+			_target, _args, _kwargs = item
 			try:
-				_target, _args, _kwargs = self._target_q.get(block=False)
-			except queue.Empty:
-				# give other threads some CPU time...
-				time.sleep(SLEEP_TIMEBASE)
-			else:
-				# (this is an optional else clause when no exception occured)
-				try:
-					_res = _target(*_args, **_kwargs)
-					logger.debug('_Async_Executor_thread.run(): handler function ' + repr(_target) + '(args=' + repr(_args) + ', kwargs=' + repr(_kwargs) + ') has result "' + repr(_res) + '"')
-				except:
-					logger.error('_Async_Executor_thread.run(): exception in handler function ' + repr(_target) + '(args=' + repr(_args) + ', kwargs=' + repr(_kwargs) + '):'+ repr(sys.exc_info()[:2]))
-				finally:
-					del _target, _args, _kwargs
+				_res = _target(*_args, **_kwargs)
+				logger.debug('_Async_Executor_thread.run(): handler function ' + repr(_target) + '(args=' + repr(_args) + ', kwargs=' + repr(_kwargs) + ') has result "' + repr(_res) + '"')
+			except:
+				logger.error('_Async_Executor_thread.run(): exception in handler function ' + repr(_target) + '(args=' + repr(_args) + ', kwargs=' + repr(_kwargs) + '):'+ repr(sys.exc_info()[:2]))
+			finally:
+				del _target, _args, _kwargs, item
 
 
 	def inc_nof_eventsources(self):
+		""" returns False when thread has already exited (caller has to start a new one) """
 		with self._lock:
+			if self._has_exited:
+				return False
 			self._nof_eventsources += 1
 			logger.debug('_Async_Executor_thread.inc_nof_eventsources(): self._nof_eventsources=' + str(self._nof_eventsources))
+			return True
 
 	def dec_nof_eventsources(self):
 		with self._lock:
 			self._nof_eventsources -= 1
 			logger.debug('_Async_Executor_thread.dec_nof_eventsources(): self._nof_eventsources=' + str(self._nof_eventsources))
+			if self._nof_eventsources <= 0:
+				# wake up blocked thread
+				self._target_q.put(_Async_Executor_thread._SHUTDOWN)
 
 
 
@@ -79,6 +79,28 @@ class Timezone(object):
 		return self._tz
 
 
+# timezone objects shared by all modules (key: name in tz database, value: tzinfo object)
+# =>pytz loads zoneinfo from disk, this should happen on first usage and not at import time
+_tz_dict = {}
+
+def get_tz(tz_database_str='MET'):
+	if not tz_database_str in _tz_dict:
+		_tz_dict[tz_database_str] = Timezone(tz_database_str).get_tz()
+	return _tz_dict[tz_database_str]
+
+
+class LazyTz(object):
+	"""
+	class attribute with timezone object, created on first access
+	(replacement for "_tz = Timezone().get_tz()" in class definitions, usage is still "MyClass._tz")
+	"""
+	def __init__(self, tz_database_str='MET'):
+		self._tz_database_str = tz_database_str
+
+	def __get__(self, obj, objtype=None):
+		return get_tz(self._tz_database_str)
+
+
 
 
 
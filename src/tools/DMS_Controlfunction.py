@@ -69,6 +69,10 @@ TYPE_MAPPING = {u'int': int,
 # function result caching
 CACHING_MAX_NOF_ELEMS = 1000
 
+# coalescing of DMS events: a Controlfunction needs only the latest value of a datapoint
+# (minimal interval in seconds between two callbacks of the same datapoint)
+EVENT_COALESCE_INTERVAL = 0.1
+
 
 class DMSDatapoint(object):
 	def __init__(self, dms_ws, key_str):
@@ -89,16 +93,40 @@ class DMSDatapoint(object):
 
 
 class DMSDatapoint_Result(DMSDatapoint):
-	def __init__(self, dms_ws, key_str):
+	def __init__(self, dms_ws, key_str, dms_writer=None):
 		super(DMSDatapoint_Result, self).__init__(dms_ws, key_str)
 		self._cached_val = None
+		# optional write-behind buffer (dms.DMSWriteBuffer): results are sent in batches,
+		# errors are reported asynchronously by it's callback
+		self._dms_writer = dms_writer
+		# value given to write-behind buffer, but not yet confirmed by DMS (None: no buffered write)
+		self._written_val = None
+
+	def write_error(self):
+		# called by Runner when write-behind buffer reports a failed write: next cycle writes again
+		self._written_val = None
+		self._cached_val = None
+
+	def _check_written_val(self):
+		# buffered write is confirmed when DMS has our value, or done when buffer has finished it
+		# (a failed write was reported by callback, another value means others have written afterwards)
+		if self._written_val is not None:
+			if self._value == self._written_val or not self._dms_writer.is_pending(self.key_str):
+				self._cached_val = self._written_val
+				self._written_val = None
 
 	def write_to_dms(self, newval):
 		# synchronize to DMS
 		if self.is_available():
-			if self._cached_val and self._cached_val != self._value:
+			if self._dms_writer:
+				self._check_written_val()
+			if self._written_val is None and self._cached_val and self._cached_val != self._value:
 				logger.warn('DMSDatapoint_Result.write_to_dms(): unexpected value change of DMS key "' + self.key_str + '" [cached:' + repr(self._cached_val) + ' | current:'  + repr(self._value) + '] ... others are writing to this key!')
-			if newval != self._value:
+			curr_val = self._value
+			if self._written_val is not None:
+				# DMS could still have an older value, last write is still buffered
+				curr_val = self._written_val
+			if newval != curr_val:
 				logger.debug('DMSDatapoint_Result.write_to_dms(): updating DMS key "' + self.key_str + '" with value ' + repr(newval) + ' converted to ' + self._datatype)
 				try:
 					# send correct datatype to DMS (prevents errors with wrong datatype of DMS-key or incorrect Python expression)
@@ -108,6 +136,13 @@ class DMSDatapoint_Result(DMSDatapoint):
 					logger.error('DMSDatapoint_Result.write_to_dms(): type mismatch, got exception "' + repr(ex) + '" while convert new result ' + repr(newval) + ' to ' + self._datatype + '!')
 					# leave function (help from https://stackoverflow.com/questions/6190776/what-is-the-best-way-to-exit-a-function-which-has-no-return-value-in-python-be )
 					raise ex
+				if self._dms_writer:
+					# (value in DMS could lag behind until write is confirmed, see _check_written_val())
+					self._written_val = self._value
+					self._dms_writer.dp_set(path=self.key_str,
+					                        value=self._value,
+					                        create=False)
+					return
 				resp = self._dms_ws.dp_set(path=self.key_str,
 				                           value=self._value,
 				                           create=False)
@@ -116,6 +151,8 @@ class DMSDatapoint_Result(DMSDatapoint):
 				else:
 					logger.error('DMSDatapoint_Result.write_to_dms(): DMS returned error "' + resp[0].message + '" for DMS key "' + self.key_str + '"')
 					raise Exception()
+			else:
+				self._cached_val = curr_val
 		else:
 			logger.error('DMSDatapoint_Result.write_to_dms(): DMS key "' + self.key_str + '" must exist and must not have datatype NONE!')
 			raise Exception()
@@ -194,7 +231,8 @@ class DMSDatapoint_Var(DMSDatapoint):
 		if not self._sub_obj:
 			logger.debug('DMSDatapoint_Var.subscribe(): trying to subscribe DMS key "' + self.key_str + '"...')
 			self._sub_obj = self._dms_ws.get_dp_subscription(path=self.key_str,
-			                                                 event=dms.ON_SET + dms.ON_CREATE + dms.ON_DELETE)
+			                                                 event=dms.ON_SET + dms.ON_CREATE + dms.ON_DELETE,
+			                                                 coalesce_interval=EVENT_COALESCE_INTERVAL)
 			logger.debug('DMSDatapoint_Var.subscribe(): trying to add callback for DMS key "' + self.key_str + '"...')
 			msg = self._sub_obj.sub_response.message
 			if not msg:
@@ -353,6 +391,10 @@ class Runner(object):
 		self._configfile = configfile
 		self._only_dryrun = bool(only_dryrun)
 		self._functions_dict = {}
+		# key: DMS key, value: DMSDatapoint_Result object (for reporting failed writes)
+		self._results_dict = {}
+		# results of all functions share one write-behind buffer
+		self._dms_writer = self._dms_ws.get_write_buffer(on_error=self._cb_write_error)
 
 
 	def load_config(self):
@@ -365,7 +407,9 @@ class Runner(object):
 			if func_def['activated']:
 				curr_prefix = func_def['key_prefix']
 				curr_result_var = DMSDatapoint_Result(dms_ws=self._dms_ws,
-				                                  key_str=curr_prefix + func_def['result'])
+				                                  key_str=curr_prefix + func_def['result'],
+				                                  dms_writer=self._dms_writer)
+				self._results_dict[curr_result_var.key_str] = curr_result_var
 				curr_ctrlfunc = Controlfunction(name_str=func_name,
 				                                expr_str=func_def['expr'],
 				                                result_var=curr_result_var,
@@ -384,6 +428,17 @@ class Runner(object):
 		logger.debug('Runner.load_config(): reading of configfile is done.')
 
 
+	def _cb_write_error(self, path, value, error):
+		# called by write-behind buffer for every failed write of a result
+		if isinstance(error, dms.RespSet):
+			logger.error('DMSDatapoint_Result.write_to_dms(): DMS returned error "' + str(error.message) + '" for DMS key "' + path + '"')
+		else:
+			logger.error('DMSDatapoint_Result.write_to_dms(): could not write value ' + repr(value) + ' into DMS key "' + path + '": ' + repr(error))
+		# next evaluation of this function has to write again
+		if path in self._results_dict:
+			self._results_dict[path].write_error()
+
+
 	def check_datapoints(self):
 		logger.info('Runner.check_datapoints(): check availability of datapoints in DMS...')
 		for func_name, func_obj in self._functions_dict.items():
@@ -419,7 +474,8 @@ def main(dms_server, dms_port, only_check, only_dryrun, configfile):
 	with dms.DMSClient(whois_str=u'pyVisiToolkit',
 	                                    user_str=u'tools.DMS_Controlfunction',
 	                                    dms_host_str=dms_server,
-	                                    dms_port_int=dms_port) as dms_ws:
+	                                    dms_port_int=dms_port,
+	                                    auto_reconnect=True) as dms_ws:
 		logger.info('established WebSocket connection to DMS version ' + dms_ws.dp_get(path='System:Version:dms.exe')[0]['value'])
 		runner = Runner(dms_ws=dms_ws,
 		                configfile=configfile,
@@ -20,47 +20,72 @@ You should have received a copy of the GNU General Public License along with thi
 # import sys
 import dms.dmspipe
 import dms.datapoint
+import dms.dmswebsocket
 import argparse
+import threading
 import time
 from datetime import datetime
 
 
-class Node(object):
-	def __init__(self, value, datatype_str):
-		self.value = value
-		self.datatype_str = datatype_str
-
-def get_dms_tree_as_dict(curr_dms, dms_node_str):
-	'''retrieves DMS tree with all datatypes and values'''
-	dms_key_list = curr_dms.get_DMS_subtree_list_by_key(dms_node_str)
-
-	# copied from "DMS_Value_Changer":
-	# mapping to right read function for given DMS type
-	readfunc_dict = {
-		1: curr_dms.pyDMS_ReadBITEx,
-		2: curr_dms.pyDMS_ReadBYSEx,
-		3: curr_dms.pyDMS_ReadWOSEx,
-		4: curr_dms.pyDMS_ReadDWSEx,
-		5: curr_dms.pyDMS_ReadBYUEx,
-		6: curr_dms.pyDMS_ReadWOUEx,
-		7: curr_dms.pyDMS_ReadDWUEx,
-		8: curr_dms.pyDMS_ReadFLTEx,
-		9: curr_dms.pyDMS_ReadSTREx
-	}
-
-	curr_dict = {}
-	for dms_key in dms_key_list:
-		# FIXME: copied code from "DMS_Value_Changer"... how to refactor this code? Implement a more efficient way...
-		curr_type = curr_dms.pyDMS_ReadTypeEx(dms_key)
-		if curr_type != 0:
-			# only handling DMS keys
-			curr_node = Node(value=readfunc_dict[curr_type](dms_key),
-			                 datatype_str=dms.datapoint.Dms_dp_Factory.dp_numeric_types_dict[curr_type])
+# sentinel for missing DMS keys in snapshots
+_MISSING = object()
+
+
+def get_dms_snapshot(curr_dms, dms_node_str):
+	"""
+	retrieves DMS tree with all datatypes and values as compact snapshot
+	(dictionary with DMS key as key, tuple (datatype string, value) as value)
+	"""
+	types_dict = dms.datapoint.Dms_dp_Factory.dp_numeric_types_dict
+	snapshot_dict = {}
+	for dms_key, (curr_type, curr_val) in curr_dms.get_DMS_subtree_snapshot(dms_node_str).iteritems():
+		snapshot_dict[dms_key] = (types_dict[curr_type], curr_val)
+	return snapshot_dict
+
+
+def diff_snapshots(old_snapshot_dict, new_snapshot_dict):
+	"""
+	compares two snapshots in one pass, returns list of changes
+	(list of tuples (DMS key, old tuple or None, new tuple or None), sorted by DMS key)
+	=>only changed DMS keys get sorted and printed, no temporary sets of all DMS keys
+	"""
+	changes_list = []
+	nof_found = 0
+	for dms_key, new_node in new_snapshot_dict.iteritems():
+		old_node = old_snapshot_dict.get(dms_key, _MISSING)
+		if old_node is _MISSING:
+			changes_list.append((dms_key, None, new_node))
 		else:
-			curr_node = Node(value=None,
-			                 datatype_str='NONE')
-		curr_dict[dms_key] = curr_node
-	return curr_dict
+			nof_found += 1
+			if old_node[1] != new_node[1]:
+				changes_list.append((dms_key, old_node, new_node))
+	if nof_found != len(old_snapshot_dict):
+		# some DMS keys are missing in new snapshot
+		for dms_key, old_node in old_snapshot_dict.iteritems():
+			if not dms_key in new_snapshot_dict:
+				changes_list.append((dms_key, old_node, None))
+	changes_list.sort()
+	return changes_list
+
+
+def print_change(dms_key, old_node, new_node):
+	""" one line per change (nodes are tuples (datatype string, value)) """
+	if old_node is None:
+		change_str = 'ADDED:  '
+		type_str = '[' + str(new_node[0]) + ']'
+		value_str = '[' + str(new_node[1]) + ']'
+	elif new_node is None:
+		change_str = 'DELETED:'
+		type_str = '[' + str(old_node[0]) + ']'
+		value_str = '[' + str(old_node[1]) + ']'
+	else:
+		change_str = 'CHANGED:'
+		if old_node[0] != new_node[0]:
+			type_str = '[' + str(old_node[0]) + ']=>[' + str(new_node[0]) + ']'
+		else:
+			type_str = '[' + str(old_node[0]) + ']'
+		value_str = '[' + str(old_node[1]) + ']=>[' + str(new_node[1]) + ']'
+	print_with_timestamp('\t'.join([change_str, type_str, dms_key, value_str]))
 
 
 def print_with_timestamp(line_str):
@@ -69,7 +94,92 @@ def print_with_timestamp(line_str):
 	print('\t'.join([time_str, line_str]))
 
 
-def main(dms_node_str, pause_secs, section_sep_str):
+class EventTracer(object):
+	"""
+	event-driven tracer: one DMS subscription over the whole subtree,
+	snapshot gets updated incrementally by DMS-events (work per event, not per DMS key)
+	"""
+	def __init__(self, dms_ws, dms_node_str):
+		self._lock = threading.Lock()
+		self.nof_changes = 0
+		self._snapshot_dict = {}
+		# events arriving while snapshot is read (None: snapshot is loaded)
+		self._pending_list = []
+
+		# subscription with callback before reading: no change gets lost
+		# (all events of one subscription are fired in order, they are buffered until snapshot is complete)
+		self._sub = dms_ws.get_dp_subscription(path=dms_node_str,
+		                                       event=dms.dmswebsocket.ON_ALL,
+		                                       query=dms.dmswebsocket.Query(maxDepth=0))
+		self._sub += self._cb_event
+		responses = list(dms_ws.dp_get(path=dms_node_str))
+		responses.extend(dms_ws.dp_get(path=dms_node_str, query=dms.dmswebsocket.Query(maxDepth=0)))
+		with self._lock:
+			stamps_dict = {}
+			for resp in responses:
+				if resp.code == u'ok':
+					self._snapshot_dict[resp.path] = (resp.type, resp.value)
+					stamps_dict[resp.path] = resp.stamp
+			pending_list, self._pending_list = self._pending_list, None
+			for event in pending_list:
+				if event.code in (dms.dmswebsocket.DMSEvent.CODE_DELETE, dms.dmswebsocket.DMSEvent.CODE_RENAME):
+					self._apply_event(event)
+				else:
+					# snapshot could already contain a newer value
+					snapshot_stamp = stamps_dict.get(event.path, None)
+					if not (event.stamp and snapshot_stamp and event.stamp < snapshot_stamp):
+						self._apply_event(event)
+
+	def __len__(self):
+		with self._lock:
+			return len(self._snapshot_dict)
+
+	def _cb_event(self, event):
+		with self._lock:
+			if self._pending_list is not None:
+				self._pending_list.append(event)
+			else:
+				self._apply_event(event)
+
+	def _apply_event(self, event):
+		# (caller has to hold lock)
+		if event.code == dms.dmswebsocket.DMSEvent.CODE_DELETE:
+			changes_list = self._remove_subtree(event.path)
+		elif event.code == dms.dmswebsocket.DMSEvent.CODE_RENAME:
+			changes_list = self._remove_subtree(event.path)
+			for dms_key, old_node, new_node in list(changes_list):
+				new_key = event.newPath + dms_key[len(event.path):]
+				self._snapshot_dict[new_key] = old_node
+				changes_list.append((new_key, None, old_node))
+		else:
+			new_node = (event.type, event.value)
+			old_node = self._snapshot_dict.get(event.path, None)
+			self._snapshot_dict[event.path] = new_node
+			if old_node is None or old_node[1] != new_node[1] or old_node[0] != new_node[0]:
+				changes_list = [(event.path, old_node, new_node)]
+			else:
+				# onSet with same value
+				changes_list = []
+		for change in changes_list:
+			print_change(*change)
+		self.nof_changes += len(changes_list)
+
+	def _remove_subtree(self, dms_key):
+		# (caller has to hold lock)
+		# FIXME: this loops through whole snapshot, but deletions and renames should be rare...
+		prefix = dms_key + ':'
+		changes_list = []
+		for curr_key in [key for key in self._snapshot_dict if key == dms_key or key.startswith(prefix)]:
+			changes_list.append((curr_key, self._snapshot_dict.pop(curr_key), None))
+		changes_list.sort()
+		return changes_list
+
+	def unsubscribe(self):
+		self._sub.unsubscribe()
+
+
+def main_polling(dms_node_str, pause_secs, section_sep_str):
+	""" polling of DMS via pmospipe.dll """
 	print('Starting "DMS tracer" for DMS node "' + str(dms_node_str) + '"...')
 	curr_dms = dms.dmspipe.Dmspipe()
 
@@ -81,63 +191,22 @@ def main(dms_node_str, pause_secs, section_sep_str):
 		print('ERROR: "DMS tracer" needs a running DMS!')
 		return 0
 
-	old_keys_dict = {}
-
-	# suppress showing of all DMS keys as "ADDED" on first run
-	first_run = True
+	# first snapshot: suppress showing of all DMS keys as "ADDED"
+	old_snapshot_dict = get_dms_snapshot(curr_dms=curr_dms, dms_node_str=dms_node_str)
 
 	# help from http://stackoverflow.com/questions/13180941/how-to-kill-a-while-loop-with-a-keystroke
 	try:
 		while True:
-			# handling of set() datatype: https://docs.python.org/2/library/sets.html#set-objects
-			# =>we use set() on the dictionary keys to detect and analyze changes compared to last check
-			old_keys_set = set(old_keys_dict.keys())
-			new_keys_dict = get_dms_tree_as_dict(curr_dms=curr_dms, dms_node_str=dms_node_str)
-			new_keys_set = set(new_keys_dict.keys())
-
-			if not first_run:
-				new_section = False
-				# check for deleted DMS keys
-				for dms_key in sorted(old_keys_set - new_keys_set):
-					old_node = old_keys_dict[dms_key]
-					change_str = 'DELETED:'
-					type_str = '[' + old_node.datatype_str + ']'
-					value_str = '[' + str(old_node.value) + ']'
-					print_with_timestamp('\t'.join([change_str, type_str, dms_key, value_str]))
-					new_section = True
-
-				# check for changed DMS keys
-				for dms_key in sorted(old_keys_set & new_keys_set):
-					old_node = old_keys_dict[dms_key]
-					new_node = new_keys_dict[dms_key]
-					if old_node.value != new_node.value:
-						change_str = 'CHANGED:'
-						if old_node.datatype_str != new_node.datatype_str:
-							type_str = '[' + old_node.datatype_str + ']=>[' + new_node.datatype_str + ']'
-						else:
-							type_str = '[' + old_node.datatype_str + ']'
-						value_str = '[' + str(old_node.value) + ']=>[' + str(new_node.value) + ']'
-						print_with_timestamp('\t'.join([change_str, type_str, dms_key, value_str]))
-						new_section = True
-
-				# check for added DMS keys
-				for dms_key in sorted(new_keys_set - old_keys_set):
-					new_node = new_keys_dict[dms_key]
-					change_str = 'ADDED:  '
-					type_str = '[' + new_node.datatype_str + ']'
-					value_str = '[' + str(new_node.value) + ']'
-					print_with_timestamp('\t'.join([change_str, type_str, dms_key, value_str]))
-					new_section = True
-
-				# print section separator if wanted (for better readability)
-				if new_section and section_sep_str != '':
-						print(section_sep_str)
-
-			else:
-				first_run = False
-
 			time.sleep(pause_secs)
-			old_keys_dict = new_keys_dict
+			new_snapshot_dict = get_dms_snapshot(curr_dms=curr_dms, dms_node_str=dms_node_str)
+			changes_list = diff_snapshots(old_snapshot_dict, new_snapshot_dict)
+			for change in changes_list:
+				print_change(*change)
+
+			# print section separator if wanted (for better readability)
+			if changes_list and section_sep_str != '':
+				print(section_sep_str)
+			old_snapshot_dict = new_snapshot_dict
 	except KeyboardInterrupt:
 		pass
 	print('Quitting "DMS tracer"...')
@@ -145,6 +214,41 @@ def main(dms_node_str, pause_secs, section_sep_str):
 	return 0  # success
 
 
+def main_events(dms_node_str, pause_secs, section_sep_str, dms_server, dms_port):
+	""" DMS-events via WebSocket connection """
+	print('Starting "DMS tracer" for DMS node "' + str(dms_node_str) + '" (event-driven)...')
+	with dms.dmswebsocket.DMSClient(whois_str=u'pyVisiToolkit',
+	                                user_str=u'tools.DMS_tracer',
+	                                dms_host_str=dms_server,
+	                                dms_port_int=dms_port,
+	                                event_workers=1) as dms_ws:
+		tracer = EventTracer(dms_ws=dms_ws, dms_node_str=dms_node_str)
+		print('DMS tracer is ready... (monitoring ' + str(len(tracer)) + ' DMS keys)')
+		print('\t(=>section separator after ' + str(pause_secs) + ' seconds without changes)')
+		print('=>usage hint: press <CTRL> + "C" for cancelling')
+		try:
+			nof_changes = 0
+			while True:
+				time.sleep(pause_secs)
+				# print section separator if wanted (for better readability)
+				if tracer.nof_changes != nof_changes and section_sep_str != '':
+					print(section_sep_str)
+				nof_changes = tracer.nof_changes
+		except KeyboardInterrupt:
+			pass
+		tracer.unsubscribe()
+	print('Quitting "DMS tracer"...')
+
+	return 0  # success
+
+
+def main(dms_node_str, pause_secs, section_sep_str, use_websocket=False, dms_server='localhost', dms_port=9020):
+	if use_websocket:
+		return main_events(dms_node_str, pause_secs, section_sep_str, dms_server, dms_port)
+	else:
+		return main_polling(dms_node_str, pause_secs, section_sep_str)
+
+
 if __name__ == '__main__':
 	parser = argparse.ArgumentParser(description='DMS tracer of changed DMS keys.')
 
@@ -154,6 +258,11 @@ if __name__ == '__main__':
 
 	parser.add_argument('-p', '--pause', default=1.0, type=float, nargs='?', help='waiting time in seconds for next polling cycle (default is 1.0)')
 
+	# event-driven tracing via DMS JSON Data Exchange instead of polling via pmospipe.dll
+	parser.add_argument('-w', '--websocket', action='store_true', help='use DMS-events over WebSocket instead of polling (also works on other hosts)')
+	parser.add_argument('--dms_servername', '-s', dest='dms_server', default='localhost', type=str, help='hostname or IP address for DMS JSON Data Exchange (default: localhost)')
+	parser.add_argument('--dms_port', '-P', dest='dms_port', default=9020, type=int, help='TCP port for DMS JSON Data Exchange (default: 9020)')
+
 	# this positional argument is optional
 	# with help from http://stackoverflow.com/questions/4480075/argparse-optional-positional-arguments
 	parser.add_argument('DMS_NODE', default='BMO', nargs='?', help='DMS node and all subnodes to trace (e.g. MSR01:H01, default is BMO)')
@@ -166,5 +275,10 @@ if __name__ == '__main__':
 	else:
 		section_sep_str = ''
 
-	status = main(dms_node_str=args.DMS_NODE, pause_secs=args.pause, section_sep_str=section_sep_str)
+	status = main(dms_node_str=args.DMS_NODE,
+	              pause_secs=args.pause,
+	              section_sep_str=section_sep_str,
+	              use_websocket=args.websocket,
+	              dms_server=args.dms_server,
+	              dms_port=args.dms_port)
 	# sys.exit(status)
\ No newline at end of file
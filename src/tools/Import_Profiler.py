@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+tools.Import_Profiler.py      v0.0.1
+Measures import time of our tools and all modules imported by them,
+report is similar to "python -X importtime" of Python 3.7 (not available in Python 2.7)
+
+Copyright (C) 2018 Stefan Braun
+
+example: python -m tools.Import_Profiler tools.Trenddata_Plausibility visu.psc.BMO_Link_Tool --max_ms 500
+=>exit code is 1 when one of the modules needs longer than "--max_ms" or imports one of the "--forbidden" modules,
+  exit code is 2 when import of a module failed (report and forbidden modules would be incomplete)
+  (usable as check before building new releases of tools started by Visi.Plus buttons)
+
+Remarks:
+-every module is measured in a fresh Python interpreter, otherwise already imported modules would be missing in report
+-"self" is time spent in the module itself, "cumulative" includes all modules imported by it (both in microseconds)
+-modules with "if __name__ == '__main__':" guard are only imported, GUI or DMS connections are not started
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import __builtin__
+import argparse
+import subprocess
+import json
+import time
+import sys
+import os
+
+
+# heavy modules which shouldn't be imported at startup of a tool
+# (they are imported on first usage, e.g. pandas in Trenddata_Plausibility._histData_as_timeseries())
+DEFAULT_FORBIDDEN = [u'matplotlib', u'pandas', u'numpy', u'sqlalchemy']
+
+# default list of checked tools
+DEFAULT_MODULES = [u'tools.PSC_file_selector',
+                   u'tools.Trenddata_Plausibility',
+                   u'visu.psc.BMO_Link_Tool',
+                   u'visu.psc.Parser']
+
+
+class ImportTimer(object):
+	""" replaces builtin __import__() and measures every first import of a module """
+
+	def __init__(self):
+		self._orig_import = None
+		# list of tuples (nesting level, module name, self time, cumulative time) in order of completed imports
+		self.records_list = []
+		# stack of lists with cumulative times of nested imports
+		self._nested_stack = [[]]
+
+	def install(self):
+		self._orig_import = __builtin__.__import__
+		__builtin__.__import__ = self._import
+
+	def uninstall(self):
+		__builtin__.__import__ = self._orig_import
+
+	def _import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+		if name in sys.modules:
+			# nothing to measure (implicit relative imports are resolved by the original function)
+			return self._orig_import(name, globals, locals, fromlist, level)
+
+		self._nested_stack.append([])
+		start = time.time()
+		try:
+			return self._orig_import(name, globals, locals, fromlist, level)
+		finally:
+			cumulative = time.time() - start
+			nested_list = self._nested_stack.pop()
+			self_time = cumulative - sum(nested_list)
+			self._nested_stack[-1].append(cumulative)
+			self.records_list.append((len(self._nested_stack) - 1, name, self_time, cumulative))
+
+
+def profile_module(module_name):
+	"""
+	imports module and returns dictionary with result
+	(should run in a fresh interpreter, see run_profile())
+	"""
+	timer = ImportTimer()
+	timer.install()
+	error = None
+	start = time.time()
+	try:
+		__import__(module_name)
+	except Exception as ex:
+		# e.g. module needs Windows ("msvcrt", "ctypes.windll"), measured times are still interesting
+		error = repr(ex)
+	finally:
+		total = time.time() - start
+		timer.uninstall()
+	return {u'module': module_name,
+	        u'total': total,
+	        u'error': error,
+	        u'records': timer.records_list,
+	        u'modules': sorted(sys.modules.keys())}
+
+
+def run_profile(module_name):
+	# starting this script in child mode: same interpreter, empty module cache
+	src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	env = dict(os.environ)
+	env['PYTHONPATH'] = os.pathsep.join([src_dir] + [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+	output = subprocess.check_output([sys.executable, '-m', 'tools.Import_Profiler', '--child', module_name], env=env, cwd=src_dir)
+	# last line is our JSON, modules could print something before
+	return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(result, min_us=0):
+	print('import time: self [us] | cumulative | imported package')
+	for level, name, self_time, cumulative in result[u'records']:
+		if cumulative * 1e6 >= min_us:
+			print('import time: %9d | %10d | %s%s' % (self_time * 1e6, cumulative * 1e6, '  ' * level, name))
+	print('total import time of "' + result[u'module'] + '": ' + '%.1f' % (result[u'total'] * 1000.0) + 'ms')
+	if result[u'error']:
+		print('import failed: ' + result[u'error'])
+
+
+def main(modules_list, max_ms=None, forbidden_list=None, min_us=0):
+	failed = False
+	import_failed = False
+	for module_name in modules_list:
+		print('')
+		print('*** ' + module_name + ' ***')
+		result = run_profile(module_name)
+		print_report(result, min_us=min_us)
+
+		if result[u'error']:
+			print('ERROR: import of "' + module_name + '" failed, modules imported after the error are missing in this check!')
+			import_failed = True
+		if max_ms is not None and result[u'total'] * 1000.0 > max_ms:
+			print('ERROR: "' + module_name + '" needs more than ' + str(max_ms) + 'ms for import!')
+			failed = True
+		for forbidden in forbidden_list or []:
+			if forbidden in result[u'modules']:
+				print('ERROR: "' + module_name + '" imports heavy module "' + forbidden + '" at startup!')
+				failed = True
+
+	if import_failed:
+		return 2
+	if failed:
+		return 1
+	return 0        # success
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Measures import time of tools (similar to "python -X importtime")')
+
+	parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='dotted module names (default: ' + ', '.join(DEFAULT_MODULES) + ')')
+	parser.add_argument('--max_ms', '-m', dest='max_ms', default=None, type=float, help='maximum import time in milliseconds per module (default: no limit)')
+	parser.add_argument('--forbidden', '-f', dest='forbidden', nargs='*', default=DEFAULT_FORBIDDEN, help='modules which mustn\'t get imported at startup (default: ' + ', '.join(DEFAULT_FORBIDDEN) + ')')
+	parser.add_argument('--min_us', dest='min_us', default=0, type=int, help='hide imports faster than this in microseconds (default: 0)')
+	parser.add_argument('--child', dest='child', default=None, help=argparse.SUPPRESS)
+
+	args = parser.parse_args()
+
+	if args.child:
+		# we are running in fresh interpreter started by run_profile()
+		print(json.dumps(profile_module(args.child)))
+		sys.exit(0)
+
+	status = main(modules_list=args.modules,
+	              max_ms=args.max_ms,
+	              forbidden_list=args.forbidden,
+	              min_us=args.min_us)
+	sys.exit(status)
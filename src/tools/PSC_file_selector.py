@@ -33,9 +33,9 @@ import sys
 import Tkinter
 import ttk
 import re
+import stat
 import datetime
 from operator import itemgetter
-import codecs
 import subprocess
 import misc.clipboard
 
@@ -98,32 +98,105 @@ def my_print(line):
 
 
 
+# optional: "scandir" backport of Python 3.5 os.scandir() (https://pypi.python.org/pypi/scandir)
+# =>on Windows it returns file attributes together with directory listing, no os.stat() per file
+try:
+	from scandir import scandir
+except ImportError:
+	scandir = None
+
+# color "magenta" (integer value 16711935=magenta) in PSC files =>we ignore false positive results...
+MAGENTA_BYTES = b'16711935'
+
+# bytes undefined in codepage 1252: such PSC files can't be decoded and contain no searchable text
+# (five substring searches are much faster than one regex with character class)
+UNDEFINED_CP1252_BYTES = (b'\x81', b'\x8d', b'\x8f', b'\x90', b'\x9d')
+
+# number of content patterns remembered per PSC file (every keystroke in GUI is a new pattern)
+MAX_CACHED_PATTERNS = 32
+
+
+def iter_regular_files(path):
+	"""
+	generator: yields tuples (filename, fullpath, stat result) of all regular files in directory
+	=>only one os.stat() per file (or none at all when "scandir" is available on Windows)
+	"""
+	if scandir:
+		for entry in scandir(path):
+			if entry.is_file():
+				yield entry.name, entry.path, entry.stat()
+	else:
+		for filename in os.listdir(path):
+			fullpath = os.path.join(path, filename)
+			try:
+				curr_stat = os.stat(fullpath)
+			except OSError:
+				# file was deleted in the meantime
+				continue
+			if stat.S_ISREG(curr_stat.st_mode):
+				yield filename, fullpath, curr_stat
+
+
 class PscFile(object):
+	"""
+	content of one PSC file as raw bytes (encoded in ENCODING_FILES_PSC) with cached search results
+	=>file is read again only when size or modification time has changed
+	"""
 	def __init__(self, fullpath):
 		self._fullpath = fullpath
-		self._whole_file = u''
+		self._raw_content = None
 		self._modification_time = 0
 		self._filesize = 0
-		self._last_readtime = -1
+		self._size_kb = None
+		self._mod_time_str = None
+		self._contains_magenta = None
+		# key: bytes regex pattern, value: True/False
+		self._matches_dict = {}
+
+	def update_stat(self, curr_stat):
+		""" forget everything about old content when file has changed (stat result from directory listing) """
+		if curr_stat.st_mtime != self._modification_time or curr_stat.st_size != self._filesize:
+			self._modification_time = curr_stat.st_mtime
+			self._filesize = curr_stat.st_size
+			self._raw_content = None
+			self._size_kb = None
+			self._mod_time_str = None
+			self._contains_magenta = None
+			self._matches_dict = {}
 
 	def _read_metadata(self):
-		stat = os.stat(self._fullpath)
-		self._filesize = stat.st_size
-		self._modification_time = stat.st_mtime
+		self.update_stat(os.stat(self._fullpath))
+
+	def get_raw_content(self):
+		if self._raw_content is None:
+			with open(self._fullpath, 'rb') as f:
+				self._raw_content = f.read()
+			if any(undefined in self._raw_content for undefined in UNDEFINED_CP1252_BYTES):
+				fullpath = self._fullpath
+				if not isinstance(fullpath, unicode):
+					fullpath = fullpath.decode(ENCODING_FILENAMES, 'replace')
+				my_print(u'file "' + fullpath + u'" contains characters undefined in ' + ENCODING_FILES_PSC + u'!')
+				my_print(u'=>ignoring this file...')
+				self._raw_content = b''
+		return self._raw_content
 
 	def get_whole_file(self):
 		self._read_metadata()
-		if self._last_readtime <> self._modification_time:
-			# first reading or file changed
-			with codecs.open(self._fullpath, 'r', encoding=ENCODING_FILES_PSC) as f:
-				try:
-					self._whole_file = f.read()
-				except UnicodeDecodeError as ex:
-					my_print(u'Exception "UnicodeDecodeError" in "get_whole_file()": file "' + self._fullpath + u'" contains wrong characters!')
-					my_print(u'=>ignoring this file...')
-					self._whole_file = u''
-				self._last_readtime = self._modification_time
-		return self._whole_file
+		return self.get_raw_content().decode(ENCODING_FILES_PSC)
+
+	def search(self, re_bytes_compiled):
+		""" True when compiled bytes regex pattern matches content of PSC file """
+		key = re_bytes_compiled.pattern
+		if not key in self._matches_dict:
+			if len(self._matches_dict) >= MAX_CACHED_PATTERNS:
+				self._matches_dict = {}
+			self._matches_dict[key] = bool(re_bytes_compiled.search(self.get_raw_content()))
+		return self._matches_dict[key]
+
+	def contains_magenta(self):
+		if self._contains_magenta is None:
+			self._contains_magenta = MAGENTA_BYTES in self.get_raw_content()
+		return self._contains_magenta
 
 	def get_metadata(self):
 		# examples from http://stackoverflow.com/questions/39359245/from-stat-st-mtime-to-datetime
@@ -131,10 +204,11 @@ class PscFile(object):
 		# and https://docs.python.org/2/library/stat.html
 		# and http://stackoverflow.com/questions/455612/limiting-floats-to-two-decimal-points
 		# and http://stackoverflow.com/questions/311627/how-to-print-date-in-a-regular-format-in-python
-		self._read_metadata()
-		size = float("{0:.2f}".format(self._filesize / 1024.0))
-		mod_time = datetime.datetime.fromtimestamp(self._modification_time).strftime("%Y.%m.%d %H:%M:%S")
-		return size, mod_time
+		# =>caller has to update file attributes (update_stat() or get_whole_file())
+		if self._size_kb is None:
+			self._size_kb = float("{0:.2f}".format(self._filesize / 1024.0))
+			self._mod_time_str = datetime.datetime.fromtimestamp(self._modification_time).strftime("%Y.%m.%d %H:%M:%S")
+		return self._size_kb, self._mod_time_str
 
 
 class PscFileHandler(object):
@@ -145,10 +219,20 @@ class PscFileHandler(object):
 	def get_file(self, filename):
 		return self._pscfiles_dict[filename]
 
-	def select_file(self, filename, fullpath):
-		self._selected_files.add(filename)
+	def get_or_add_file(self, filename, fullpath):
 		if filename not in self._pscfiles_dict:
 			self._pscfiles_dict[filename] = PscFile(fullpath)
+		return self._pscfiles_dict[filename]
+
+	def remove_other_files(self, filenames_set):
+		# forget deleted files (their content is cached)
+		for filename in set(self._pscfiles_dict) - filenames_set:
+			del self._pscfiles_dict[filename]
+			self._selected_files.discard(filename)
+
+	def select_file(self, filename, fullpath):
+		self._selected_files.add(filename)
+		self.get_or_add_file(filename, fullpath)
 
 	def deselect_file(self, filename):
 		self._selected_files.discard(filename)
@@ -166,6 +250,7 @@ class Dirlister(object):
 		self._filehandler = PscFileHandler()
 		self._re_fname_compiled = re.compile(u'')
 		self._re_string_compiled = re.compile(u'')
+		self._re_string_bytes_compiled = re.compile(b'')
 
 	def set_re_fname_pattern(self, re_fname_pattern):
 		"""
@@ -182,6 +267,14 @@ class Dirlister(object):
 		=>must be called when pattern needs an update before get_listing()
 		"""
 		self._re_string_compiled = re.compile(self._to_unicode(re_string_pattern, ENCODING_LOCALE))
+		# searching PSC files without decoding: same pattern in encoding of PSC files
+		# (codepage 1252 is a single byte encoding and our regex patterns are without re.UNICODE flag, so matches are the same)
+		try:
+			self._re_string_bytes_compiled = re.compile(self._re_string_compiled.pattern.encode(ENCODING_FILES_PSC))
+		except (UnicodeEncodeError, re.error):
+			# characters not available in PSC files, or pattern gets invalid in encoded form
+			# (e.g. character range u'[\xe0-€]' is reversed in codepage 1252) =>searching in decoded content
+			self._re_string_bytes_compiled = None
 
 	def _to_unicode(self, text, encoding):
 		# tkinter entry widget returns ASCII or unicode, so we should handle all regex operations in unicode
@@ -193,40 +286,32 @@ class Dirlister(object):
 		return text
 
 
+	def _content_matches(self, curr_file):
+		if self._re_string_bytes_compiled is None:
+			return bool(self._re_string_compiled.search(curr_file.get_raw_content().decode(ENCODING_FILES_PSC)))
+		return curr_file.search(self._re_string_bytes_compiled)
+
+
 	def get_listing(self, sort_item=0, reversed=False):
-		# collecting filenames
+		# one pass over directory: filename filter, content filter and metadata of every PSC file
+		# (content and search results are cached until file changes, so typing a pattern in GUI needs no disk access)
 		self._filehandler.clear_file_selection()
-		for entry in os.listdir(self._path):
-			fullpath = os.path.join(self._path, entry)
-			if os.path.isfile(fullpath):
-				if entry.split(os.extsep)[-1].upper() == u'PSC':
-					if self._re_fname_compiled.search(entry):
-						# regex search returned a match object =>mark filename for further filtering
+		filenames_set = set()
+		detail_list = []
+		for entry, fullpath, curr_stat in iter_regular_files(self._path):
+			if entry.split(os.extsep)[-1].upper() == u'PSC':
+				filenames_set.add(entry)
+				if self._re_fname_compiled.search(entry):
+					# regex search returned a match object =>analyze PSC files content
+					curr_file = self._filehandler.get_or_add_file(entry, fullpath)
+					curr_file.update_stat(curr_stat)
+					if self._content_matches(curr_file):
 						self._filehandler.select_file(entry, fullpath)
+						size, mod_time = curr_file.get_metadata()
 
-		# analyze PSC files content
-		# =>removing file when it doesn't match
-		# (currently only a very basic textsearch)
-		for filename in self._filehandler.get_file_selection():
-			curr_file = self._filehandler.get_file(filename)
-			if not self._re_string_compiled.search(curr_file.get_whole_file()):
-				# regex search didn't returned a match object...
-				self._filehandler.deselect_file(filename)
-
-		# collect metadata
-		detail_list = []
-		for filename in self._filehandler.get_file_selection():
-			curr_file = self._filehandler.get_file(filename)
-			size, mod_time = curr_file.get_metadata()
-
-			# search for color "magenta" (integer value 16711935=magenta) =>we ignore false positive results...
-			if u'16711935' in curr_file.get_whole_file():
-				contains_magenta = True
-			else:
-				contains_magenta = False
-
-			# add everything together as tuple
-			detail_list.append((filename, size, mod_time, contains_magenta))
+						# add everything together as tuple
+						detail_list.append((entry, size, mod_time, curr_file.contains_magenta()))
+		self._filehandler.remove_other_files(filenames_set)
 
 		# sort list by item specified by caller
 		# based on example from http://stackoverflow.com/questions/10695139/sort-a-list-of-tuples-by-2nd-item-integer-value
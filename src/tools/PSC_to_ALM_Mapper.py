@@ -18,11 +18,15 @@ You should have received a copy of the GNU General Public License along with thi
 
 
 import dms.dmswebsocket as dms
+import dms.dmsquery as dmsquery
+import dms.dmspool as dmspool
+import visu.psc.ProjectScanner as ProjectScanner
+import visu.psc.KeyIndex as KeyIndex
 import logging
 import argparse
 import os
-import re
 import collections
+import threading
 import time
 
 
@@ -109,64 +113,42 @@ class PSC_Analyzer(object):
 	def __init__(self, project_path):
 		self._psc_path = os.path.join(project_path, 'scr')
 
-		# key: BMO instance // value: list of filenames
-		self._bmo_instances_dict = {}
+		# inverted index: BMO instance -> PSC files (built in analyze())
+		self._key_index = None
 
 		# key: PSC-filename // value: DMS_pathstats object
 		self._psc_dms_keystats = {}
 
-	def analyze(self):
+	def analyze(self, processes=None):
 		logger.debug('PSC_Analyzer.analyze(): searching LIB attributes in all PSC files')
+		# shared index of all PSC files: only new or changed files get read (in a process pool)
+		scanner = ProjectScanner.PscProjectScanner(self._psc_path, processes=processes)
+		scanner.update()
+		self._key_index = KeyIndex.PscKeyIndex(scanner)
 		nof_files = 0
-		for fullpath in self._filelist_generator(self._psc_path):
+		for fullpath in scanner.get_files():
 			nof_files += 1
 			logger.debug('PSC_Analyzer.analyze(): analyzing PSC file "' + fullpath + '"')
-			with open(fullpath, mode='r') as f:
-				psc_content = f.read()
-
-				if not fullpath in self._psc_dms_keystats:
-					self._psc_dms_keystats[fullpath] = DMS_keystats()
-
-				# help with regex: https://stackoverflow.com/questions/6018340/capturing-group-with-findall
-				# =>we search only for one group, so we get a list of strings and not a list of tuples containing matched groups
-				patterns = [re.compile(r'LIB;[\w\s]+\.plb;\w+;([\w:]+);BMO:.+'),                    # BMO instances
-				            re.compile(r'IBW;[\w\s]+\.*\w*;\d+;\d+;\d+;\d+;BMO[\w:]+;([\w:]+);')]   # button with reinit
-				for pattern in patterns:
-					for bmo_inst in pattern.findall(psc_content):
-						#logger.debug('PSC_Analyzer.analyze(): found BMO instance "' + bmo_inst + '")')
-
-						# add current PSC file as possible target for ALM "Screen" of this BMO instance
-						if not bmo_inst in self._bmo_instances_dict:
-							self._bmo_instances_dict[bmo_inst] = []
-						if not fullpath in self._bmo_instances_dict[bmo_inst]:
-							self._bmo_instances_dict[bmo_inst].append(fullpath)
-
-						# update DMS path statistics of current PSC file
-						self._psc_dms_keystats[fullpath].update_statistic(bmo_inst)
-
-				logger.debug('PSC_Analyzer.analyze(): found ' + str(len(self._bmo_instances_dict[bmo_inst])) + ' BMO instances.')
-		logger.info('PSC_Analyzer.analyze(): found total ' + str(len(self._bmo_instances_dict)) + ' BMO instances in ' + str(nof_files) + ' PSC files.')
-
-
-	def _filelist_generator(self, path):
-		for entry in os.listdir(path):
-			fullpath = os.path.join(path, entry)
-			if os.path.isfile(fullpath):
-				# FIXME: should we use this shortcut: ignoring BMOs (assumption: PSC-files starting with "_" or a digit aren't BMOs)
-				#pattern = r'^[_\d].*\.PSC'
-				pattern = r'.*\.PSC'
-				m = re.search(pattern, entry, re.IGNORECASE)
-				if m:
-					yield fullpath
-			# FIXME: should we recursively tracerse subdirectories? Perhaps this would work:
-				# elif os.path.isdir(fullpath):
-				#      for curr_entry in self._filelist_generator(fullpath):
-				#           yield curr_entry
+
+			if not fullpath in self._psc_dms_keystats:
+				self._psc_dms_keystats[fullpath] = DMS_keystats()
+
+			bmo_instances_list = scanner.get_info(fullpath)[u'bmo_instances']
+			for bmo_inst in bmo_instances_list:
+				#logger.debug('PSC_Analyzer.analyze(): found BMO instance "' + bmo_inst + '")')
+
+				# update DMS path statistics of current PSC file
+				self._psc_dms_keystats[fullpath].update_statistic(bmo_inst)
+
+			logger.debug('PSC_Analyzer.analyze(): found ' + str(len(bmo_instances_list)) + ' BMO instances.')
+		logger.info('PSC_Analyzer.analyze(): found total ' + str(len(self._key_index.get_keys(kind=KeyIndex.KIND_BMO))) + ' BMO instances in ' + str(nof_files) + ' PSC files.')
 
 
 	def get_psc_filename(self, bmo_instance):
 		try:
-			psc_list = self._bmo_instances_dict[bmo_instance]
+			psc_list = self._key_index.get_files(bmo_instance, kind=KeyIndex.KIND_BMO)
+			if not psc_list:
+				raise KeyError(bmo_instance)
 			if len(psc_list) == 1:
 				# simple case: only one PSC file contains this BMO instance
 				return psc_list[0]
@@ -227,16 +209,24 @@ class ALM_datapoint(object):
 		self._alm_screen_allkeys_dict = collections.OrderedDict()
 
 	def collect(self):
+		# both queries are independent: with a connection pool they run in parallel
+		# (an exception in background thread has to stop us, otherwise we would write wrong mappings)
+		errors_list = []
+		def collect_screen():
+			try:
+				self._collect_Screen()
+			except Exception as ex:
+				errors_list.append(ex)
+		screen_thread = threading.Thread(target=collect_screen)
+		screen_thread.start()
 		self._collect_ALM()
-		self._collect_Screen()
+		screen_thread.join()
+		if errors_list:
+			raise errors_list[0]
 
 		# retrieve all OBJECT datapoints and match against ALM datapoints
-		responses = self._dms_ws.dp_get(path='',
-		                                query=dms.Query(regExPath="^(?!BMO).+:OBJECT$",
-		                                                maxDepth=-1))
-		# logger.debug('FOO: responses[0]=' + repr(responses[0]))
-		for respget in responses:
-			bmo_instance = respget.path.split(':OBJECT')[0]
+		# (filtering in DMS, paged by subtrees)
+		for bmo_instance, bmo_class in dmsquery.find_bmo_instances(self._dms_ws):
 			if bmo_instance:
 				for alm in self._alm_dps_dict:
 					# assumption: every ALM datapoint contains part of exactly one BMO instance
@@ -383,18 +373,19 @@ class ALM_datapoint(object):
 
 
 
-def main(dms_server, dms_port, only_dryrun, write_backupfile):
-	with dms.DMSClient(whois_str=u'pyVisiToolkit',
-	                                    user_str=u'tools.PSC_to_ALM_Mapper',
-	                                    dms_host_str=dms_server,
-	                                    dms_port_int=dms_port) as dms_ws:
+def main(dms_server, dms_port, only_dryrun, write_backupfile, nof_connections=dmspool.POOL_CONNECTIONS, nof_processes=None):
+	# bulk reads are spread over several WebSocket connections
+	with dmspool.DMSConnectionPool(whois_str=u'pyVisiToolkit',
+	                               user_str=u'tools.PSC_to_ALM_Mapper',
+	                               hosts=[(dms_server, dms_port)],
+	                               nof_connections=nof_connections) as dms_ws:
 		logger.info('main(): established WebSocket connection to DMS version ' + dms_ws.dp_get(path='System:Version:dms.exe')[0]['value'])
 
 		project_str = dms_ws.dp_get(path='System:Project')[0]['value']
 		logger.info('main(): working in project "' + project_str + '"...')
 
 		psc_analyzer = PSC_Analyzer(project_path=project_str)
-		psc_analyzer.analyze()
+		psc_analyzer.analyze(processes=nof_processes)
 
 		alm_dp = ALM_datapoint(dms_ws)
 		alm_dp.collect()
@@ -415,12 +406,16 @@ if __name__ == '__main__':
 	parser.add_argument('--dryrun', '-d', action='store_true', dest='only_dryrun', default=False, help='no writes into DMS, only print statistics (default: False)')
 	parser.add_argument('--dms_servername', '-s', dest='dms_server', default='localhost', type=str, help='hostname or IP address for DMS JSON Data Exchange (default: localhost)')
 	parser.add_argument('--dms_port', '-p', dest='dms_port', default=9020, type=int, help='TCP port for DMS JSON Data Exchange (default: 9020)')
+	parser.add_argument('--connections', '-c', dest='nof_connections', default=dmspool.POOL_CONNECTIONS, type=int, help='number of WebSocket connections to DMS (default: ' + str(dmspool.POOL_CONNECTIONS) + ')')
+	parser.add_argument('--processes', '-j', dest='nof_processes', default=None, type=int, help='number of processes for scanning PSC files (default: number of CPUs)')
 
 	args = parser.parse_args()
 
 	status = main(dms_server = args.dms_server,
 	              dms_port = args.dms_port,
 	              only_dryrun = args.only_dryrun,
-	              write_backupfile = args.write_backupfile
+	              write_backupfile = args.write_backupfile,
+	              nof_connections = args.nof_connections,
+	              nof_processes = args.nof_processes
 	              )
 	#sys.exit(status)
\ No newline at end of file
@@ -168,6 +168,8 @@ class Runner(object):
 		self._target_list = target_list
 		self._only_dryrun = bool(only_dryrun)
 		self._pingtargets = []
+		# write-behind: Round Trip Times of all targets are sent together, without waiting for DMS
+		self._dms_writer = self._dms_ws.get_write_buffer(on_error=self._cb_write_error)
 
 
 
@@ -199,21 +201,26 @@ class Runner(object):
 				rtt = target.get_ping_rtt()
 				if rtt:
 					logger.debug('[' + target.host + '] Runner.analyze_and_store(): Round Trip Time is ' + repr(rtt))
-					resp = self._dms_ws.dp_set(path=target.dmskey,
-					                           value=rtt,
-					                           create=False)
-					if resp[0].code == 'ok':
-						self._cached_val = resp[0].value
-					else:
-						logger.error('Runner.analyze_and_store(): DMS returned error "' + resp[
-							0].message + '" for DMS key "' + target.dmskey + '"')
-						# FIXME: should we throw exception? should we remove this target from list and keep going on?
-						# =>currently we retry it next cycle.
+					self._dms_writer.dp_set(path=target.dmskey,
+					                        value=rtt,
+					                        create=False)
 			except KilledProcessException:
 				# subprocess is no more working...
 				target.print_statistics()
 				self._pingtargets.remove(target)
 
+
+	def _cb_write_error(self, path, value, error):
+		# called by write-behind buffer for every failed write
+		if isinstance(error, dms.RespSet):
+			logger.error('Runner.analyze_and_store(): DMS returned error "' + str(error.message) + '" for DMS key "' + path + '"')
+			# FIXME: should we throw exception? should we remove this target from list and keep going on?
+			# =>currently we retry it next cycle.
+		else:
+			# WebSocket connection to DMS is lost, DMSClient tries to reconnect in background
+			# =>we retry it next cycle.
+			logger.error('Runner.analyze_and_store(): could not write into DMS key "' + path + '": ' + repr(error))
+
 	def get_nof_pingtargets(self):
 		return len(self._pingtargets)
 
@@ -223,6 +230,8 @@ class Runner(object):
 		for target in self._pingtargets:
 			target.print_statistics()
 			target.stop_background_ping()
+		# sending last values
+		self._dms_writer.close()
 
 
 
@@ -231,7 +240,8 @@ def main(dms_server, dms_port, target_list, only_dryrun):
 	with dms.DMSClient(whois_str=u'pyVisiToolkit',
 	                                    user_str=u'tools.Ping_Trend',
 	                                    dms_host_str=dms_server,
-	                                    dms_port_int=dms_port) as dms_ws:
+	                                    dms_port_int=dms_port,
+	                                    auto_reconnect=True) as dms_ws:
 		logger.info('established WebSocket connection to DMS version ' + dms_ws.dp_get(path='System:Version:dms.exe')[0]['value'])
 		runner = Runner(dms_ws=dms_ws,
 		                target_list=target_list,
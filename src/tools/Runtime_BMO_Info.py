@@ -52,6 +52,10 @@ def main(argv=None):
 	psc_elem_set = set()
 	doPrintElem = True
 
+	# parsing only when another PSC file is shown (or image gets reloaded), spatial index of PscFile is kept between cycles
+	curr_visuparser = None
+	curr_psc_key = None
+
 	# mainloop
 	doRun = True
 	try:
@@ -64,13 +68,15 @@ def main(argv=None):
 				mousePos = mouse.get_position()
 
 				filename = os.path.join(curr_prj, 'scr' , curr_psc)
-				curr_visuparser = visu.psc.Parser.PscFile(filename)
-				curr_visuparser.parse_file()
+				if (filename, curr_ReInit) != curr_psc_key:
+					curr_visuparser = visu.psc.Parser.PscFile(filename)
+					curr_visuparser.parse_file()
+					curr_psc_key = (filename, curr_ReInit)
 
 				psc_elem_set_old = psc_elem_set
 				psc_elem_set = set()
 				for elem in curr_visuparser.get_elem_list_at_coordinate(mousePos[0], mousePos[1]):
-					psc_elem_set.add(elem._bmo_instance)
+					psc_elem_set.add(elem.get_property(u'bmo-instance').get_value())
 
 				if psc_elem_set == psc_elem_set_old:
 					# last cycle mouse was over same BMO ->print it one time
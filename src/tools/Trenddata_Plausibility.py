@@ -23,9 +23,6 @@ import ttk
 import datetime
 import collections
 import misc.timezone as timezone
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 import subprocess
 import threading
 import Queue
@@ -323,19 +320,24 @@ class MyGUI(Tkinter.Tk):
 					resolution_td = self._param_frame.get_resolution()
 					histData_interval = resolution_td.days * 3600 * 24 + resolution_td.seconds
 
-				histDataObj = dms.HistData(start=now_dt - self._param_frame.get_nof_rows() * self._param_frame.get_interval(),
-				                           end=now_dt,
-				                           format="detail",
-				                           interval=histData_interval
-				                           )
-				#logger.debug('MyGUI._cb_btn_grab_data(): histDataObj=' + repr(histDataObj))
-				resp = self._curr_DMS.dp_get(path=MyGUI.PATH,
-				                             histData=histDataObj,
-				                             showExtInfos=dms.INFO_ALL
-				                             )
-				one_resp = resp[0]
-				if one_resp.code == 'ok':
-					self._histData = one_resp.histData
+				# retrieving trenddata in smaller timeranges
+				# (a whole year in one response is too slow and too big on slow connections)
+				histData_list = []
+				one_resp = None
+				for one_resp in self._curr_DMS.dp_get_histData_chunks(path=MyGUI.PATH,
+				                                                       start=now_dt - self._param_frame.get_nof_rows() * self._param_frame.get_interval(),
+				                                                       end=now_dt,
+				                                                       format="detail",
+				                                                       interval=histData_interval,
+				                                                       showExtInfos=dms.INFO_ALL
+				                                                       ):
+					if one_resp.code != 'ok':
+						break
+					if one_resp.histData:
+						histData_list.extend(one_resp.histData)
+				logger.debug('MyGUI._cb_btn_grab_data(): got ' + str(len(histData_list)) + ' histData objects')
+				if one_resp and one_resp.code == 'ok':
+					self._histData = histData_list
 
 					# update GUI
 					self._choose_interpr_frame = ChooseInterpretation(parent=self, datatype=one_resp.type)
@@ -346,13 +348,18 @@ class MyGUI(Tkinter.Tk):
 					#self._btn_frame.grid(row=5, column=0, columnspan=2)
 
 					## short demonstration
+					#import matplotlib.pyplot as plt
 					#plt.figure()
 					#self._histData_ts.plot()
 					## help from https://stackoverflow.com/questions/16522380/matplotlib-plot-is-a-no-show
 					#plt.show()
 
 				else:
-					logger.error('MyGUI._cb_btn_grab_data(): ERROR: ' + one_resp.message)
+					if one_resp is None:
+						# e.g. empty timerange
+						logger.error('MyGUI._cb_btn_grab_data(): ERROR: no trenddata received')
+					else:
+						logger.error('MyGUI._cb_btn_grab_data(): ERROR: ' + one_resp.message)
 
 					# update GUI
 					self._choose_interpr_frame = None
@@ -371,6 +378,9 @@ class MyGUI(Tkinter.Tk):
 			nof_histData = len(histdata)
 			logger.debug('MyGUI._histData_as_timeseries(): number of histData objects: ' + str(nof_histData))
 
+			# pandas is slow to import and only needed here, so we don't import it at program start
+			import pandas as pd
+
 			# based on example from https://pandas-docs.github.io/pandas-docs-travis/timeseries.html
 			# (iteratively appending to a pandas Series is not recommended!)
 			#  read https://pandas.pydata.org/pandas-docs/stable/generated/pandas.Series.append.html
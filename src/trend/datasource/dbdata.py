@@ -21,7 +21,6 @@ import ctypes
 import struct
 import time
 import os
-import yaml
 import datetime
 import misc.timezone as timezone
 
@@ -58,6 +57,8 @@ def get_named_statusbits_class():
 	# using correct meaning of statusbits from configuration file (read it only once)
 	global statusbits_namelist
 	if not statusbits_namelist:
+		# PyYAML is only needed here, importing it on first usage
+		import yaml
 		with open(DBDATA_STATUSBITS_YAML, u'r') as ymlfile:
 			names_dict = yaml.load(ymlfile)
 
@@ -218,7 +219,7 @@ class HighLevelDBData(DBData):
 		DBData.__init__(self)
 
 	# timezone awareness (FIXME: currently fixed to 'Europe/Zurich')
-	_tz = timezone.Timezone().get_tz()
+	_tz = timezone.LazyTz()
 
 	# for better performance: hold a reference to Statusbit_Meaning in a class attribut
 	_statusbit_meaning = None
@@ -311,7 +312,7 @@ class HighLevelDBData2(DBData2):
 		DBData2.__init__(self)
 
 	# timezone awareness (FIXME: currently fixed to 'Europe/Zurich')
-	_tz = timezone.Timezone().get_tz()
+	_tz = timezone.LazyTz()
 
 	# for better performance: hold a reference to Statusbit_Meaning in a class attribut
 	_statusbit_meaning = None
@@ -57,7 +57,7 @@ class Variable(object):
 
 
 class Expression(object):
-	_tz = timezone.Timezone().get_tz()
+	_tz = timezone.LazyTz()
 
 	def __init__(self, variables_list):
 		self._variables_list = variables_list
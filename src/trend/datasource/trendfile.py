@@ -484,7 +484,7 @@ class MetaTrendfile(object):
 		self.trf_cache_handler = Trendfile_Cache_Handler()
 
 	# timezone awareness (FIXME: currently fixed to 'Europe/Zurich')
-	_tz = timezone.Timezone().get_tz()
+	_tz = timezone.LazyTz()
 
 
 	def _get_backup_dir(self):
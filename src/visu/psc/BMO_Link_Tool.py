@@ -19,6 +19,7 @@ You should have received a copy of the GNU General Public License along with thi
 
 
 import dms.dmswebsocket as dms
+import dms.dmsquery as dmsquery
 import logging
 import argparse
 import Tkinter, Tkconstants, ttk
@@ -26,16 +27,8 @@ from visu.psc import Parser
 import os
 import math
 import sqlite3
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 import datetime
 import collections
-import misc.timezone as timezone
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 
 import threading
 import queue
@@ -65,18 +58,92 @@ ch.setFormatter(formatter)
 logger.addHandler(ch)
 
 
-# sqlalchemy base class
-# (based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
-ORMBase = declarative_base()
-
-# sqlalchemy database engine
-# (based on documentation http://docs.sqlalchemy.org/en/latest/core/engines.html )
-engine = create_engine('sqlite://')
-
-# sqlalchemy database session
-# (based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
-Session = sessionmaker(bind=engine)
-
+# sqlalchemy mapping of BMO link database
+# =>not used yet (BMO_Linkcache works with sqlite3 directly), sqlalchemy gets imported only by init_orm()
+ORMBase = None
+engine = None
+Session = None
+Instances = None
+Plc_dps = None
+Links = None
+
+
+def init_orm():
+	global ORMBase, engine, Session, Instances, Plc_dps, Links
+	if ORMBase:
+		return
+	from sqlalchemy.ext.declarative import declarative_base
+	from sqlalchemy import Column, Integer, String, DateTime
+	from sqlalchemy.orm import sessionmaker
+	from sqlalchemy import create_engine
+
+	# sqlalchemy base class
+	# (based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
+	ORMBase = declarative_base()
+
+	# sqlalchemy database engine
+	# (based on documentation http://docs.sqlalchemy.org/en/latest/core/engines.html )
+	engine = create_engine('sqlite://')
+
+	# sqlalchemy database session
+	# (based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
+	Session = sessionmaker(bind=engine)
+
+	class Instances(ORMBase):
+		#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
+		__tablename__ = 'instances'
+
+		# states of BMO instances in DMS
+		BMO_STATE_VALID = 'VALID'
+		BMO_STATE_NO_REINIT = 'NO_REINIT'
+		BMO_STATE_MISSING = 'MISSING'
+		BMO_STATE_UNKNOWN = 'UNKNOWN'
+
+		id = Column(Integer, primary_key=True)
+		name = Column(String)
+		bmoclass = Column(String)
+		bmostate = Column(String)
+		timestamp = Column(DateTime)
+
+		def __repr__(self):
+			return "<Instance(name='%s', bmoclass='%s', bmostate='%s', timestamp='%s')>" % (self.name, self.bmoclass, self.bmostate, self.timestamp)
+
+	class Plc_dps(ORMBase):
+		#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
+		__tablename__ = 'plc_dps'
+
+		# tags of PLC DMS datapoint
+		# (assumption: either PAR_IN or PAR_OUT are set, not both together)
+		PLC_TAG_MISSING = 'MISSING'
+		PLC_TAG_NONE = 'NONE'
+		PLC_TAG_PAR_IN = 'PAR_IN'
+		PLC_TAG_PAR_OUT = 'PAR_OUT'
+
+		id = Column(Integer, primary_key=True)
+		dms_key = Column(String)
+		instance_id = Column(Integer)
+		datatype = Column(String)
+		tag = Column(String)
+
+		def __repr__(self):
+			return "<Plc_dps(dms_key='%s', instance_id='%s', datatype='%s', tag='%s')>" % (self.dms_key, self.instance_id, self.datatype, self.tag)
+
+	class Links(ORMBase):
+		#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
+		__tablename__ = 'links'
+
+		# link type between BMO instances
+		LINK_TYPE_INVALID = 'INVALID'
+		LINK_TYPE_ANALOG = 'ANALOG'
+		LINK_TYPE_DIGITAL = 'DIGITAL'
+
+		id = Column(Integer, primary_key=True)
+		src_plc_id = Column(Integer)
+		dst_plc_id = Column(Integer)
+		type = Column(String)
+
+		def __repr__(self):
+			return "<Plc_dps(src_plc_id ='%s', dst_plc_id ='%s', type='%s')>" % (self.src_plc_id , self.dst_plc_id , self.type)
 
 
 class Plc_dp(object):
@@ -90,64 +157,6 @@ class PAR_IN_dp(Plc_dp):
 		self._link_target = kwargs['link_target']
 
 
-class Instances(ORMBase):
-	#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
-	__tablename__ = 'instances'
-
-	# states of BMO instances in DMS
-	BMO_STATE_VALID = 'VALID'
-	BMO_STATE_NO_REINIT = 'NO_REINIT'
-	BMO_STATE_MISSING = 'MISSING'
-	BMO_STATE_UNKNOWN = 'UNKNOWN'
-
-	id = Column(Integer, primary_key=True)
-	name = Column(String)
-	bmoclass = Column(String)
-	bmostate = Column(String)
-	timestamp = Column(DateTime)
-
-	def __repr__(self):
-		return "<Instance(name='%s', bmoclass='%s', bmostate='%s', timestamp='%s')>" % (self.name, self.bmoclass, self.bmostate, self.timestamp)
-
-class Plc_dps(ORMBase):
-	#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
-	__tablename__ = 'plc_dps'
-
-	# tags of PLC DMS datapoint
-	# (assumption: either PAR_IN or PAR_OUT are set, not both together)
-	PLC_TAG_MISSING = 'MISSING'
-	PLC_TAG_NONE = 'NONE'
-	PLC_TAG_PAR_IN = 'PAR_IN'
-	PLC_TAG_PAR_OUT = 'PAR_OUT'
-
-	id = Column(Integer, primary_key=True)
-	dms_key = Column(String)
-	instance_id = Column(Integer)
-	datatype = Column(String)
-	tag = Column(String)
-
-	def __repr__(self):
-		return "<Plc_dps(dms_key='%s', instance_id='%s', datatype='%s', tag='%s')>" % (self.dms_key, self.instance_id, self.datatype, self.tag)
-
-class Links(ORMBase):
-	#(based on tutorial http://docs.sqlalchemy.org/en/latest/orm/tutorial.html )
-	__tablename__ = 'links'
-
-	# link type between BMO instances
-	LINK_TYPE_INVALID = 'INVALID'
-	LINK_TYPE_ANALOG = 'ANALOG'
-	LINK_TYPE_DIGITAL = 'DIGITAL'
-
-	id = Column(Integer, primary_key=True)
-	src_plc_id = Column(Integer)
-	dst_plc_id = Column(Integer)
-	type = Column(String)
-
-	def __repr__(self):
-		return "<Plc_dps(src_plc_id ='%s', dst_plc_id ='%s', type='%s')>" % (self.src_plc_id , self.dst_plc_id , self.type)
-
-
-
 class BMO_Linkcache(threading.Thread):
 	""" searches and keeps overview over links between BMO instances on current PSC file """
 	# idea: -storing all infos in RAM-based sqlite database
@@ -160,7 +169,8 @@ class BMO_Linkcache(threading.Thread):
 	# http://www.sqlite.org/compile.html#threadsafe
 	# http://www.sqlite.org/c3ref/c_config_covering_index_scan.html#sqliteconfigserialized
 
-
+	# sentinel in queue: exit background thread
+	_SHUTDOWN = object()
 
 	def __init__(self, dms_ws, found_bmo_queue):
 		self._dms_ws = dms_ws
@@ -199,25 +209,31 @@ class BMO_Linkcache(threading.Thread):
 
 
 	def run(self):
+		self._keep_running = True
 		while self._keep_running:
-			# look in queue if there are new BMO instances
-			try:
-				new_bmo, bmo_class = self._found_bmo_queue.get(block=False)
-			except queue.Empty:
-				pass
-				# FIXME: here we should check all tables:
-				# if state == BMO_STATE_UNKNOWN then collect all informations
-				# if BMO instance is no more in DMS then set it to BMO_STATE_MISSING and delete it's entries in the other tables
-				#   (currently we allow crowing of instances table with old values, we assume that this development tool is not running for longtime)
-				# =>we implement "freshness"-value (timestamp) in our table and always check the oldest one in current loop (this way it's possible to iterate over table while it's growing)
-			else:
-			# (this is an optional else clause when no exception occured)
+			# wait for new BMO instances in queue
+			# (blocking instead of polling, stop() wakes us up with a sentinel)
+			# FIXME: here we should check all tables:
+			# if state == BMO_STATE_UNKNOWN then collect all informations
+			# if BMO instance is no more in DMS then set it to BMO_STATE_MISSING and delete it's entries in the other tables
+			#   (currently we allow crowing of instances table with old values, we assume that this development tool is not running for longtime)
+			# =>we implement "freshness"-value (timestamp) in our table and always check the oldest one in current loop (this way it's possible to iterate over table while it's growing)
+			item = self._found_bmo_queue.get()
+			if item is BMO_Linkcache._SHUTDOWN:
+				break
+			new_bmo, bmo_class = item
 			# update our database with this new entry
 			# (BMO instance name is unique since we use it as index: http://www.sqlitetutorial.net/sqlite-replace-statement/ )
 			self._dbcon.execute("INSERT OR REPLACE INTO instances(name, class, state, timestamp) values (?, ?, ?, ?)",
 			                    (new_bmo, bmo_class, BMO_Linkcache.BMO_STATE_UNKNOWN, self._old_timestamp))
 
 
+	def stop(self):
+		""" wake up and exit background thread """
+		self._keep_running = False
+		self._found_bmo_queue.put(BMO_Linkcache._SHUTDOWN)
+
+
 
 
 
@@ -580,13 +596,12 @@ class PSC_Elements_Handler(object):
 			# links to and from this instance
 			link_list = []
 
-			for inst in self._bmo_instances:
-
-				# search PAR_INs and collect relevant links
-				for resp in dms_ws.dp_get(path=inst,
-				                          query=dms.Query(regExPath=r'.+:PAR_IN$',
-				                                          isType="string",
-				                                          maxDepth=2)):
+			# search PAR_INs of all instances and collect relevant links
+			# (filtering in DMS, all requests are sent without waiting for every response)
+			par_in_query = dmsquery.DMSQuery().regex_path(r'.+:PAR_IN$').is_type("string").max_depth(2)
+			cmd_kwargs_list = [{u'path': inst, u'query': par_in_query.as_query()} for inst in self._bmo_instances]
+			for resp_list in dms_ws.dp_get_pipelined(cmd_kwargs_list):
+				for resp in resp_list:
 					if resp.value:
 						for other_inst in self._bmo_instances:
 							if resp.path.startswith(bmo_inst_str) and other_inst in resp.value:
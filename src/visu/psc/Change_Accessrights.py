@@ -85,7 +85,7 @@ def main(argv=None):
 						my_print(u'\tignoring PSC element "' + curr_id + u'" (does not have initialisation)')
 			my_print(u'*' * 20 + u'\n\n')
 	# write changes to new file
-	#curr_file.write_file(filename2)
+	#curr_file.patch_file(filename2)
 
 
 
@@ -18,6 +18,7 @@ import sys
 import os
 
 import visu.psc.ParserVars
+import visu.psc.Pipeline
 
 DEBUGGING = False
 ENCODING_FILES_PSC = 'cp1252'
@@ -49,41 +50,28 @@ def my_print(line):
 	# http://stackoverflow.com/questions/3224268/python-unicode-encode-error
 	print(unicode_line.encode(ENCODING_STDOUT, errors='replace'))
 
-## FIXME: warum funktioniert untenstehender Code nicht?!?! ==>DEBUGGING!!! :-(
-
 def main(argv=None):
 	psc_directory = u'D:\Temp\ZH_Tièchestrasse'
 	output_directory = u'D:\Temp\ZH_Tièchestrasse_new'
 
-	for filename in os.listdir(psc_directory):
-		if filename.endswith(u'.psc'):
-			fullpath = os.path.join(psc_directory, filename)
-
-			my_print(u'Parsing filename "' + fullpath + '"')
-			curr_file = Parser.PscFile(fullpath)
-			curr_file.parse_file()
-
-			for elem in curr_file.get_psc_elem_list():
-				if elem.get_property(u'id') == u'Line':
-					# Warmwasser Rücklauf:
-					# blau -> rot
-
-					#DEBUGGING:
-					#my_print(u'color-fg=' + repr(elem.get_property(u'color-fg')))
-					#my_print(u'line-style=' + repr(elem.get_property(u'line-style')))
-
-					if repr(elem.get_property(u'color-fg')) == repr(visu.psc.ParserVars.PscVar_RGB(0x0000FF)):
-						my_print(u'.')
-						if repr(elem.get_property(u'line-style')) == repr(visu.psc.ParserVars.PscVar_line_style.DASHED):
-							my_print(u'..')
-							#and elem.get_property(u'bmo-library') == u'':
-							elem.set_property(u'color-fg', visu.psc.ParserVars.PscVar_RGB(0xFF0000))
-
-
-			output_fullpath = os.path.join(output_directory, filename)
-			# do write tests:
-			curr_file.write_file(output_fullpath)
-
+	# Warmwasser Rücklauf:
+	# blau gestrichelt -> rot
+	rule = (visu.psc.Pipeline.ElemSelector(elem_types=[u'Line'],
+	                                       props={u'color-fg': visu.psc.ParserVars.PscVar_RGB(0x0000FF),
+	                                              u'line-style': visu.psc.ParserVars.PscVar_line_style(visu.psc.ParserVars.PscVar_line_style.DASHED)}),
+	        visu.psc.Pipeline.SetProperties({u'color-fg': visu.psc.ParserVars.PscVar_RGB(0xFF0000)}))
+	pipeline = visu.psc.Pipeline.PscPipeline([rule])
+
+	# first run with dry_run=True shows changed lines as diff,
+	# an interrupted run continues with the help of the journal
+	# (only changed lines get replaced, rest of PSC file is copied)
+	stats = pipeline.run_directory(psc_directory,
+	                               output_dir=output_directory,
+	                               dry_run=DEBUGGING,
+	                               journal_filename=os.path.join(output_directory, u'Change_line_colors.journal'),
+	                               diff_func=my_print)
+	if stats.nof_errors or stats.paused:
+		return 1
 	return 0        # success
 
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+visu.psc.KeyIndex.py
+
+Copyright (C) 2018 Stefan Braun
+
+inverted index from DMS keys and BMO instances to PSC elements (file, element number, coordinates):
+-built from references extracted by visu.psc.ProjectScanner (persisted in it's index file)
+-when scanner rescans a PSC file, only references of this file get replaced
+-exact lookups are one dictionary access, prefix queries use bisection in sorted list of all keys
+
+example: which screens show datapoint "MSR01:H01:Uwp:ON" (directly or by it's BMO instance)?
+	scanner = ProjectScanner.PscProjectScanner(os.path.join(project_path, 'scr'))
+	scanner.update()
+	key_index = PscKeyIndex(scanner)
+	print(key_index.get_screens(u'MSR01:H01:Uwp:ON'))
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import bisect
+import collections
+import re
+
+
+# kinds of references (as stored by visu.psc.ProjectScanner)
+KIND_BMO = u'bmo'
+KIND_DMS = u'dms'
+
+# one reference to a PSC element
+# =>"elem_no": position in PSC file starting with 1 (0 is window definition), "coords": tuple (x1, y1, x2, y2) or None
+PscElemRef = collections.namedtuple('PscElemRef', ['key', 'kind', 'fullpath', 'elem_no', 'elem_type', 'coords'])
+
+
+class PscKeyIndex(object):
+	""" DMS keys and BMO instances -> PSC elements, kept up to date by PscProjectScanner """
+
+	def __init__(self, scanner):
+		self._scanner = scanner
+
+		# key: DMS key or BMO instance, value: list of tuples (relative path, kind, element number, element type, coordinates)
+		self._refs_dict = {}
+		# key: relative path of PSC file, value: set of it's keys
+		self._file_keys_dict = {}
+
+		for relpath, entry in scanner.iter_entries():
+			self._add_file(relpath, entry)
+		# all keys sorted (for prefix queries), built once instead of inserting every key
+		self._sorted_keys_list = sorted(self._refs_dict)
+
+		scanner.add_change_listener(self._on_file_changed)
+
+
+	def close(self):
+		self._scanner.remove_change_listener(self._on_file_changed)
+
+
+	def _add_file(self, relpath, entry, keep_sorted=False):
+		keys_set = set()
+		for key, kind, elem_no, elem_type, coords in entry.get(u'refs', ()):
+			if coords is not None:
+				coords = tuple(coords)
+			if not key in self._refs_dict:
+				self._refs_dict[key] = []
+				if keep_sorted:
+					bisect.insort(self._sorted_keys_list, key)
+			self._refs_dict[key].append((relpath, kind, elem_no, elem_type, coords))
+			keys_set.add(key)
+		self._file_keys_dict[relpath] = keys_set
+
+
+	def _remove_file(self, relpath):
+		for key in self._file_keys_dict.pop(relpath, ()):
+			refs_list = [ref for ref in self._refs_dict[key] if ref[0] != relpath]
+			if refs_list:
+				self._refs_dict[key] = refs_list
+			else:
+				del self._refs_dict[key]
+				idx = bisect.bisect_left(self._sorted_keys_list, key)
+				del self._sorted_keys_list[idx]
+
+
+	def _on_file_changed(self, relpath, entry):
+		# callback of PscProjectScanner: replacing references of only this file
+		self._remove_file(relpath)
+		if entry:
+			self._add_file(relpath, entry, keep_sorted=True)
+
+
+	def update(self):
+		""" rescan changed PSC files of project (returns number of scanned files) """
+		return self._scanner.update()
+
+
+	def update_file(self, fullpath):
+		self._scanner.update_file(fullpath)
+
+
+	def _get_refs(self, key, kind=None):
+		refs_list = []
+		for relpath, curr_kind, elem_no, elem_type, coords in self._refs_dict.get(key, ()):
+			if kind is None or kind == curr_kind:
+				refs_list.append(PscElemRef(key, curr_kind, self._scanner.get_fullpath(relpath), elem_no, elem_type, coords))
+		return refs_list
+
+
+	def __contains__(self, key):
+		return key in self._refs_dict
+
+
+	def get_keys(self, kind=None):
+		""" sorted list of all DMS keys and BMO instances (optionally only of one kind) """
+		if kind is None:
+			return list(self._sorted_keys_list)
+		return [key for key in self._sorted_keys_list if any(ref[1] == kind for ref in self._refs_dict[key])]
+
+
+	def find(self, key, kind=None):
+		""" list of PscElemRef tuples of exactly this DMS key or BMO instance """
+		return self._get_refs(key, kind)
+
+
+	def find_prefix(self, prefix, kind=None):
+		""" list of PscElemRef tuples of this DMS node and all DMS keys below """
+		refs_list = []
+		idx = bisect.bisect_left(self._sorted_keys_list, prefix)
+		while idx < len(self._sorted_keys_list):
+			key = self._sorted_keys_list[idx]
+			if not key.startswith(prefix):
+				break
+			# "MSR01:H01" shouldn't match "MSR01:H010"
+			if len(key) == len(prefix) or key[len(prefix)] == u':' or prefix.endswith(u':'):
+				refs_list.extend(self._get_refs(key, kind))
+			idx += 1
+		return refs_list
+
+
+	def find_regex(self, pattern, kind=None):
+		""" list of PscElemRef tuples of all keys matching this regex pattern """
+		regex = re.compile(pattern)
+		refs_list = []
+		for key in self._sorted_keys_list:
+			if regex.search(key):
+				refs_list.extend(self._get_refs(key, kind))
+		return refs_list
+
+
+	def find_containers(self, dms_key, kind=None):
+		"""
+		list of PscElemRef tuples of this DMS key and all it's parent nodes
+		(e.g. element with BMO instance "MSR01:H01:Uwp" shows datapoint "MSR01:H01:Uwp:ON")
+		"""
+		refs_list = []
+		parts = dms_key.split(u':')
+		for x in xrange(len(parts), 0, -1):
+			refs_list.extend(self._get_refs(u':'.join(parts[:x]), kind))
+		return refs_list
+
+
+	def get_files(self, key, kind=None):
+		""" sorted list of PSC files containing exactly this DMS key or BMO instance """
+		relpaths_set = set(ref[0] for ref in self._refs_dict.get(key, ()) if kind is None or ref[1] == kind)
+		return sorted(self._scanner.get_fullpath(relpath) for relpath in relpaths_set)
+
+
+	def get_screens(self, dms_key):
+		""" sorted list of PSC files showing this datapoint (directly or by one of it's parent nodes, e.g. BMO instance) """
+		relpaths_set = set()
+		parts = dms_key.split(u':')
+		for x in xrange(len(parts), 0, -1):
+			for ref in self._refs_dict.get(u':'.join(parts[:x]), ()):
+				relpaths_set.add(ref[0])
+		return sorted(self._scanner.get_fullpath(relpath) for relpath in relpaths_set)
@@ -12,12 +12,17 @@ This program is distributed in the hope that it will be useful, but WITHOUT ANY
 You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import bisect
 import codecs
 import collections
+import os
 import random
+import shutil
 import sys
+import tempfile
 
 import ParserConfig
+import SpatialIndex
 from visu.psc.ParserVars import *
 
 DEBUGGING = False
@@ -28,6 +33,9 @@ ENCODING_FILENAMES = sys.getfilesystemencoding()
 
 PARSERCONFIGFILE = u'config.yml'
 
+# blocksize for copying unchanged parts of PSC files
+COPY_BLOCKSIZE = 1024 * 1024
+
 def get_encoding():
 	global ENCODING_STDOUT
 	# following code doesn't work in IDE
@@ -69,37 +77,29 @@ class PscFile(object):
 		self._filename = filename
 		self._visu_elems = []
 		self._psc_window = None
+		# built on first coordinate query
+		self._spatial_index = None
+		# tuple (size, modification time) of parsed file, None when byte offsets of lines aren't valid
+		self._file_stat = None
 
 
 	def parse_file(self):
 		"""
 		Separation line-by-line into graphic objects "PSC window" and every "PSC element",
 		handing all sourcecode lines to the fresh created objects
+		=>byte offsets of all lines are kept for patch_file()
 		"""
-		# reading textfile: example from
-		# https://docs.python.org/2/tutorial/inputoutput.html#methods-of-file-objects
-		# http://stackoverflow.com/questions/8009882/how-to-read-large-file-line-by-line-in-python
-		# http://stackoverflow.com/questions/3277503/python-read-file-line-by-line-into-array
-		with codecs.open(self._filename, encoding=ENCODING_FILES_PSC, mode=u'r') as f:
-			curr_elem = collections.OrderedDict()
-			curr_window = collections.OrderedDict()
-			for line in f:
-				curr_line = line.rstrip(u'\n\r')
-				property_str = curr_line.split(u';')[0]
-				if property_str in PscWindow.LINE_PREFIXES:
-					# found window definition
-					curr_window[property_str] = curr_line
-				else:
-					if property_str == u'ID' and len(curr_elem) != 0:
-						# this is begin of new graph element =>process last element, prepare for next element
-						self._add_graph_elem(curr_elem)
-						curr_elem = collections.OrderedDict()
-					curr_elem[property_str] = curr_line
-
-			# process last element and window properties
-			if curr_elem:
-				self._add_graph_elem(curr_elem)
-			self._psc_window = PscWindow(curr_window)
+		self._visu_elems = []
+		self._spatial_index = None
+		stat = os.stat(self._filename)
+		for is_window, lines_dict, spans_dict in iter_psc_raw_elems(self._filename):
+			if is_window:
+				self._psc_window = PscWindow(lines_dict)
+				self._psc_window.set_byte_spans(spans_dict)
+			else:
+				self._add_graph_elem(lines_dict).set_byte_spans(spans_dict)
+		# patch_file() needs the file as it was parsed
+		self._file_stat = (stat.st_size, stat.st_mtime)
 
 
 	def _add_graph_elem(self, lines_dict):
@@ -111,20 +111,47 @@ class PscFile(object):
 			my_print(u'Parsed PSC element "' + curr_ID + u'"')
 		new_elem = OBJ_DICT[curr_ID](lines_dict)
 		self._visu_elems.append(new_elem)
+		return new_elem
 
 	def get_psc_elem_list(self):
 		return self._visu_elems
 
+	def get_spatial_index(self):
+		"""
+		spatial index over selection areas of all PSC elements (built once, updated on changes of elements)
+		"""
+		if self._spatial_index is None:
+			self._spatial_index = SpatialIndex.PscSpatialIndex(self._visu_elems)
+			for elem in self._visu_elems:
+				elem.add_change_listener(self._on_elem_changed)
+		return self._spatial_index
+
+	def _on_elem_changed(self, elem, linemarks_set):
+		# selection area could be moved
+		if self._spatial_index is not None:
+			self._spatial_index.update(elem)
+
 	def get_elem_list_at_coordinate(self, pos_x, pos_y):
-		curr_list = []
-		for elem in self._visu_elems:
-			if elem.is_obj_at_coordinate(pos_x, pos_y):
-				curr_list.append(elem)
-		return curr_list
+		return self.get_spatial_index().query_point(pos_x, pos_y)
+
+	def get_elem_list_in_rectangle(self, x1, y1, x2, y2):
+		return self.get_spatial_index().query_rectangle(x1, y1, x2, y2)
+
+	def get_nearest_elem(self, pos_x, pos_y, max_distance=None):
+		return self.get_spatial_index().query_nearest(pos_x, pos_y, max_distance=max_distance)
 
 	def get_psc_window(self):
 		return self._psc_window
 
+	def is_dirty(self):
+		# any properties changed since loading or last write of this file?
+		if self._psc_window and self._psc_window.is_dirty():
+			return True
+		for elem in self._visu_elems:
+			if elem.is_dirty():
+				return True
+		return False
+
 	def write_file(self, filename=None):
 		"""
 		write PSC file. When no filename is given then it will overwrite current file.
@@ -144,6 +171,151 @@ class PscFile(object):
 				for line in elem.get_raw_lines():
 					f.write(line + u'\r\n')
 
+		if filename_str == self._filename:
+			# file on disk contains all changes
+			self._psc_window.clear_dirty()
+			for elem in self._visu_elems:
+				elem.clear_dirty()
+			# lines were written in another order and with other line endings
+			self._file_stat = None
+
+
+	def patch_file(self, filename=None):
+		"""
+		write PSC file by replacing only changed lines of the parsed file, everything else is copied in bulk.
+		When no filename is given then it will overwrite current file.
+		=>result goes into a temporary file first, then it replaces the target file (atomic on POSIX, on Windows old file gets removed first)
+		=>falls back to write_file() when draw order of elements was changed or file was already overwritten by write_file()
+		returns number of replaced lines
+		"""
+		if filename == None:
+			filename_str = self._filename
+		else:
+			filename_str = filename
+		is_own_file = os.path.abspath(filename_str) == os.path.abspath(self._filename)
+
+		draw_order_list = [elem.get_property(u'draw-order') for elem in self._visu_elems]
+		if self._file_stat is None or draw_order_list != sorted(draw_order_list):
+			self.write_file(filename_str)
+			return None
+
+		if is_own_file and not self.is_dirty():
+			return 0
+
+		stat = os.stat(self._filename)
+		if (stat.st_size, stat.st_mtime) != self._file_stat:
+			raise IOError(u'PSC file "' + self._filename + u'" was changed since parsing!')
+
+		# list of tuples (start offset, end offset, PSC object, linemark) sorted by position in file
+		patches_list = []
+		for psc_obj in [self._psc_window] + self._visu_elems:
+			for linemark in psc_obj.get_dirty_linemarks():
+				start, end = psc_obj.get_byte_spans()[linemark]
+				patches_list.append((start, end, psc_obj, linemark))
+		patches_list.sort(key=lambda patch: patch[0])
+
+		# temporary file in same directory: renaming doesn't cross filesystems
+		target_dir = os.path.dirname(os.path.abspath(filename_str))
+		fd, tmp_filename = tempfile.mkstemp(dir=target_dir, prefix=os.path.basename(filename_str) + u'.', suffix=u'.tmp')
+		# list of tuples (end offset in old file, difference of length)
+		deltas_list = []
+		try:
+			with open(self._filename, 'rb') as src:
+				with os.fdopen(fd, 'wb') as dst:
+					pos = 0
+					for start, end, psc_obj, linemark in patches_list:
+						_copy_bytes(src, dst, start - pos)
+						old_line = src.read(end - start)
+						# keeping original line ending
+						line_ending = old_line[len(old_line.rstrip(b'\r\n')):]
+						new_line = psc_obj.get_raw_line(linemark).encode(ENCODING_FILES_PSC) + line_ending
+						dst.write(new_line)
+						deltas_list.append((end, len(new_line) - len(old_line)))
+						pos = end
+					shutil.copyfileobj(src, dst, COPY_BLOCKSIZE)
+			shutil.copymode(self._filename, tmp_filename)
+			if os.name == 'nt' and os.path.exists(filename_str):
+				# os.rename() on Windows doesn't overwrite existing file
+				os.remove(filename_str)
+			os.rename(tmp_filename, filename_str)
+		except:
+			if os.path.exists(tmp_filename):
+				os.remove(tmp_filename)
+			raise
+
+		if is_own_file:
+			# file on disk contains all changes, byte offsets behind changed lines have moved
+			ends_list = []
+			sums_list = []
+			curr_sum = 0
+			for end, delta in deltas_list:
+				curr_sum += delta
+				ends_list.append(end)
+				sums_list.append(curr_sum)
+			def shift_func(offset):
+				idx = bisect.bisect_right(ends_list, offset)
+				if idx:
+					return offset + sums_list[idx - 1]
+				return offset
+			for psc_obj in [self._psc_window] + self._visu_elems:
+				if deltas_list:
+					psc_obj.shift_byte_spans(shift_func)
+				psc_obj.clear_dirty()
+			stat = os.stat(self._filename)
+			self._file_stat = (stat.st_size, stat.st_mtime)
+		return len(patches_list)
+
+
+def _copy_bytes(src, dst, nof_bytes):
+	while nof_bytes > 0:
+		chunk = src.read(min(nof_bytes, COPY_BLOCKSIZE))
+		if not chunk:
+			raise IOError(u'unexpected end of PSC file!')
+		dst.write(chunk)
+		nof_bytes -= len(chunk)
+
+
+def iter_psc_raw_elems(filename):
+	"""
+	generator: PSC file split into it's objects, tuples (is_window, lines_dict, spans_dict)
+	=>lines_dict: key: linemark, value: line as unicode string without line ending
+	=>spans_dict: key: linemark, value: tuple (byte offset of line, byte offset of next line)
+	=>lines of window definition are collected in the whole file, window comes as last item
+	"""
+	# reading textfile: example from
+	# https://docs.python.org/2/tutorial/inputoutput.html#methods-of-file-objects
+	# http://stackoverflow.com/questions/8009882/how-to-read-large-file-line-by-line-in-python
+	# http://stackoverflow.com/questions/3277503/python-read-file-line-by-line-into-array
+	# =>binary mode: length of raw line is it's size in file
+	with open(filename, 'rb') as f:
+		curr_elem = collections.OrderedDict()
+		curr_elem_spans = {}
+		curr_window = collections.OrderedDict()
+		curr_window_spans = {}
+		offset = 0
+		for raw_line in f:
+			next_offset = offset + len(raw_line)
+			curr_line = raw_line.decode(ENCODING_FILES_PSC).rstrip(u'\n\r')
+			property_str = curr_line.split(u';')[0]
+			if property_str in PscWindow.LINE_PREFIXES:
+				# found window definition
+				curr_window[property_str] = curr_line
+				curr_window_spans[property_str] = (offset, next_offset)
+			else:
+				if property_str == u'ID' and len(curr_elem) != 0:
+					# this is begin of new graph element =>process last element, prepare for next element
+					yield False, curr_elem, curr_elem_spans
+					curr_elem = collections.OrderedDict()
+					curr_elem_spans = {}
+				curr_elem[property_str] = curr_line
+				curr_elem_spans[property_str] = (offset, next_offset)
+			offset = next_offset
+
+		# process last element and window properties
+		if curr_elem:
+			yield False, curr_elem, curr_elem_spans
+		yield True, curr_window, curr_window_spans
+
 
 class PscCommon(object):
 	"""
@@ -156,6 +328,19 @@ class PscCommon(object):
 		# metadata properties which aren't stored or read in PSC files
 		self._metadata_dict = {}
 
+		# decoded properties, filled on first get_property() of a property
+		# =>key: property name (links of Multipos_mapping are dereferenced), value: PscVar_* object
+		self._props_cache_dict = {}
+
+		# linemarks of raw lines changed by set_property() since loading or last write of PSC file
+		self._dirty_linemarks_set = set()
+
+		# functions called with arguments (element, set of changed linemarks) after set_property() changed raw lines
+		self._change_listeners_list = []
+
+		# byte offsets of raw lines in parsed PSC file (see PscFile.patch_file())
+		self._spans_dict = {}
+
 		# initialization of parser
 		# FIXME: how to implement this a better way? Importing at runtime against import loops...
 		if not PscParser.cfg:
@@ -173,7 +358,8 @@ class PscCommon(object):
 		if DEBUGGING:
 			my_print(u'Preparing parsing of PSC element "' + self.psc_elem_str + u'"')
 		VER = u'v15'
-		self._properties_mapping_dict = PscParser.cfg.get_property_mapping_dict(self.psc_elem_str, version_str=VER)
+		# all elements of same type share the same mapping objects (compiled only once by ParserConfig)
+		self._properties_mapping_dict = PscParser.cfg.get_compiled_mapping_dict(self.psc_elem_str, version_str=VER)
 		if DEBUGGING:
 			my_print(u'->it has to contain ' + unicode(len(self._properties_mapping_dict)) + u' properties...')
 
@@ -185,6 +371,39 @@ class PscCommon(object):
 		return my_list
 
 
+	def get_raw_line(self, linemark):
+		return self._lines_dict[linemark]
+
+
+	def get_linemarks(self):
+		return self._lines_dict.keys()
+
+
+	def set_byte_spans(self, spans_dict):
+		# key: linemark, value: tuple (byte offset of line, byte offset of next line) in parsed PSC file
+		self._spans_dict = spans_dict
+
+
+	def get_byte_spans(self):
+		return self._spans_dict
+
+
+	def get_byte_span(self):
+		"""
+		tuple (first byte, byte after last line) of this object in parsed PSC file, None when unknown
+		(lines of window definition could be spread over the whole file)
+		"""
+		if not self._spans_dict:
+			return None
+		return min(span[0] for span in self._spans_dict.values()), max(span[1] for span in self._spans_dict.values())
+
+
+	def shift_byte_spans(self, shift_func):
+		# update byte offsets after patching of lines ("shift_func" returns new offset of given old offset)
+		for linemark, (start, end) in self._spans_dict.items():
+			self._spans_dict[linemark] = (shift_func(start), shift_func(end))
+
+
 	def get_property(self, prop_str):
 		"""
 		Retrieve PSC graphic element property ("prop_str" is a dictionary key =>case-sensitive!)
@@ -215,6 +434,13 @@ class PscCommon(object):
 					my_print(u'\ttype(curr_mapping_obj)=' + repr(type(curr_mapping_obj)))
 				prop_str = curr_prop_original_str
 
+			# already decoded?
+			# =>caller gets the cached object, changes on it have to be stored with set_property()!
+			try:
+				return self._props_cache_dict[prop_str]
+			except KeyError:
+				pass
+
 			# extract wanted values from raw PSC line
 			try:
 				curr_raw_line = self._lines_dict[curr_mapping_obj.linemark]
@@ -226,6 +452,7 @@ class PscCommon(object):
 			my_prop = curr_mapping_obj.get_property_obj(curr_raw_line)
 			if DEBUGGING:
 				my_print(u'\tmy_prop=' + repr(my_prop) + u' , type(my_prop)=' + repr(type(my_prop)))
+			self._props_cache_dict[prop_str] = my_prop
 		return my_prop
 
 
@@ -258,6 +485,7 @@ class PscCommon(object):
 						# this property has multiple storage locations... write changes to all locations
 						# =>dereference all link
 						curr_mapping_obj_list = []
+						curr_prop_list = []
 						for curr_prop in mapping_obj.get_prop_strings():
 							if DEBUGGING:
 								my_print(u'set_property() follows link to property "' + curr_prop + '"')
@@ -266,11 +494,14 @@ class PscCommon(object):
 							if DEBUGGING:
 								my_print(u'\ttype(curr_mapping_obj)=' + repr(type(curr_mapping_obj)))
 							curr_mapping_obj_list.append(curr_mapping_obj)
+							curr_prop_list.append(curr_prop)
 					else:
 						curr_mapping_obj_list = [mapping_obj]
+						curr_prop_list = [prop_str]
 
 					# serialize property into all storage locations
-					for curr_mapping_obj in curr_mapping_obj_list:
+					changed_linemarks_set = set()
+					for curr_prop, curr_mapping_obj in zip(curr_prop_list, curr_mapping_obj_list):
 						curr_raw_line = self._lines_dict[curr_mapping_obj.linemark]
 						if DEBUGGING:
 							my_print(u'\tcurr_raw_line=' + repr(curr_raw_line))
@@ -281,6 +512,10 @@ class PscCommon(object):
 						# set wanted value in raw PSC line
 						new_raw_line = curr_mapping_obj.update_value(curr_raw_line, new_val)
 						self._lines_dict[curr_mapping_obj.linemark] = new_raw_line
+						if new_raw_line != curr_raw_line:
+							changed_linemarks_set.add(curr_mapping_obj.linemark)
+							# other properties stored in same raw line have to be decoded again
+							self._invalidate_linemark(curr_mapping_obj.linemark)
 						if DEBUGGING:
 							my_print(u'\tnew_raw_line=' + repr(new_raw_line))
 
@@ -291,7 +526,44 @@ class PscCommon(object):
 						# FIXME: a cleaner way to really compare two objects would be overriding further internal methods:
 						# http://stackoverflow.com/questions/390250/elegant-ways-to-support-equivalence-equality-in-python-classes
 						assert repr(new_val) == repr(my_prop), u'ERROR: storing and reloading property failed! new_val=' + repr(new_val) + u', my_prop=' + repr(my_prop)
+						self._props_cache_dict[curr_prop] = my_prop
+
+					if changed_linemarks_set:
+						self._dirty_linemarks_set.update(changed_linemarks_set)
+						for func in self._change_listeners_list:
+							func(self, changed_linemarks_set)
+
+
+	def _invalidate_linemark(self, linemark):
+		# drop cached properties decoded from this raw line
+		for prop_str in self._props_cache_dict.keys():
+			if self._properties_mapping_dict[prop_str].linemark == linemark:
+				del self._props_cache_dict[prop_str]
+
+
+	def is_dirty(self):
+		"""
+		True when set_property() has changed raw lines since loading or last write of PSC file
+		"""
+		return bool(self._dirty_linemarks_set)
+
+
+	def get_dirty_linemarks(self):
+		return set(self._dirty_linemarks_set)
+
+
+	def clear_dirty(self):
+		self._dirty_linemarks_set.clear()
+
+
+	def add_change_listener(self, func):
+		if not func in self._change_listeners_list:
+			self._change_listeners_list.append(func)
+
 
+	def remove_change_listener(self, func):
+		if func in self._change_listeners_list:
+			self._change_listeners_list.remove(func)
 
 
 	def get_properties_list(self):
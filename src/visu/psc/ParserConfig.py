@@ -12,7 +12,9 @@ This program is distributed in the hope that it will be useful, but WITHOUT ANY
 You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import yaml
+import cPickle
+import hashlib
+import tempfile
 import sys
 import re
 import os
@@ -66,6 +68,10 @@ LIT_WINDOW =        'WINDOW'
 LIT_MULTIPOS =      'MULTIPOS'
 LIT_REFERENCE =     '_reference'
 
+# compiled copy of YAML configuration file (pickled tuple (MD5 of YAML file, configuration dictionary))
+# =>PyYAML's pure-Python loader is slow, YAML gets parsed again only after changes in configuration file
+CONFIG_CACHE_SUFFIX = u'.cache'
+
 
 def write_raw_configfile(fname):
 	my_config = {LIT_WINDOW: {LIT_VERSION15: {'WPL': '',
@@ -84,6 +90,7 @@ def write_raw_configfile(fname):
 	                                 }
 	                        },
 	            }
+	import yaml
 	with open(fname, u'w') as ymlfile:
 		yaml.dump(my_config, ymlfile, default_flow_style=False)
 
@@ -101,11 +108,58 @@ class ParserConfig(object):
 		# https://stackoverflow.com/questions/10174211/make-an-always-relative-to-current-module-file-path
 		self._filename = os.path.join(os.path.dirname(__file__), fname)
 		self._config_dict = None
+		# registry of compiled mappings (key: tuple (PSC graph element, version), value: dictionary of mapping objects)
+		# =>every PSC element of same type shares the same mapping objects, they are built only once
+		self._compiled_dict = {}
 		self._load_config()
 
 	def _load_config(self):
-		with open(self._filename, u'r') as ymlfile:
-			self._config_dict = yaml.load(ymlfile)
+		with open(self._filename, u'rb') as ymlfile:
+			yaml_str = ymlfile.read()
+		yaml_hash = hashlib.md5(yaml_str).hexdigest()
+		cache_filename = self._filename + CONFIG_CACHE_SUFFIX
+
+		self._config_dict = self._read_cache(cache_filename, yaml_hash)
+		if self._config_dict is None:
+			# PyYAML is slow to import, with valid cache we don't need it
+			import yaml
+			self._config_dict = yaml.load(yaml_str)
+			self._write_cache(cache_filename, yaml_hash)
+		self._compiled_dict = {}
+
+
+	def _read_cache(self, cache_filename, yaml_hash):
+		# returns configuration dictionary, or None when cache is missing or outdated
+		try:
+			with open(cache_filename, u'rb') as f:
+				cached_hash, config_dict = cPickle.load(f)
+		except Exception:
+			# no cache yet, or unreadable (e.g. written by other Python version)
+			return None
+		if cached_hash != yaml_hash:
+			return None
+		if DEBUGGING:
+			my_print(u'ParserConfig is using cache file "' + cache_filename + '"')
+		return config_dict
+
+
+	def _write_cache(self, cache_filename, yaml_hash):
+		# writing into temporary file and renaming: another process never reads a half written cache
+		try:
+			fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(cache_filename), suffix=u'.tmp')
+		except (IOError, OSError):
+			# e.g. installation directory is read-only =>YAML file gets parsed every time
+			return
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				cPickle.dump((yaml_hash, self._config_dict), f, cPickle.HIGHEST_PROTOCOL)
+			# os.rename() on Windows doesn't overwrite existing file
+			if os.name == 'nt' and os.path.exists(cache_filename):
+				os.remove(cache_filename)
+			os.rename(tmp_filename, cache_filename)
+		except (IOError, OSError):
+			if os.path.exists(tmp_filename):
+				os.remove(tmp_filename)
 
 
 	def get_available_versions(self, psc_graph_elem_str):
@@ -124,49 +178,71 @@ class ParserConfig(object):
 		(e.g. Parser could ask for all "Line" properties)
 		=>when called with a specific property then list will contain only this mapping object
 		"""
+		compiled_dict = self.get_compiled_mapping_dict(psc_graph_elem_str, version_str=version_str)
+		if property_str == u'':
+			return dict(compiled_dict)
+		mapping_dict = {}
+		if property_str in compiled_dict:
+			mapping_dict[property_str] = compiled_dict[property_str]
+		return mapping_dict
+
+
+	def get_compiled_mapping_dict(self, psc_graph_elem_str, version_str=LIT_VERSION15):
+		"""
+		returns the shared dictionary of mapping objects for PSC graphics element
+		=>built only on first call, after that it's a dictionary lookup
+		=>caller must not change this dictionary or it's mapping objects!
+		"""
+		key = (psc_graph_elem_str, version_str)
+		try:
+			return self._compiled_dict[key]
+		except KeyError:
+			mapping_dict = self._compile_mapping_dict(psc_graph_elem_str, version_str)
+			self._compiled_dict[key] = mapping_dict
+			return mapping_dict
+
+
+	def _compile_mapping_dict(self, psc_graph_elem_str, version_str):
 		try:
 			mapping_dict = {}
 			graph_elem_dict = self._config_dict[psc_graph_elem_str][version_str]
 			for prop in graph_elem_dict:
-				if property_str == u'' or prop == property_str:
-					# include all or only the one property into mapping_list
-
-					# assumption: every property has a LINEMARK
-					linemark = graph_elem_dict[prop][LIT_LINEMARK]
-
-					# assumption: every property has an OBJECT
-					property_obj = graph_elem_dict[prop][LIT_OBJ]
-
-					# fill the right mapping object, it has to know how to access the properties
-					map_obj = None
-					if linemark == LIT_MULTIPOS:
-						# this property is stored under multiple positions
-						if LIT_REFERENCE in graph_elem_dict[prop]:
-							map_obj = Multipos_mapping(graph_elem_dict[prop][LIT_REFERENCE])
-					else:
-						# this property is stored at one position
-						if LIT_REGEXPATTERN in graph_elem_dict[prop]:
-							map_obj = Mapping_regex(regex_pattern_str = graph_elem_dict[prop][LIT_REGEXPATTERN],
-							                        linemark_str = linemark,
-						                            property_obj_str = property_obj
-						                            )
-						elif LIT_SPLIT in graph_elem_dict[prop]:
-							map_obj = Mapping_split(split_arg = graph_elem_dict[prop][LIT_SPLIT],
-									                        linemark_str = linemark,
-									                        property_obj_str = property_obj
-									                        )
-						elif LIT_SPLIT_LISTOBJECT in graph_elem_dict[prop]:
-							map_obj = Mapping_split_listobject(split_arg = graph_elem_dict[prop][LIT_SPLIT_LISTOBJECT],
-									                        linemark_str = linemark,
-									                        property_obj_str = property_obj
-									                        )
-						elif LIT_SPLIT_BIT in graph_elem_dict[prop]:
-							map_obj = Mapping_split_bit(split_bit_arg = graph_elem_dict[prop][LIT_SPLIT_BIT],
+				# assumption: every property has a LINEMARK
+				linemark = graph_elem_dict[prop][LIT_LINEMARK]
+
+				# assumption: every property has an OBJECT
+				property_obj = graph_elem_dict[prop][LIT_OBJ]
+
+				# fill the right mapping object, it has to know how to access the properties
+				map_obj = None
+				if linemark == LIT_MULTIPOS:
+					# this property is stored under multiple positions
+					if LIT_REFERENCE in graph_elem_dict[prop]:
+						map_obj = Multipos_mapping(graph_elem_dict[prop][LIT_REFERENCE])
+				else:
+					# this property is stored at one position
+					if LIT_REGEXPATTERN in graph_elem_dict[prop]:
+						map_obj = Mapping_regex(regex_pattern_str = graph_elem_dict[prop][LIT_REGEXPATTERN],
+						                        linemark_str = linemark,
+					                            property_obj_str = property_obj
+					                            )
+					elif LIT_SPLIT in graph_elem_dict[prop]:
+						map_obj = Mapping_split(split_arg = graph_elem_dict[prop][LIT_SPLIT],
+								                        linemark_str = linemark,
+								                        property_obj_str = property_obj
+								                        )
+					elif LIT_SPLIT_LISTOBJECT in graph_elem_dict[prop]:
+						map_obj = Mapping_split_listobject(split_arg = graph_elem_dict[prop][LIT_SPLIT_LISTOBJECT],
 								                        linemark_str = linemark,
 								                        property_obj_str = property_obj
 								                        )
-					if map_obj:
-						mapping_dict[prop]=map_obj
+					elif LIT_SPLIT_BIT in graph_elem_dict[prop]:
+						map_obj = Mapping_split_bit(split_bit_arg = graph_elem_dict[prop][LIT_SPLIT_BIT],
+							                        linemark_str = linemark,
+							                        property_obj_str = property_obj
+							                        )
+				if map_obj:
+					mapping_dict[prop]=map_obj
 			return mapping_dict
 		except Exception as ex:
 			# FIXME: provide verbose error message for better debugging!!!
@@ -215,6 +291,13 @@ class Mapping(object):
 		self.regex_pattern = unicode(regex_pattern_str, encoding=ENCODING_FILES_PSC)
 		self._property_obj_str = unicode(property_obj_str, encoding=ENCODING_FILES_PSC)
 		self.property_obj = None
+		# class of property object is looked up only once (None: error in configuration file)
+		self._property_cls = Mapping.obj_dict.get(self._property_obj_str, None)
+
+
+	def get_property_obj_str(self):
+		# name of property object in configuration file (e.g. "RGB")
+		return self._property_obj_str
 
 
 	def get_property_obj(self, line_str):
@@ -229,20 +312,18 @@ class Mapping(object):
 		if DEBUGGING:
 			my_print(u'Mapping.get_property_obj(): argument=' + repr(argument) + u' , self._property_obj_str=' + self._property_obj_str)
 
-		try:
-			prop_obj = Mapping.obj_dict[self._property_obj_str]
-
-			# special treatment of rectangle..
-			if self._property_obj_str == u'rectangle':
-				# assumption: caller gives a list of strings
-				constructor_list = map(int, argument)
-				return prop_obj(*constructor_list)
-			else:
-				return prop_obj(argument)
-
-		except KeyError as ex:
+		prop_obj = self._property_cls
+		if not prop_obj:
 			my_print(u'ERROR in configuration file: get_property_obj(): "' + self._property_obj_str + u'" is not a valid property object!!!')
-			raise ex
+			raise KeyError(self._property_obj_str)
+
+		# special treatment of rectangle..
+		if self._property_obj_str == u'rectangle':
+			# assumption: caller gives a list of strings
+			constructor_list = map(int, argument)
+			return prop_obj(*constructor_list)
+		else:
+			return prop_obj(argument)
 
 
 	def is_property_obj_valid(self, obj):
@@ -253,7 +334,7 @@ class Mapping(object):
 		# FIXME: this doesn't work as expected when objects were created under '__main__' in Parser.py...
 		# <class 'Parser.PscVar_RGB'> vs. <class '__main__.PscVar_RGB'>
 		# ==>here is a similar problem: http://stackoverflow.com/questions/15159854/python-namespace-main-class-not-isinstance-of-package-class
-		prop_obj = Mapping.obj_dict[self._property_obj_str]
+		prop_obj = self._property_cls
 		if DEBUGGING:
 			my_print(u'is_property_obj_valid: prop_obj' + repr(prop_obj))
 			my_print(u'is_property_obj_valid: type(obj)=' + repr(type(obj)))
@@ -279,6 +360,17 @@ class Mapping_split(Mapping):
 		if DEBUGGING:
 			my_print(u'constructor Mapping_split with split_arg=' + unicode(repr(split_arg)))
 		self.split_arg = split_arg
+		# positions are prepared only once
+		try:
+			# assume request for one split part...
+			self._positions_set = {self.split_arg}
+			self._is_one_value = True
+		except TypeError:
+			# ok, next assumption: request for a list of indices...
+			self._positions_set = set(self.split_arg)
+			self._is_one_value = False
+		# (same order as in PSC line)
+		self._positions_list = sorted(pos for pos in self._positions_set if pos >= 0)
 		Mapping.__init__(self, *kargs, **kwargs)
 
 	def _extract_value(self, line_str):
@@ -287,20 +379,10 @@ class Mapping_split(Mapping):
 		=>this function expects and returns unicode strings!
 		"""
 
-		try:
-			# assume request for one split part...
-			positions_set = {self.split_arg}
-		except TypeError:
-			# ok, next assumption: request for a list of indices...
-			positions_set = set(self.split_arg)
-
 		try:
 			parts = line_str.split(u';')
-			ret_list = []
-			for curr_pos in range(len(parts)):
-				# is this one of the wanted elements?
-				if curr_pos in positions_set:
-					ret_list.append(parts[curr_pos])
+			nof_parts = len(parts)
+			ret_list = [parts[curr_pos] for curr_pos in self._positions_list if curr_pos < nof_parts]
 
 			# when there's only one item, then we return a single value
 			if len(ret_list) == 1:
@@ -321,14 +403,8 @@ class Mapping_split(Mapping):
 		# FIXME: can we do this in a cleaner way? (=>we should allow ducktyping...)
 		assert self.is_property_obj_valid(obj), u'ERROR: update_value expected object of type "' + repr(Mapping.obj_dict[self._property_obj_str]) + u'", but got type "' + repr(type(obj)) + '"!'
 
-		try:
-			# assume request for one split part...
-			positions_set = {self.split_arg}
-			is_one_value = True
-		except TypeError:
-			# ok, next assumption: request for a list of indices...
-			positions_set = set(self.split_arg)
-			is_one_value = False
+		positions_set = self._positions_set
+		is_one_value = self._is_one_value
 
 		try:
 			parts = line_str.split(u';')
@@ -558,6 +634,7 @@ def main(argv=None):
 	# WARNING: this could overwrite your manual changes!!!
 	write_raw_configfile(u'config.yml')
 
+	import yaml
 	with open(u"config.yml", u'r') as ymlfile:
 		my_print(unicode(repr(yaml.load(ymlfile)), encoding=ENCODING_FILES_PSC))
 
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+visu.psc.Pipeline.py
+
+Copyright (C) 2018 Stefan Braun
+
+batch transformation of PSC files across a whole project:
+-rules are pairs (selector, transform): every PSC element chosen by the selector is handed to the transform function
+-PSC files are processed in a process pool, changed files are written by PscFile.patch_file() (only changed lines, atomic replacement)
+-dry-run: nothing gets written, changed lines are reported as diff
+-every finished file is appended to a journal, an interrupted run (<CTRL-C> or pause()) continues where it stopped
+
+example: blue dashed lines get red (as in Change_line_colors.py):
+	rule = (ElemSelector(elem_types=[u'Line'], props={u'color-fg': PscVar_RGB(0x0000FF)}),
+	        SetProperties({u'color-fg': PscVar_RGB(0xFF0000)}))
+	pipeline = PscPipeline([rule])
+	stats = pipeline.run_directory(scr_path, dry_run=True)
+
+Remarks:
+-selectors and transforms are sent to worker processes, so they have to be picklable
+ (instances of ElemSelector and SetProperties, or functions defined on module level, but no lambdas)
+-a transform has to store it's changes with set_property(), otherwise they don't get written
+-on Windows a program using PscPipeline needs the usual "if __name__ == '__main__':" guard (multiprocessing)
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import visu.psc.Parser as Parser
+import multiprocessing
+import threading
+import json
+import time
+import os
+import re
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('visu.psc.Pipeline')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# interval in seconds between two log messages with throughput
+PROGRESS_INTERVAL = 5.0
+
+PSC_FILE_PATTERN = re.compile(r'.*\.PSC$', re.IGNORECASE)
+
+
+class ElemSelector(object):
+	"""
+	selects PSC elements by element type and property values
+	=>"props": key: property name, value: expected value (compared by repr() as in set_property()) or a function returning True/False
+	"""
+	def __init__(self, elem_types=None, props=None):
+		self.elem_types = set(elem_types) if elem_types else None
+		self.props = dict(props or {})
+		# compared in every element, so we prepare it only once
+		self._expected_list = []
+		for prop_str, expected in self.props.items():
+			if callable(expected):
+				self._expected_list.append((prop_str, expected, None))
+			else:
+				self._expected_list.append((prop_str, None, repr(expected)))
+
+	def __getstate__(self):
+		return {'elem_types': self.elem_types, 'props': self.props}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def matches(self, elem):
+		if self.elem_types is not None and not elem.psc_elem_str in self.elem_types:
+			return False
+		for prop_str, predicate, expected_repr in self._expected_list:
+			try:
+				val = elem.get_property(prop_str)
+			except (KeyError, AssertionError):
+				# element doesn't have this property
+				return False
+			if predicate:
+				if not predicate(val):
+					return False
+			elif repr(val) != expected_repr:
+				return False
+		return True
+
+
+class SetProperties(object):
+	""" transform: stores given property values in PSC element """
+	def __init__(self, props):
+		self.props = dict(props)
+
+	def __call__(self, elem):
+		for prop_str, new_val in self.props.items():
+			elem.set_property(prop_str, new_val)
+
+
+class PipelineStats(object):
+	""" throughput statistics of one run """
+	def __init__(self, nof_files):
+		self.nof_files = nof_files
+		self.nof_done = 0
+		self.nof_skipped = 0
+		self.nof_errors = 0
+		self.nof_changed_files = 0
+		self.nof_selected_elems = 0
+		self.nof_changed_lines = 0
+		self.nof_bytes = 0
+		self.paused = False
+		self._start_time = time.time()
+		self.elapsed = 0.0
+
+	def add(self, result):
+		self.nof_done += 1
+		self.elapsed = time.time() - self._start_time
+		if result[u'error']:
+			self.nof_errors += 1
+			return
+		self.nof_selected_elems += result[u'selected']
+		self.nof_changed_lines += result[u'changed']
+		self.nof_bytes += result[u'size']
+		if result[u'changed']:
+			self.nof_changed_files += 1
+
+	def __str__(self):
+		elapsed = max(self.elapsed, 0.001)
+		return str(self.nof_done) + '/' + str(self.nof_files - self.nof_skipped) + ' files in ' + '%.1f' % elapsed + 's (' + \
+		       '%.1f' % (self.nof_done / elapsed) + ' files/s, ' + '%.2f' % (self.nof_bytes / elapsed / 1024.0 / 1024.0) + ' MB/s), ' + \
+		       str(self.nof_selected_elems) + ' selected elements, ' + str(self.nof_changed_lines) + ' changed lines in ' + \
+		       str(self.nof_changed_files) + ' files, ' + str(self.nof_errors) + ' errors, ' + str(self.nof_skipped) + ' skipped'
+
+
+def _process_file(args):
+	# runs in process pool: an exception must not stop processing of other files
+	pipeline, fullpath, output_path, dry_run = args
+	result = {u'file': fullpath, u'selected': 0, u'changed': 0, u'size': 0, u'diff': [], u'error': None}
+	try:
+		result.update(pipeline.apply_to_file(fullpath, output_path=output_path, dry_run=dry_run))
+	except Exception as ex:
+		result[u'error'] = repr(ex)
+	return result
+
+
+class PscPipeline(object):
+	""" list of rules (selector, transform) applied to many PSC files """
+
+	def __init__(self, rules):
+		self.rules = list(rules)
+		self._pause_event = threading.Event()
+
+
+	def __getstate__(self):
+		# only rules are needed in worker processes
+		return {'rules': self.rules}
+
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+
+	def pause(self):
+		""" stop current run after files in progress (next run with same journal continues) """
+		self._pause_event.set()
+
+
+	def apply_to_file(self, fullpath, output_path=None, dry_run=False):
+		"""
+		apply all rules on one PSC file, returns dictionary with number of selected elements, changed lines and diff (in dry-run)
+		=>changes are written into "output_path" (default: same file), without changes an output file is a copy
+		"""
+		curr_file = Parser.PscFile(fullpath)
+		curr_file.parse_file()
+
+		nof_selected = 0
+		diff_list = []
+		for elem_no, elem in enumerate(curr_file.get_psc_elem_list(), 1):
+			old_lines_dict = None
+			for selector, transform in self.rules:
+				if selector.matches(elem):
+					if old_lines_dict is None:
+						nof_selected += 1
+						if dry_run:
+							old_lines_dict = dict((linemark, elem.get_raw_line(linemark)) for linemark in elem.get_linemarks())
+						else:
+							old_lines_dict = {}
+					transform(elem)
+			if dry_run and elem.is_dirty():
+				diff_list.append(u'@@ element ' + unicode(elem_no) + u' (' + elem.psc_elem_str + u') @@')
+				for linemark in elem.get_linemarks():
+					if linemark in elem.get_dirty_linemarks():
+						diff_list.append(u'-' + old_lines_dict[linemark])
+						diff_list.append(u'+' + elem.get_raw_line(linemark))
+
+		nof_changed = 0
+		for psc_obj in [curr_file.get_psc_window()] + curr_file.get_psc_elem_list():
+			nof_changed += len(psc_obj.get_dirty_linemarks())
+
+		if not dry_run:
+			if output_path and os.path.abspath(output_path) != os.path.abspath(fullpath):
+				output_dir = os.path.dirname(output_path)
+				if output_dir and not os.path.exists(output_dir):
+					try:
+						os.makedirs(output_dir)
+					except OSError:
+						# another worker process was faster
+						pass
+				curr_file.patch_file(output_path)
+			elif nof_changed:
+				curr_file.patch_file()
+
+		return {u'selected': nof_selected,
+		        u'changed': nof_changed,
+		        u'size': os.path.getsize(fullpath),
+		        u'diff': diff_list}
+
+
+	def run(self, files_list, output_paths_dict=None, dry_run=False, processes=None, journal_filename=None, diff_func=Parser.my_print):
+		"""
+		apply rules on all given PSC files in a process pool, returns PipelineStats object
+		=>"output_paths_dict": key: fullpath, value: output path (files not in dictionary are changed in place)
+		=>"journal_filename": finished files are appended, they get skipped in next run with same journal
+		=>"diff_func": is called with every line of diff in dry-run
+		"""
+		self._pause_event.clear()
+		output_paths_dict = output_paths_dict or {}
+
+		done_set = set()
+		if journal_filename and os.path.exists(journal_filename):
+			with open(journal_filename, 'r') as f:
+				for line in f:
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						# last line could be incomplete after a crash
+						continue
+					if not entry[u'error'] and entry[u'dry_run'] == dry_run:
+						done_set.add(entry[u'file'])
+
+		stats = PipelineStats(len(files_list))
+		todo_list = []
+		for fullpath in files_list:
+			if fullpath in done_set:
+				stats.nof_skipped += 1
+			else:
+				todo_list.append((self, fullpath, output_paths_dict.get(fullpath), dry_run))
+		logger.info('PscPipeline.run(): processing ' + str(len(todo_list)) + ' PSC files (' + str(stats.nof_skipped) + ' already done according to journal)...')
+
+		journal = None
+		if journal_filename:
+			journal_dir = os.path.dirname(journal_filename)
+			if journal_dir and not os.path.exists(journal_dir):
+				os.makedirs(journal_dir)
+			journal = open(journal_filename, 'a')
+		pool = multiprocessing.Pool(processes=processes)
+		last_progress = time.time()
+		try:
+			for result in pool.imap_unordered(_process_file, todo_list):
+				stats.add(result)
+				if result[u'error']:
+					logger.error('PscPipeline.run(): processing of PSC file "' + result[u'file'] + '" failed: ' + result[u'error'])
+				elif dry_run and result[u'diff']:
+					diff_func(u'--- ' + result[u'file'])
+					diff_func(u'+++ ' + result[u'file'])
+					for line in result[u'diff']:
+						diff_func(line)
+				if journal:
+					journal.write(json.dumps({u'file': result[u'file'], u'error': result[u'error'], u'changed': result[u'changed'], u'dry_run': dry_run}) + '\n')
+					journal.flush()
+
+				if time.time() - last_progress > PROGRESS_INTERVAL:
+					logger.info('PscPipeline.run(): ' + str(stats))
+					last_progress = time.time()
+				if self._pause_event.is_set():
+					break
+		except KeyboardInterrupt:
+			# user pressed CTRL-C
+			self._pause_event.set()
+		finally:
+			# files in progress are written by atomic replacement, so stopping workers doesn't leave half written files
+			pool.terminate()
+			pool.join()
+			if journal:
+				journal.close()
+
+		if self._pause_event.is_set() and stats.nof_done < len(todo_list):
+			stats.paused = True
+			logger.warn('PscPipeline.run(): paused after ' + str(stats.nof_done) + ' files, run again with same journal for continuing.')
+		logger.info('PscPipeline.run(): ' + str(stats))
+		return stats
+
+
+	def run_directory(self, scr_path, output_dir=None, **kwargs):
+		"""
+		apply rules on all PSC files in directory and it's subdirectories
+		=>with "output_dir" all files are written there (same structure of subdirectories), otherwise they are changed in place
+		"""
+		files_list = []
+		output_paths_dict = {}
+		for dirpath, dirnames, filenames in os.walk(scr_path):
+			for filename in sorted(filenames):
+				if PSC_FILE_PATTERN.match(filename):
+					fullpath = os.path.join(dirpath, filename)
+					files_list.append(fullpath)
+					if output_dir:
+						output_paths_dict[fullpath] = os.path.join(output_dir, os.path.relpath(fullpath, scr_path))
+		return self.run(files_list, output_paths_dict=output_paths_dict, **kwargs)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+visu.psc.ProjectScanner.py
+
+Copyright (C) 2018 Stefan Braun
+
+project-wide scanning of PSC files (shared by tools like PSC_to_ALM_Mapper):
+-screen directory including subdirectories is walked, new or changed PSC files are scanned by a process pool
+-per file we extract BMO instances, DMS keys, colors and texts
+-results are kept in an index file (JSON), an entry is valid as long as modification time and size of it's PSC file didn't change
+ =>after first run only changed files get read again
+
+example: all PSC files containing BMO instance "MSR01:H01:Uwp":
+	scanner = PscProjectScanner(os.path.join(project_path, 'scr'))
+	scanner.update()
+	print(scanner.find_bmo_instance(u'MSR01:H01:Uwp'))
+
+Remarks:
+-BMO instances: same regex patterns as PSC_to_ALM_Mapper used before (LIB lines and buttons with reinit), list of all occurrences
+-DMS keys: every field in a PSC line looking like a DMS key (e.g. "MSR01:H01:Uwp:ON" in ITA line)
+-colors: positions are taken from ParserConfig (all properties with property object "RGB")
+-texts: content of DIV lines (the "text_string" pattern in ParserConfig is greedy and would include the following number fields)
+-references: BMO instances and DMS keys per PSC element with it's selection area (used by visu.psc.KeyIndex)
+-on Windows a program using PscProjectScanner needs the usual "if __name__ == '__main__':" guard (multiprocessing)
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import visu.psc.Parser as Parser
+import visu.psc.ParserConfig as ParserConfig
+import multiprocessing
+import tempfile
+import hashlib
+import codecs
+import json
+import os
+import re
+import logging
+
+
+# setup of logging
+# (based on tutorial https://docs.python.org/2/howto/logging.html )
+# create logger =>set level to DEBUG if you want to catch all log messages!
+logger = logging.getLogger('visu.psc.ProjectScanner')
+logger.setLevel(logging.INFO)
+
+# create console handler
+# =>set level to DEBUG if you want to see everything on console!
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+# create formatter
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# add formatter to ch
+ch.setFormatter(formatter)
+
+# add ch to logger
+logger.addHandler(ch)
+
+
+# format of index file, entries of other versions get scanned again
+INDEX_VERSION = 2
+
+# less changed files are scanned in current process (starting a process pool takes some time)
+POOL_MIN_FILES = 8
+
+# compiled only once for all files
+# help with regex: https://stackoverflow.com/questions/6018340/capturing-group-with-findall
+# =>we search only for one group, so we get a list of strings and not a list of tuples containing matched groups
+BMO_PATTERNS = [re.compile(r'LIB;[\w\s]+\.plb;\w+;([\w:]+);BMO:.+'),                    # BMO instances
+                re.compile(r'IBW;[\w\s]+\.*\w*;\d+;\d+;\d+;\d+;BMO[\w:]+;([\w:]+);')]   # button with reinit
+DMS_KEY_PATTERN = re.compile(r'^[A-Za-z_]\w*(?::\w+)+$')
+TEXT_PATTERN = re.compile(r'^DIV;\d+;\d+;(.*?)(?:;-?\d+)*$')
+PSC_FILE_PATTERN = re.compile(r'.*\.PSC$', re.IGNORECASE)
+
+# extraction table from ParserConfig, built once per process
+# key: PSC element type, value: dictionary with
+#   LIT_COLORS: dictionary (key: linemark, value: list of mapping objects of colors)
+#   LIT_SELECTION_AREA: mapping object of selection area
+_extractors_dict = None
+LIT_COLORS = u'colors'
+LIT_SELECTION_AREA = u'selection-area'
+
+
+def _get_extractors_dict():
+	global _extractors_dict
+	if _extractors_dict is None:
+		if not Parser.PscParser.cfg:
+			Parser.PscParser.load_config(Parser.PARSERCONFIGFILE)
+		_extractors_dict = {}
+		for elem_str in Parser.OBJ_DICT:
+			linemarks_dict = {}
+			mapping_dict = Parser.PscParser.cfg.get_compiled_mapping_dict(elem_str, version_str=u'v15')
+			for prop_str, mapping_obj in mapping_dict.items():
+				if isinstance(mapping_obj, ParserConfig.Multipos_mapping):
+					# every storage location is a property on it's own
+					continue
+				if mapping_obj.get_property_obj_str() == u'RGB':
+					linemarks_dict.setdefault(mapping_obj.linemark, []).append(mapping_obj)
+			_extractors_dict[elem_str] = {LIT_COLORS: linemarks_dict,
+			                              LIT_SELECTION_AREA: mapping_dict.get(LIT_SELECTION_AREA)}
+	return _extractors_dict
+
+
+def _new_info():
+	return {u'bmo_instances': [],
+	        u'dms_keys': set(),
+	        u'colors': set(),
+	        u'texts': set(),
+	        u'refs': [],
+	        u'error': None}
+
+
+def _get_coordinates(extractors_dict, elem_str, line):
+	# selection area of PSC element as tuple (x1, y1, x2, y2), None when line doesn't match our configuration
+	mapping_obj = extractors_dict.get(elem_str, {}).get(LIT_SELECTION_AREA)
+	if mapping_obj and line.startswith(mapping_obj.linemark + u';'):
+		try:
+			return mapping_obj.get_property_obj(line).get_coordinates()
+		except Exception:
+			pass
+	return None
+
+
+def scan_psc_file(fullpath):
+	"""
+	searchable information of one PSC file as dictionary
+	=>keys "bmo_instances" (list of all occurrences), "dms_keys", "colors" (RGB integers), "texts" (sets), "error" (None or message)
+	=>key "refs": list of references to PSC elements, lists [key, kind ("bmo" or "dms"), element number, element type, coordinates]
+	  (element number is position in file starting with 1 (0 is window definition), coordinates are None when unknown)
+	"""
+	info = _new_info()
+	with codecs.open(fullpath, 'r', encoding=Parser.ENCODING_FILES_PSC) as f:
+		try:
+			psc_content = f.read()
+		except UnicodeDecodeError as ex:
+			# corrupted PSC file
+			info[u'error'] = u'file contains wrong characters: ' + unicode(ex)
+			return info
+
+	for pattern in BMO_PATTERNS:
+		info[u'bmo_instances'].extend(pattern.findall(psc_content))
+
+	extractors_dict = _get_extractors_dict()
+	curr_extractors = {}
+
+	# references of current element get collected until it's end (coordinates are stored after LIB line)
+	elem_no = 0
+	elem_str = u'Window'
+	elem_coords = None
+	elem_refs = set()
+	def add_elem_refs():
+		for key, kind in sorted(elem_refs):
+			info[u'refs'].append([key, kind, elem_no, elem_str, elem_coords])
+
+	for line in psc_content.splitlines():
+		fields = line.split(u';')
+		linemark = fields[0]
+		if linemark == u'ID' and len(fields) > 2:
+			# begin of new graph element
+			add_elem_refs()
+			elem_no += 1
+			elem_str = fields[2]
+			elem_coords = None
+			elem_refs = set()
+			curr_extractors = extractors_dict.get(elem_str, {}).get(LIT_COLORS, {})
+		for field in fields[1:]:
+			if DMS_KEY_PATTERN.match(field):
+				info[u'dms_keys'].add(field)
+				elem_refs.add((field, u'dms'))
+		if linemark in (u'LIB', u'IBW'):
+			for pattern in BMO_PATTERNS:
+				m = pattern.search(line)
+				if m:
+					elem_refs.add((m.group(1), u'bmo'))
+		if elem_coords is None and elem_no > 0:
+			elem_coords = _get_coordinates(extractors_dict, elem_str, line)
+		for mapping_obj in curr_extractors.get(linemark, ()):
+			try:
+				info[u'colors'].add(mapping_obj.get_property_obj(line).get_int())
+			except Exception:
+				# line doesn't match our configuration (other PSC version?)
+				pass
+		if linemark == u'DIV':
+			m = TEXT_PATTERN.match(line)
+			if m and m.group(1).strip():
+				info[u'texts'].add(m.group(1).strip())
+	add_elem_refs()
+	return info
+
+
+def _scan_worker(fullpath):
+	# runs in process pool: an exception must not stop scanning of other files
+	try:
+		return fullpath, scan_psc_file(fullpath)
+	except Exception as ex:
+		info = _new_info()
+		info[u'error'] = repr(ex)
+		return fullpath, info
+
+
+def get_default_index_filename(scr_path):
+	# one index file per screen directory in temporary directory of user
+	path_hash = hashlib.md5(os.path.abspath(scr_path).encode('utf-8')).hexdigest()[:12]
+	return os.path.join(tempfile.gettempdir(), 'pyVisiToolkit_psc_index_' + path_hash + '.json')
+
+
+class PscProjectScanner(object):
+	""" persistent index over all PSC files in a screen directory """
+
+	def __init__(self, scr_path, index_filename=None, processes=None, recursive=True):
+		# =>"index_filename": None means file in temporary directory, empty string means no persistence
+		if isinstance(scr_path, str):
+			# unicode path: os.walk() returns unicode filenames, same as keys loaded from JSON
+			scr_path = scr_path.decode(Parser.ENCODING_FILENAMES)
+		self.scr_path = scr_path
+		if index_filename is None:
+			index_filename = get_default_index_filename(scr_path)
+		self.index_filename = index_filename
+		self.processes = processes
+		self.recursive = recursive
+
+		# key: path relative to screen directory, value: dictionary (as returned by scan_psc_file(), with "mtime" and "size")
+		self._entries_dict = {}
+
+		# functions called with arguments (relative path, new entry or None when file was deleted) after rescan of a file
+		self._change_listeners_list = []
+
+		if self.index_filename and os.path.exists(self.index_filename):
+			self.load()
+
+
+	def _filelist_generator(self):
+		# tuples (relative path, modification time, size) of all PSC files
+		for dirpath, dirnames, filenames in os.walk(self.scr_path):
+			if not self.recursive:
+				del dirnames[:]
+			for filename in filenames:
+				if PSC_FILE_PATTERN.match(filename):
+					fullpath = os.path.join(dirpath, filename)
+					try:
+						stat = os.stat(fullpath)
+					except OSError:
+						# file was deleted in the meantime
+						continue
+					yield os.path.relpath(fullpath, self.scr_path), stat.st_mtime, stat.st_size
+
+
+	def update(self):
+		""" scan new and changed PSC files, forget deleted ones (returns number of scanned files) """
+		stale_dict = {}
+		found_set = set()
+		for relpath, mtime, size in self._filelist_generator():
+			found_set.add(relpath)
+			entry = self._entries_dict.get(relpath)
+			if not entry or entry[u'mtime'] != mtime or entry[u'size'] != size:
+				stale_dict[os.path.join(self.scr_path, relpath)] = (relpath, mtime, size)
+
+		nof_deleted = 0
+		for relpath in self._entries_dict.keys():
+			if not relpath in found_set:
+				del self._entries_dict[relpath]
+				self._notify(relpath, None)
+				nof_deleted += 1
+
+		if stale_dict:
+			logger.debug('PscProjectScanner.update(): scanning ' + str(len(stale_dict)) + ' of ' + str(len(found_set)) + ' PSC files...')
+			if len(stale_dict) < POOL_MIN_FILES or self.processes == 1:
+				results = (_scan_worker(fullpath) for fullpath in stale_dict)
+				self._store_results(stale_dict, results)
+			else:
+				pool = multiprocessing.Pool(processes=self.processes)
+				try:
+					results = pool.imap_unordered(_scan_worker, stale_dict.keys(), chunksize=4)
+					self._store_results(stale_dict, results)
+				finally:
+					pool.close()
+					pool.join()
+
+		if stale_dict or nof_deleted:
+			self.save()
+		logger.info('PscProjectScanner.update(): ' + str(len(found_set)) + ' PSC files in index, ' + str(len(stale_dict)) + ' scanned, ' + str(nof_deleted) + ' removed.')
+		return len(stale_dict)
+
+
+	def _store_results(self, stale_dict, results):
+		for fullpath, info in results:
+			relpath, mtime, size = stale_dict[fullpath]
+			if info[u'error']:
+				logger.warn('PscProjectScanner.update(): ignoring content of PSC file "' + fullpath + '": ' + info[u'error'])
+			info[u'mtime'] = mtime
+			info[u'size'] = size
+			self._entries_dict[relpath] = info
+			self._notify(relpath, info)
+
+
+	def update_file(self, fullpath):
+		""" rescan only one PSC file (e.g. after saving it in GE), a deleted file gets removed from index """
+		relpath = os.path.relpath(fullpath, self.scr_path)
+		try:
+			stat = os.stat(fullpath)
+		except OSError:
+			if relpath in self._entries_dict:
+				del self._entries_dict[relpath]
+				self._notify(relpath, None)
+				self.save()
+			return
+		self._store_results({fullpath: (relpath, stat.st_mtime, stat.st_size)}, [_scan_worker(fullpath)])
+		self.save()
+
+
+	def add_change_listener(self, func):
+		if not func in self._change_listeners_list:
+			self._change_listeners_list.append(func)
+
+
+	def remove_change_listener(self, func):
+		if func in self._change_listeners_list:
+			self._change_listeners_list.remove(func)
+
+
+	def _notify(self, relpath, entry):
+		for func in self._change_listeners_list:
+			func(relpath, entry)
+
+
+	def load(self):
+		try:
+			with open(self.index_filename, 'r') as f:
+				data_dict = json.load(f)
+		except ValueError:
+			# damaged index file =>everything gets scanned again
+			logger.warn('PscProjectScanner.load(): ignoring damaged index file "' + self.index_filename + '"')
+			return
+		if data_dict.get(u'version') != INDEX_VERSION:
+			return
+		self._entries_dict = {}
+		for relpath, entry in data_dict[u'files'].items():
+			for key in (u'dms_keys', u'colors', u'texts'):
+				entry[key] = set(entry[key])
+			self._entries_dict[relpath] = entry
+		logger.debug('PscProjectScanner.load(): ' + str(len(self._entries_dict)) + ' PSC files loaded from "' + self.index_filename + '"')
+
+
+	def save(self):
+		""" write index file (first into temporary file, so a crash doesn't destroy the index) """
+		if not self.index_filename:
+			return
+		files_dict = {}
+		for relpath, entry in self._entries_dict.items():
+			curr_entry = dict(entry)
+			for key in (u'dms_keys', u'colors', u'texts'):
+				curr_entry[key] = sorted(entry[key])
+			files_dict[relpath] = curr_entry
+		tmp_filename = self.index_filename + '.tmp'
+		with open(tmp_filename, 'w') as f:
+			json.dump({u'version': INDEX_VERSION, u'files': files_dict}, f)
+		# os.rename() on Windows doesn't overwrite existing file
+		if os.name == 'nt' and os.path.exists(self.index_filename):
+			os.remove(self.index_filename)
+		os.rename(tmp_filename, self.index_filename)
+
+
+	def get_files(self):
+		""" sorted list of fullpaths of all PSC files in index """
+		return sorted(os.path.join(self.scr_path, relpath) for relpath in self._entries_dict)
+
+
+	def get_fullpath(self, relpath):
+		return os.path.join(self.scr_path, relpath)
+
+
+	def iter_entries(self):
+		""" generator: tuples (relative path, dictionary as returned by scan_psc_file()) of all PSC files """
+		for relpath, entry in self._entries_dict.iteritems():
+			yield relpath, entry
+
+
+	def get_info(self, fullpath):
+		""" dictionary of one PSC file (as returned by scan_psc_file()), attention: don't change it! """
+		return self._entries_dict[os.path.relpath(fullpath, self.scr_path)]
+
+
+	def _find(self, predicate):
+		return sorted(os.path.join(self.scr_path, relpath) for relpath, entry in self._entries_dict.items() if predicate(entry))
+
+
+	def find_bmo_instance(self, bmo_instance):
+		return self._find(lambda entry: bmo_instance in entry[u'bmo_instances'])
+
+
+	def find_dms_key(self, dms_key):
+		return self._find(lambda entry: dms_key in entry[u'dms_keys'])
+
+
+	def find_color(self, rgb_int):
+		return self._find(lambda entry: rgb_int in entry[u'colors'])
+
+
+	def find_text(self, pattern):
+		""" PSC files with a text matching this regex pattern """
+		regex = re.compile(pattern)
+		return self._find(lambda entry: any(regex.search(text) for text in entry[u'texts']))
+
+
+	def get_bmo_instances_dict(self):
+		""" key: BMO instance, value: sorted list of fullpaths of PSC files containing it """
+		bmo_instances_dict = {}
+		for fullpath in self.get_files():
+			for bmo_inst in set(self.get_info(fullpath)[u'bmo_instances']):
+				bmo_instances_dict.setdefault(bmo_inst, []).append(fullpath)
+		return bmo_instances_dict
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+visu.psc.SpatialIndex.py
+
+Copyright (C) 2018 Stefan Braun
+
+spatial index over selection areas of PSC graphic elements (uniform grid):
+-plane is divided into square cells, every element is registered in all cells touched by it's selection area
+ =>point query checks only elements of one cell, rectangle query only elements of covered cells
+-nearest element is searched ring by ring around the cell of the given point
+-on changes of "selection-area" the element is moved into it's new cells (see PscElem.add_change_listener())
+
+Remarks:
+-a grid fits PSC screens better than a tree: coordinates are bounded by window size and most elements are small
+ =>average lookup time doesn't depend on number of elements
+-results are sorted by draw order (same order as linear scan over PSC file)
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License as published by the Free Software Foundation, either version 2 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections
+
+
+# edge length of one grid cell in pixels
+GRID_CELL_SIZE = 64
+
+
+def _distance_sq(coords, pos_x, pos_y):
+	# squared distance between point and rectangle (0 when point is inside)
+	x1, y1, x2, y2 = coords
+	dx = max(x1 - pos_x, 0, pos_x - x2)
+	dy = max(y1 - pos_y, 0, pos_y - y2)
+	return dx * dx + dy * dy
+
+
+class PscSpatialIndex(object):
+	""" uniform grid over selection areas of PSC graphic elements """
+
+	def __init__(self, elem_list=None, cell_size=GRID_CELL_SIZE):
+		assert cell_size > 0, u'parameter "cell_size" has to be a positive number!'
+		self.cell_size = cell_size
+		# key: tuple (column, row), value: set of elements
+		self._cells_dict = collections.defaultdict(set)
+		# key: element, value: tuple of coordinates (x1, y1, x2, y2) as registered in grid
+		self._coords_dict = {}
+		# area covered by all cells in use (for limiting search of nearest element)
+		self._col_min = self._row_min = self._col_max = self._row_max = None
+
+		if elem_list:
+			for elem in elem_list:
+				self.add(elem)
+
+
+	def _get_cell_range(self, coords):
+		x1, y1, x2, y2 = coords
+		return (int(x1) // self.cell_size, int(y1) // self.cell_size,
+		        int(x2) // self.cell_size, int(y2) // self.cell_size)
+
+
+	def _register(self, elem, coords):
+		col1, row1, col2, row2 = self._get_cell_range(coords)
+		for col in xrange(col1, col2 + 1):
+			for row in xrange(row1, row2 + 1):
+				self._cells_dict[(col, row)].add(elem)
+		self._coords_dict[elem] = coords
+
+		if self._col_min is None:
+			self._col_min, self._row_min, self._col_max, self._row_max = col1, row1, col2, row2
+		else:
+			self._col_min = min(self._col_min, col1)
+			self._row_min = min(self._row_min, row1)
+			self._col_max = max(self._col_max, col2)
+			self._row_max = max(self._row_max, row2)
+
+
+	def _unregister(self, elem):
+		coords = self._coords_dict.pop(elem)
+		col1, row1, col2, row2 = self._get_cell_range(coords)
+		for col in xrange(col1, col2 + 1):
+			for row in xrange(row1, row2 + 1):
+				cell = self._cells_dict[(col, row)]
+				cell.discard(elem)
+				if not cell:
+					del self._cells_dict[(col, row)]
+
+
+	def add(self, elem):
+		coords = elem.get_property(u'selection-area').get_coordinates()
+		if elem in self._coords_dict:
+			self._unregister(elem)
+		self._register(elem, coords)
+
+
+	def remove(self, elem):
+		if elem in self._coords_dict:
+			self._unregister(elem)
+
+
+	def update(self, elem):
+		""" move element into cells of it's current selection area (no work when it didn't change) """
+		coords = elem.get_property(u'selection-area').get_coordinates()
+		if self._coords_dict.get(elem) != coords:
+			self.remove(elem)
+			self._register(elem, coords)
+
+
+	def __len__(self):
+		return len(self._coords_dict)
+
+
+	def _sorted(self, elems):
+		return sorted(elems, key=lambda elem: elem.get_property(u'draw-order'))
+
+
+	def query_point(self, pos_x, pos_y):
+		""" list of elements with selection area containing this point """
+		pos_x, pos_y = int(pos_x), int(pos_y)
+		cell = self._cells_dict.get((pos_x // self.cell_size, pos_y // self.cell_size), ())
+		hits = []
+		for elem in cell:
+			x1, y1, x2, y2 = self._coords_dict[elem]
+			if x1 <= pos_x <= x2 and y1 <= pos_y <= y2:
+				hits.append(elem)
+		return self._sorted(hits)
+
+
+	def query_rectangle(self, x1, y1, x2, y2):
+		""" list of elements with selection area overlapping this rectangle (borders included) """
+		x1, x2 = min(x1, x2), max(x1, x2)
+		y1, y2 = min(y1, y2), max(y1, y2)
+		col1, row1, col2, row2 = self._get_cell_range((x1, y1, x2, y2))
+		# only cells in use are interesting
+		if self._col_min is None:
+			return []
+		col1, row1 = max(col1, self._col_min), max(row1, self._row_min)
+		col2, row2 = min(col2, self._col_max), min(row2, self._row_max)
+
+		hits = set()
+		for col in xrange(col1, col2 + 1):
+			for row in xrange(row1, row2 + 1):
+				for elem in self._cells_dict.get((col, row), ()):
+					if elem in hits:
+						continue
+					e_x1, e_y1, e_x2, e_y2 = self._coords_dict[elem]
+					if e_x1 <= x2 and x1 <= e_x2 and e_y1 <= y2 and y1 <= e_y2:
+						hits.add(elem)
+		return self._sorted(hits)
+
+
+	def query_nearest(self, pos_x, pos_y, max_distance=None):
+		"""
+		element with selection area nearest to this point (or None)
+		=>distance to elements containing the point is 0, on same distance the topmost element (highest draw order) wins
+		"""
+		if not self._coords_dict:
+			return None
+		pos_x, pos_y = int(pos_x), int(pos_y)
+		center_col, center_row = pos_x // self.cell_size, pos_y // self.cell_size
+
+		# outermost ring containing cells in use
+		max_radius = max(abs(center_col - self._col_min), abs(self._col_max - center_col),
+		                 abs(center_row - self._row_min), abs(self._row_max - center_row))
+
+		best_elem = None
+		best_dist_sq = None
+		radius = 0
+		while radius <= max_radius:
+			# cells on border of square ring with this radius
+			for col in xrange(center_col - radius, center_col + radius + 1):
+				if radius == 0 or col in (center_col - radius, center_col + radius):
+					rows = xrange(center_row - radius, center_row + radius + 1)
+				else:
+					rows = (center_row - radius, center_row + radius)
+				for row in rows:
+					for elem in self._cells_dict.get((col, row), ()):
+						dist_sq = _distance_sq(self._coords_dict[elem], pos_x, pos_y)
+						if best_dist_sq is None or dist_sq < best_dist_sq or \
+								(dist_sq == best_dist_sq and elem.get_property(u'draw-order') > best_elem.get_property(u'draw-order')):
+							best_elem = elem
+							best_dist_sq = dist_sq
+
+			# elements in outer rings are at least "radius * cell_size" pixels away
+			# (elements containing the point are always registered in center cell)
+			if best_dist_sq is not None and (best_dist_sq == 0 or best_dist_sq < (radius * self.cell_size) ** 2):
+				break
+			if max_distance is not None and radius * self.cell_size > max_distance:
+				break
+			radius += 1
+
+		if best_elem is not None and max_distance is not None and best_dist_sq > max_distance ** 2:
+			return None
+		return best_elem